@@ -0,0 +1,188 @@
+"""Benchmarks for sysrsync command construction and local-to-local syncs.
+
+Usage:
+    python benchmarks/benchmarks.py [--output results.json] [--compare previous.json]
+                                    [--scale 1.0] [--repeat 3] [--micro-only]
+
+Results are written as JSON so runs of different versions can be compared with
+`--compare`. End-to-end scenarios are skipped when rsync is not installed.
+"""
+import argparse
+import inspect
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+import sysrsync  # noqa: E402
+from sysrsync.helpers.iterators import flatten  # noqa: E402
+from sysrsync.helpers.rsync import get_exclusions  # noqa: E402
+
+PRESETS = {
+    'delta': ['-a', '--no-whole-file'],
+    'whole-file': ['-a', '--whole-file'],
+    'checksum': ['-a', '--checksum'],
+    'compress': ['-a', '--no-whole-file', '--compress'],
+}
+
+
+def make_tiny_files(root, count):
+    """Create `count` small files spread over 100 directories."""
+    for index in range(count):
+        directory = os.path.join(root, f'dir{index % 100}')
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f'file{index}'), 'wb') as file:
+            file.write(os.urandom(64))
+
+
+def make_huge_files(root, count, size):
+    """Create `count` files of `size` bytes, half random and half compressible."""
+    os.makedirs(root, exist_ok=True)
+    chunk = 1024 * 1024
+    for index in range(count):
+        with open(os.path.join(root, f'huge{index}'), 'wb') as file:
+            for offset in range(0, size, chunk):
+                length = min(chunk, size - offset)
+                file.write(os.urandom(length // 2) + b'a' * (length - length // 2))
+
+
+def make_deep_tree(root, depth, width):
+    """Create a tree `depth` levels deep with `width` files per level."""
+    directory = root
+    for level in range(depth):
+        directory = os.path.join(directory, f'level{level}')
+        os.makedirs(directory, exist_ok=True)
+        for index in range(width):
+            with open(os.path.join(directory, f'file{index}'), 'wb') as file:
+                file.write(os.urandom(256))
+
+
+def edit_files(root, fraction):
+    """Append to a `fraction` of the files under root, to benchmark incremental syncs."""
+    paths = sorted(os.path.join(directory, name)
+                   for directory, _, names in os.walk(root)
+                   for name in names)
+    step = max(1, int(1 / fraction))
+    for path in paths[::step]:
+        with open(path, 'ab') as file:
+            file.write(os.urandom(32))
+
+
+def measure(function, repeat):
+    """Run `function` `repeat` times and summarize the wall times."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    return {'min': min(timings), 'mean': statistics.mean(timings), 'repeat': repeat}
+
+
+def micro_benchmarks(scale, repeat):
+    """Benchmark command construction with large inputs."""
+    exclusions = [f'pattern-{index}' for index in range(int(100_000 * scale))]
+    nested = [[index, index] for index in range(int(100_000 * scale))]
+
+    return {
+        'micro/get_rsync_command': measure(
+            lambda: [sysrsync.get_rsync_command('/a', '/b', options=['-a']) for _ in range(10_000)], repeat),
+        'micro/get_rsync_command_exclusions': measure(
+            lambda: sysrsync.get_rsync_command('/a', '/b', exclusions=exclusions), repeat),
+        'micro/get_exclusions': measure(lambda: get_exclusions(exclusions), repeat),
+        'micro/flatten': measure(lambda: flatten(nested), repeat),
+    }
+
+
+def sync_benchmarks(scale, repeat):
+    """Benchmark local-to-local syncs of synthetic trees under each option preset."""
+    scenarios = {
+        'tiny-files': lambda root: make_tiny_files(root, int(10_000 * scale)),
+        'huge-files': lambda root: make_huge_files(root, 2, int(64 * 1024 * 1024 * scale)),
+        'deep-tree': lambda root: make_deep_tree(root, 50, int(20 * scale) or 1),
+    }
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='sysrsync-bench-') as workdir:
+        for scenario, build in scenarios.items():
+            pristine = os.path.join(workdir, scenario)
+            build(pristine)
+            for preset, options in PRESETS.items():
+                # every preset edits its own copy, so each one syncs the same changes
+                source = os.path.join(workdir, f'{scenario}-{preset}-source')
+                shutil.copytree(pristine, source, symlinks=True)
+                destination = os.path.join(workdir, f'{scenario}-{preset}')
+
+                def full_sync():
+                    shutil.rmtree(destination, ignore_errors=True)
+                    sysrsync.run(source=source, destination=destination, options=options)
+
+                results[f'sync/{scenario}/{preset}/full'] = measure(full_sync, repeat)
+                edit_files(source, 0.05)
+                results[f'sync/{scenario}/{preset}/incremental'] = measure(
+                    lambda: sysrsync.run(source=source, destination=destination, options=options), 1)
+                shutil.rmtree(source)
+                shutil.rmtree(destination, ignore_errors=True)
+
+    return results
+
+
+def compare(results, previous):
+    """Print the ratio of each benchmark's minimum time to a previous run's."""
+    for name, result in sorted(results.items()):
+        before = previous.get('results', {}).get(name)
+        if before is None:
+            continue
+        ratio = result['min'] / before['min'] if before['min'] else float('inf')
+        marker = '  <-- regression' if ratio > 1.1 else ''
+        print(f'{name:60} {before["min"]:10.4f}s -> {result["min"]:10.4f}s  x{ratio:.2f}{marker}')
+
+
+def main():
+    """Run the benchmarks and write the results."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default='bench_output.json', help='where to write the JSON results')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare against')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplies the size of every input')
+    parser.add_argument('--repeat', type=int, default=3, help='how many times each benchmark runs')
+    parser.add_argument('--micro-only', action='store_true', help='skip the end-to-end syncs')
+    arguments = parser.parse_args()
+
+    rsync = shutil.which('rsync')
+    results = micro_benchmarks(arguments.scale, arguments.repeat)
+    if rsync is not None and not arguments.micro_only:
+        results.update(sync_benchmarks(arguments.scale, arguments.repeat))
+    elif rsync is None:
+        print('rsync not found, skipping end-to-end syncs', file=sys.stderr)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'rsync': (subprocess.run([rsync, '--version'], stdout=subprocess.PIPE, universal_newlines=True)
+                  .stdout.splitlines()[0]
+                  if rsync is not None
+                  else None),
+        'scale': arguments.scale,
+        'results': results,
+    }
+    with open(arguments.output, 'w') as output:
+        json.dump(report, output, indent=2, sort_keys=True)
+
+    if arguments.compare:
+        with open(arguments.compare) as previous:
+            compare(results, json.load(previous))
+    else:
+        for name, result in sorted(results.items()):
+            print(f'{name:60} {result["min"]:10.4f}s')
+
+
+if __name__ == '__main__':
+    main()
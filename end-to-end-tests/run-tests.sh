@@ -5,8 +5,8 @@ cd $SCRIPT_DIR/..
 
 set -euo pipefail
 
-echo starting ssh server...
-docker-compose up --detach openssh-server
+echo starting ssh servers...
+docker-compose up --detach openssh-server openssh-server-2
 
 echo running tests
 docker-compose up --exit-code-from sysrsync-client sysrsync-client
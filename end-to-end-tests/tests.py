@@ -32,6 +32,47 @@ class TestE2E(unittest.TestCase):
                      rsh_port=2222,
                      strict_host_key_checking=False)
 
+    def test_send_files_over_ssh_session(self):
+        """Test sending several files over one shared ssh connection."""
+        with sysrsync.SSHSession("test@openssh-server",
+                                 private_key="end-to-end-tests/keys/test-key",
+                                 port=2222,
+                                 strict_host_key_checking=False) as session:
+            session.run(source="end-to-end-tests/test-cases/test_file",
+                        destination="/tmp/target_test_file")
+            session.run(source="end-to-end-tests/test-cases/file with spaces",
+                        destination="/tmp/target_test_file")
+
+    def test_send_files_between_remotes(self):
+        """Test syncing from one ssh server to another, directly and relayed through the client."""
+        sysrsync.run(source="end-to-end-tests/keys/test-key",
+                     destination="/tmp/relay-key",
+                     destination_ssh="test@openssh-server",
+                     private_key="end-to-end-tests/keys/test-key",
+                     rsh_port=2222,
+                     strict_host_key_checking=False,
+                     options=["--chmod=F600"])
+        sysrsync.run(source="end-to-end-tests/test-cases",
+                     destination="/tmp/remote-source",
+                     destination_ssh="test@openssh-server",
+                     private_key="end-to-end-tests/keys/test-key",
+                     rsh_port=2222,
+                     strict_host_key_checking=False,
+                     options=["-a"])
+        for mode in ("direct", "relay"):
+            sysrsync.run_remote_to_remote(source="/tmp/remote-source",
+                                          destination=f"/tmp/remote-target-{mode}",
+                                          source_ssh="test@openssh-server",
+                                          destination_ssh="test@openssh-server-2",
+                                          mode=mode,
+                                          forward_agent=False,
+                                          remote_private_key="/tmp/relay-key",
+                                          destination_port=2222,
+                                          private_key="end-to-end-tests/keys/test-key",
+                                          rsh_port=2222,
+                                          strict_host_key_checking=False,
+                                          options=["-a"])
+
 
 if __name__ == '__main__':
     unittest.main()
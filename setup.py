@@ -18,6 +18,8 @@ setuptools.setup(
     url="https://github.com/gchamon/sysrsync",
     packages=setuptools.find_packages(exclude=['test']),
     platforms='any',
+    install_requires=['toml>=0.10.0'],
+    entry_points={'console_scripts': ['sysrsync = sysrsync.cli:main']},
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -1,3 +1,23 @@
 """sysrsync: A Python wrapper for rsync."""
+from .aio import arun, gather_syncs
+from .batch import fan_out
+from .cache import ManifestCache
 from .command_maker import *
+from .daemon import RsyncDaemon
+from .digests import DigestCache
+from .history import ThroughputHistory
+from .instrumentation import Hook, MetricsCollector, add_hook, remove_hook
+from .lanes import LanePolicy
+from .listing import ListingCache, list_files
+from .migrations import MigrationJournal, migrate
+from .parallel import run_parallel
+from .planning import plan
+from .profiles import SyncProfile
+from .remote import get_remote_to_remote_command, run_remote_to_remote
+from .retry import RetryPolicy
 from .runner import run
+from .scheduler import Scheduler
+from .session import SSHSession
+from .snapshots import snapshot
+from .streaming import stream
+from .watching import watch
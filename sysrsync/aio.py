@@ -0,0 +1,114 @@
+"""Runs the rsync command from an asyncio event loop."""
+import asyncio
+import os
+import subprocess
+from typing import Any, Dict, Iterable, List
+
+from sysrsync.command_maker import get_rsync_command
+from sysrsync.runner import _check_return_code
+
+
+async def arun(cwd=os.getcwd(), strict=True, verbose=False, terminate_timeout=5.0, **kwargs):
+    """Run the rsync command with the specified options without blocking the event loop.
+
+    If the coroutine is cancelled, the rsync process is terminated, and killed if it
+    has not exited after `terminate_timeout` seconds, before the cancellation
+    propagates.
+
+    Args:
+        cwd (str, optional): The current working directory. Defaults to the current
+            directory.
+        strict (bool, optional): Whether to raise an exception if the rsync command
+            returns a non-zero exit code. Defaults to True.
+        verbose (bool, optional): Whether to print the rsync command before executing
+            it. Defaults to False.
+        terminate_timeout (float, optional): Seconds to wait for rsync to exit after
+            being terminated on cancellation before killing it. Defaults to 5.0.
+        **kwargs: Additional options to be passed to the `get_rsync_command` function.
+
+    Returns:
+        subprocess.CompletedProcess: The completed process object representing the
+            execution of the rsync command.
+    """
+    rsync_command = get_rsync_command(**kwargs)
+
+    rsync_string = ' '.join(rsync_command)
+
+    if verbose is True:
+        print(f'[sysrsync runner] running command on "{cwd}":')
+        print(rsync_string)
+    process = await asyncio.create_subprocess_exec(*rsync_command, cwd=cwd)
+
+    try:
+        code = await process.wait()
+    except asyncio.CancelledError:
+        await _stop_process(process, terminate_timeout)
+        raise
+
+    if strict is True:
+        _check_return_code(code, rsync_string)
+
+    return subprocess.CompletedProcess(rsync_command, code)
+
+
+async def gather_syncs(jobs: Iterable[Dict[str, Any]], limit: int = 8,
+                       return_exceptions: bool = False) -> List[Any]:
+    """Run many syncs concurrently, with at most `limit` rsync processes at a time.
+
+    Args:
+        jobs (Iterable[Dict[str, Any]]): The keyword arguments of each `arun` call.
+        limit (int, optional): The maximum number of concurrent rsync processes.
+            Defaults to 8.
+        return_exceptions (bool, optional): Whether to return exceptions in the
+            results instead of raising the first one, as in `asyncio.gather`.
+            Defaults to False.
+
+    Returns:
+        List[Any]: The result of each job, in the order the jobs were given.
+
+    Raises:
+        Exception: Without `return_exceptions`, the first exception raised by a job,
+            once the other jobs were cancelled and their rsync processes stopped.
+            The jobs are also cancelled when `gather_syncs` itself is.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def _run_job(job):
+        async with semaphore:
+            return await arun(**job)
+
+    tasks = [asyncio.ensure_future(_run_job(job)) for job in jobs]
+    if not tasks:
+        return []
+
+    try:
+        if return_exceptions is True:
+            return await asyncio.gather(*tasks, return_exceptions=True)
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        # arun stops its rsync process when cancelled
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    for task in done:
+        if task.exception() is not None:
+            raise task.exception()
+
+    return [task.result() for task in tasks]
+
+
+async def _stop_process(process: asyncio.subprocess.Process, timeout: float):
+    """Terminate a process, killing it if it does not exit within `timeout` seconds."""
+    if process.returncode is not None:
+        return
+
+    try:
+        process.terminate()
+        await asyncio.wait_for(process.wait(), timeout)
+    except ProcessLookupError:
+        return
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
@@ -0,0 +1,75 @@
+"""Syncs one source to many destinations by writing an rsync batch once and replaying it."""
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List
+
+from sysrsync.command_maker import get_read_batch_command
+from sysrsync.runner import _check_return_codes, run
+
+_READ_BATCH_ARGUMENTS = ('destination', 'destination_ssh', 'options', 'private_key', 'rsh_port',
+                         'strict_host_key_checking', 'ssh_options')
+
+
+def fan_out(destinations: Iterable[Dict[str, Any]], parallelism=1, cwd=os.getcwd(), strict=True,
+            verbose=False, **kwargs) -> List[subprocess.CompletedProcess]:
+    """Sync a source to several destinations computing the file list and deltas only once.
+
+    The first destination is the reference: it is synced normally with
+    `--write-batch`, and the recorded batch is then applied to every other
+    destination with `--read-batch`. Batches only apply cleanly to destinations
+    that were identical to the reference before the sync, such as replicas of the
+    same release tree.
+
+    Args:
+        destinations (Iterable[Dict[str, Any]]): Per destination arguments, such as
+            `{'destination': '/srv/app', 'destination_ssh': 'host1'}`, overriding
+            `kwargs`. The first one is the reference destination.
+        parallelism (int, optional): How many destinations the batch is applied to
+            concurrently. Defaults to 1.
+        cwd (str, optional): The current working directory. Defaults to the current
+            directory.
+        strict (bool, optional): Whether to raise an exception if any rsync command
+            returns a non-zero exit code. Defaults to True.
+        verbose (bool, optional): Whether to print the rsync commands before executing
+            them. Defaults to False.
+        **kwargs: Additional options to be passed to the `get_rsync_command` function.
+
+    Returns:
+        List[subprocess.CompletedProcess]: One completed process per destination, in
+            order. If the reference sync fails and `strict` is False, only its process
+            is returned.
+    """
+    reference, *replicas = list(destinations)
+    options = list(kwargs.pop('options', None) or [])
+
+    with tempfile.TemporaryDirectory(prefix='sysrsync-') as batch_dir:
+        batch_file = os.path.join(batch_dir, 'batch')
+        reference_process = run(cwd=cwd, strict=strict, verbose=verbose,
+                                **{**kwargs, **reference, 'options': [*options, f'--write-batch={batch_file}']})
+        if reference_process.returncode != 0:
+            return [reference_process]
+
+        commands = [get_read_batch_command(batch_file, **_read_batch_kwargs({**kwargs, 'options': options, **replica}))
+                    for replica in replicas]
+
+        if verbose is True:
+            print(f'[sysrsync batch] running {len(commands)} commands on "{cwd}":')
+            for command in commands:
+                print(' '.join(command))
+
+        with ThreadPoolExecutor(max_workers=max(parallelism, 1)) as executor:
+            processes = list(executor.map(lambda command: subprocess.run(command, cwd=cwd, shell=False),
+                                          commands))
+
+    if strict is True:
+        _check_return_codes(processes, 'destinations')
+
+    return [reference_process, *processes]
+
+
+def _read_batch_kwargs(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: value
+            for name, value in kwargs.items()
+            if name in _READ_BATCH_ARGUMENTS}
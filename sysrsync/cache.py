@@ -0,0 +1,115 @@
+"""Caches fingerprints of local source trees to skip syncs that have nothing to do."""
+import hashlib
+import os
+import time
+from typing import Iterable, Optional
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'sysrsync', 'manifests')
+
+
+class ManifestCache:
+    """Records a fingerprint of the local source tree after each successful sync.
+
+    The fingerprint covers the path, type, size, modification time and inode of
+    every entry under the source, so a later sync with the same command can be
+    skipped when none of them changed. Changes made on the destination side are
+    not detected; invalidate the entry when the destination may have drifted.
+
+    Args:
+        directory (str, optional): Where the fingerprints are stored. Defaults to
+            `~/.cache/sysrsync/manifests`.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR):
+        """Initialize the cache, creating its directory if needed."""
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def get_key(rsync_command: Iterable[str], cwd: str, *extra: str) -> str:
+        """Generate the cache key of a sync from its rsync command and working directory.
+
+        Args:
+            rsync_command (Iterable[str]): The rsync command.
+            cwd (str): The working directory the command runs in.
+            *extra (str): Anything else the sync depends on, such as the digest of
+                its filter files.
+
+        Returns:
+            str: The cache key.
+        """
+        digest = hashlib.sha256(os.fsencode(cwd))
+        for argument in (*rsync_command, *extra):
+            digest.update(b'\0' + os.fsencode(argument))
+
+        return digest.hexdigest()
+
+    @staticmethod
+    def fingerprint(source: str) -> str:
+        """Compute the fingerprint of a local file or directory tree.
+
+        Args:
+            source (str): The path to the file or directory.
+
+        Returns:
+            str: The fingerprint.
+        """
+        digest = hashlib.sha256()
+        source_stat = os.stat(source)
+        digest.update(f'{source_stat.st_mode} {source_stat.st_size} {source_stat.st_mtime_ns} '
+                      f'{source_stat.st_ino}\0'.encode())
+
+        stack = [source] if os.path.isdir(source) else []
+        while stack:
+            current = stack.pop()
+            with os.scandir(current) as iterator:
+                entries = sorted(iterator, key=lambda entry: entry.name)
+            for entry in entries:
+                entry_stat = entry.stat(follow_symlinks=False)
+                digest.update(os.fsencode(os.path.relpath(entry.path, source)))
+                digest.update(f' {entry_stat.st_mode} {entry_stat.st_size} {entry_stat.st_mtime_ns} '
+                              f'{entry_stat.st_ino}\0'.encode())
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the fingerprint recorded for a key, if any."""
+        try:
+            with open(self._path(key), 'r') as entry:
+                return entry.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def is_fresh(self, key: str, fingerprint: str) -> bool:
+        """Check whether the recorded fingerprint for a key matches the given one."""
+        return self.get(key) == fingerprint
+
+    def record(self, key: str, fingerprint: str):
+        """Record the fingerprint of a successful sync, atomically replacing any previous one."""
+        temporary_path = f'{self._path(key)}.{os.getpid()}.tmp'
+        with open(temporary_path, 'w') as entry:
+            entry.write(fingerprint)
+        os.replace(temporary_path, self._path(key))
+
+    def invalidate(self, key: str):
+        """Forget the fingerprint recorded for a key, forcing its next sync to run."""
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def evict(self, max_age: float):
+        """Forget fingerprints recorded more than `max_age` seconds ago."""
+        threshold = time.time() - max_age
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.stat().st_mtime < threshold:
+                os.remove(entry.path)
+
+    def clear(self):
+        """Forget every recorded fingerprint."""
+        self.evict(max_age=float('-inf'))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
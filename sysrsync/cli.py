@@ -0,0 +1,145 @@
+"""Command line entry point running the sync jobs of a TOML manifest concurrently."""
+import argparse
+import inspect
+import json
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from sysrsync.command_maker import get_rsync_command
+from sysrsync.scheduler import Scheduler
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+    import toml
+
+JOB_KEYS = {*inspect.signature(get_rsync_command).parameters, 'name', 'cwd', 'priority'}
+
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    """Load and validate a job manifest.
+
+    Every `[[jobs]]` table takes the arguments of `get_rsync_command`, plus an
+    optional `name`, `cwd` and `priority`. Keys of the `[defaults]` table apply to
+    every job that does not set them.
+
+    Args:
+        path (str): The path to the TOML manifest.
+
+    Returns:
+        Dict[str, Any]: The manifest, with the defaults merged into every job.
+
+    Raises:
+        ValueError: If there are no jobs, or a job has unknown keys or lacks a source
+            or destination.
+    """
+    if tomllib is not None:
+        with open(path, 'rb') as manifest_file:
+            manifest = tomllib.load(manifest_file)
+    else:
+        manifest = toml.load(path)
+
+    defaults = manifest.get('defaults', {})
+    jobs = [{**defaults, **job} for job in manifest.get('jobs', [])]
+    if not jobs:
+        raise ValueError(f'{path} has no [[jobs]]')
+    for index, job in enumerate(jobs):
+        job.setdefault('name', f'job-{index}')
+        unknown = sorted(set(job) - JOB_KEYS)
+        if unknown:
+            raise ValueError(f'job "{job["name"]}" has unknown keys: {", ".join(unknown)}')
+        if 'source' not in job or 'destination' not in job:
+            raise ValueError(f'job "{job["name"]}" needs a source and a destination')
+
+    return {**manifest, 'jobs': jobs}
+
+
+def run_manifest(manifest: Dict[str, Any],
+                 parallelism: Optional[int] = None,
+                 per_host_limit: Optional[int] = None,
+                 verbose: bool = False) -> Dict[str, Any]:
+    """Run the jobs of a manifest concurrently and summarize them.
+
+    Args:
+        manifest (Dict[str, Any]): The manifest, as returned by `load_manifest`.
+        parallelism (Optional[int], optional): Maximum number of concurrent jobs.
+            Defaults to the manifest's `parallelism`, or 4.
+        per_host_limit (Optional[int], optional): Maximum number of concurrent jobs per
+            remote host. Defaults to the manifest's `per_host_limit`, or 2.
+        verbose (bool, optional): Whether to print the rsync commands before executing
+            them. Defaults to False.
+
+    Returns:
+        Dict[str, Any]: The summary: per-job return code, error, queue wait and
+            duration, plus the counts of succeeded and failed jobs and the total
+            duration.
+    """
+    started_at = time.monotonic()
+    scheduler = Scheduler(max_concurrency=parallelism or manifest.get('parallelism', 4),
+                          per_host_limit=per_host_limit or manifest.get('per_host_limit', 2))
+    with scheduler:
+        submitted = [(job, scheduler.submit(priority=job.get('priority', 0), strict=False, verbose=verbose,
+                                            **{key: value for key, value in job.items()
+                                               if key not in ('name', 'priority')}))
+                     for job in manifest['jobs']]
+
+    results: List[Dict[str, Any]] = []
+    for job, scheduled in submitted:
+        error = scheduled.future.exception()
+        return_code = None if error is not None else scheduled.future.result().returncode
+        results.append({'name': job['name'],
+                        'source': job['source'],
+                        'destination': job['destination'],
+                        'return_code': return_code,
+                        'error': None if error is None else str(error),
+                        'wait': scheduled.wait_time,
+                        'duration': scheduled.duration})
+
+    failed = sum(1 for result in results if result['return_code'] != 0)
+
+    return {'jobs': results,
+            'succeeded': len(results) - failed,
+            'failed': failed,
+            'duration': time.monotonic() - started_at}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the `sysrsync` command.
+
+    Args:
+        argv (Optional[List[str]], optional): The command line arguments. Defaults to
+            `sys.argv[1:]`.
+
+    Returns:
+        int: 0 when every job succeeded, 1 when any failed, 2 for an invalid manifest.
+    """
+    parser = argparse.ArgumentParser(prog='sysrsync', description='Run the rsync jobs of a TOML manifest.')
+    parser.add_argument('manifest', help='path to the TOML job manifest')
+    parser.add_argument('-j', '--parallelism', type=int, help='maximum number of concurrent jobs')
+    parser.add_argument('--per-host-limit', type=int, help='maximum number of concurrent jobs per remote host')
+    parser.add_argument('--summary', help='where to write the JSON summary, "-" for standard output')
+    parser.add_argument('-v', '--verbose', action='store_true', help='print the rsync commands')
+    arguments = parser.parse_args(argv)
+
+    try:
+        manifest = load_manifest(arguments.manifest)
+    except (OSError, ValueError) as error:
+        print(f'[sysrsync] invalid manifest: {error}', file=sys.stderr)
+        return 2
+
+    summary = run_manifest(manifest, arguments.parallelism, arguments.per_host_limit, arguments.verbose)
+
+    for result in summary['jobs']:
+        outcome = result['error'] or f'exited with code {result["return_code"]}'
+        print(f'[sysrsync] {result["name"]}: {outcome} in {result["duration"] or 0:.1f}s', file=sys.stderr)
+
+    if arguments.summary == '-':
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+    elif arguments.summary is not None:
+        with open(arguments.summary, 'w') as summary_file:
+            json.dump(summary, summary_file, indent=2)
+
+    return 0 if summary['failed'] == 0 else 1
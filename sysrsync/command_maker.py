@@ -1,10 +1,11 @@
 """Generates the rsync command."""
 import os
 import os.path
-from typing import Iterable, List, Optional
+from typing import Dict, Iterable, List, Optional
 
 from sysrsync.exceptions import RemotesError
-from sysrsync.helpers.directories import get_directory_with_ssh, sanitize_trailing_slash
+from sysrsync.helpers.directories import (get_directory_with_daemon, get_directory_with_ssh, is_daemon_path,
+                                          is_remote_directory, sanitize_trailing_slash, strip_trailing_slash)
 from sysrsync.helpers.rsync import get_exclusions, get_rsh_command
 
 
@@ -17,9 +18,18 @@ def get_rsync_command(source: str,
                       options: Optional[Iterable[str]] = None,
                       private_key: Optional[str] = None,
                       rsh_port: Optional[int] = None,
-                      strict_host_key_checking: Optional[bool] = None) -> List[str]:
+                      strict_host_key_checking: Optional[bool] = None,
+                      ssh_options: Optional[Dict[str, str]] = None,
+                      source_daemon: Optional[str] = None,
+                      destination_daemon: Optional[str] = None,
+                      password_file: Optional[str] = None) -> List[str]:
     """Generate rsync command with the specified options for synchronizing files and directories.
 
+    Only one of the source and destination can be remote, whether through ssh or an
+    rsync daemon. Daemon paths can be given directly, as `rsync://host:port/module/path`
+    or `host::module/path`, or as a path starting with the module name together with
+    `source_daemon` or `destination_daemon`.
+
     Args:
         source (str): The source directory or file path.
         destination (str): The destination directory or file path.
@@ -39,19 +49,43 @@ def get_rsync_command(source: str,
             connection. Defaults to None.
         strict_host_key_checking (Optional[bool], optional): Whether to perform strict
             host key checking. Defaults to None.
+        ssh_options (Optional[Dict[str, str]], optional): Additional ssh options for the
+            rsh command, such as `{'ControlPath': '/tmp/socket'}`. Defaults to None.
+        source_daemon (Optional[str], optional): The rsync daemon serving the source,
+            as `[user@]host[:port]`. Defaults to None.
+        destination_daemon (Optional[str], optional): The rsync daemon serving the
+            destination, as `[user@]host[:port]`. Defaults to None.
+        password_file (Optional[str], optional): The file holding the rsync daemon
+            password, passed as `--password-file`. Defaults to None.
 
     Returns:
         List[str]: A list containing the rsync command and its options for
             synchronizing files and directories.
+
+    Raises:
+        RemotesError: If both the source and the destination are remote.
+        ValueError: If a side has both an SSH prefix and a daemon, or if
+            `password_file` is given without a daemon path.
     """
-    if source_ssh is not None and destination_ssh is not None:
+    source_remote = is_remote_directory(source, source_ssh, source_daemon)
+    destination_remote = is_remote_directory(destination, destination_ssh, destination_daemon)
+    if source_remote and destination_remote:
         raise RemotesError()
+    if (source_ssh is not None and source_daemon is not None
+            or destination_ssh is not None and destination_daemon is not None):
+        raise ValueError('a path cannot be reached through both ssh and an rsync daemon')
 
-    source = get_directory_with_ssh(source, source_ssh)
-    destination = get_directory_with_ssh(destination, destination_ssh)
+    source = get_directory_with_daemon(get_directory_with_ssh(source, source_ssh), source_daemon)
+    destination = get_directory_with_daemon(get_directory_with_ssh(destination, destination_ssh), destination_daemon)
+
+    password_options = []
+    if password_file is not None:
+        if not (is_daemon_path(source) or is_daemon_path(destination)):
+            raise ValueError('password_file can only be used with an rsync daemon')
+        password_options = [f'--password-file={password_file}']
 
     # override sync_source_contents if local source is a file
-    if (source_ssh is None) and os.path.isfile(source):
+    if not source_remote and os.path.isfile(source):
         sync_source_contents = False
 
     source, destination = sanitize_trailing_slash(source, destination, sync_source_contents)
@@ -60,8 +94,8 @@ def get_rsync_command(source: str,
                           if exclusions
                           else [])
 
-    rsh = (get_rsh_command(private_key, rsh_port, strict_host_key_checking)
-           if any((private_key, rsh_port, (strict_host_key_checking is not None)))
+    rsh = (get_rsh_command(private_key, rsh_port, strict_host_key_checking, ssh_options)
+           if any((private_key, rsh_port, (strict_host_key_checking is not None), ssh_options))
            else [])
 
     if options is None:
@@ -69,7 +103,54 @@ def get_rsync_command(source: str,
 
     return ['rsync',
             *options,
+            *password_options,
             *rsh,
             source,
             destination,
             *exclusions_options]
+
+
+def get_read_batch_command(batch_file: str,
+                           destination: str,
+                           destination_ssh: Optional[str] = None,
+                           options: Optional[Iterable[str]] = None,
+                           private_key: Optional[str] = None,
+                           rsh_port: Optional[int] = None,
+                           strict_host_key_checking: Optional[bool] = None,
+                           ssh_options: Optional[Dict[str, str]] = None) -> List[str]:
+    """Generate rsync command that applies a batch file written with `--write-batch` to a destination.
+
+    Args:
+        batch_file (str): The path to the batch file.
+        destination (str): The destination directory or file path.
+        destination_ssh (Optional[str], optional): The SSH prefix for the destination.
+            Defaults to None.
+        options (Optional[Iterable[str]], optional): Additional rsync options. Defaults
+            to None.
+        private_key (Optional[str], optional): The path to the private key file for SSH
+            authentication. Defaults to None.
+        rsh_port (Optional[int], optional): The port number to use for the SSH
+            connection. Defaults to None.
+        strict_host_key_checking (Optional[bool], optional): Whether to perform strict
+            host key checking. Defaults to None.
+        ssh_options (Optional[Dict[str, str]], optional): Additional ssh options for the
+            rsh command. Defaults to None.
+
+    Returns:
+        List[str]: A list containing the rsync command and its options for applying
+            the batch file.
+    """
+    destination = strip_trailing_slash(get_directory_with_ssh(destination, destination_ssh))
+
+    rsh = (get_rsh_command(private_key, rsh_port, strict_host_key_checking, ssh_options)
+           if any((private_key, rsh_port, (strict_host_key_checking is not None), ssh_options))
+           else [])
+
+    if options is None:
+        options = []
+
+    return ['rsync',
+            f'--read-batch={batch_file}',
+            *options,
+            *rsh,
+            destination]
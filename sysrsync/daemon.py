@@ -0,0 +1,179 @@
+"""Runs a throwaway local rsync daemon, for tests and for fast local fan-out without ssh."""
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from sysrsync.exceptions import RsyncDaemonError
+
+
+class RsyncDaemon:
+    """A local `rsync --daemon` serving directories as modules, with a generated config.
+
+    The daemon runs in the foreground of a child process, listens on a free port
+    unless one is given, and is stopped and its config removed on `stop`.
+
+    Example:
+        with sysrsync.RsyncDaemon({'backups': '/srv/backups'}, users={'sync': 'secret'}) as daemon:
+            sysrsync.run(source='/home/user/files', destination='backups/files',
+                         destination_daemon=f'sync@{daemon.endpoint}',
+                         password_file=daemon.get_password_file('sync'))
+
+    Args:
+        modules (Dict[str, str]): Module names and the directories they serve.
+        port (Optional[int], optional): The port to listen on. Defaults to None, for a
+            free port.
+        address (str, optional): The address to listen on. Defaults to `127.0.0.1`.
+        read_only (bool, optional): Whether the modules refuse uploads. Defaults to
+            False.
+        users (Optional[Dict[str, str]], optional): User names and passwords required
+            to access the modules. Defaults to None, for anonymous access.
+        start_timeout (float, optional): Seconds to wait for the daemon to accept
+            connections. Defaults to 10.0.
+    """
+
+    def __init__(self,
+                 modules: Dict[str, str],
+                 port: Optional[int] = None,
+                 address: str = '127.0.0.1',
+                 read_only: bool = False,
+                 users: Optional[Dict[str, str]] = None,
+                 start_timeout: float = 10.0):
+        """Initialize the daemon without starting it."""
+        self.modules = modules
+        self.port = port
+        self.address = address
+        self.read_only = read_only
+        self.users = users
+        self.start_timeout = start_timeout
+        self.config_dir: Optional[str] = None
+        self._process: Optional[subprocess.Popen] = None
+
+    def __enter__(self):
+        """Start the daemon."""
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop the daemon."""
+        self.stop()
+
+    @property
+    def endpoint(self) -> str:
+        """The `host:port` to pass as `source_daemon` or `destination_daemon`."""
+        return f'{self.address}:{self.port}'
+
+    def get_config(self) -> str:
+        """Render the rsyncd.conf of the daemon.
+
+        Returns:
+            str: The config file contents.
+        """
+        lines = [f'pid file = {os.path.join(self.config_dir, "rsyncd.pid")}',
+                 f'log file = {os.path.join(self.config_dir, "rsyncd.log")}',
+                 'use chroot = false',
+                 f'uid = {os.getuid()}',
+                 f'gid = {os.getgid()}',
+                 f'read only = {"true" if self.read_only else "false"}']
+        if self.users:
+            lines.extend([f'auth users = {", ".join(self.users)}',
+                          f'secrets file = {os.path.join(self.config_dir, "rsyncd.secrets")}'])
+        for name, path in self.modules.items():
+            lines.extend(['', f'[{name}]', f'path = {path}'])
+
+        return '\n'.join(lines) + '\n'
+
+    def get_password_file(self, user: str) -> str:
+        """Write the password of a user to a file readable only by the owner.
+
+        Args:
+            user (str): The user name, as given in `users`.
+
+        Returns:
+            str: The path to pass as `password_file`.
+        """
+        return self._write(f'{user}.password', f'{self.users[user]}\n')
+
+    def start(self):
+        """Write the config and start the daemon, waiting until it accepts connections.
+
+        Raises:
+            RsyncDaemonError: If the daemon exits or does not accept connections in
+                time.
+        """
+        if self._process is not None:
+            return
+
+        self.config_dir = tempfile.mkdtemp(prefix='sysrsync-')
+        if self.port is None:
+            self.port = _get_free_port(self.address)
+        config = self._write('rsyncd.conf', self.get_config())
+        if self.users:
+            self._write('rsyncd.secrets', ''.join(f'{user}:{password}\n' for user, password in self.users.items()))
+
+        try:
+            self._process = subprocess.Popen(self.get_command(config), shell=False)
+        except OSError:
+            self._remove_config_dir()
+            raise
+        deadline = time.monotonic() + self.start_timeout
+        while True:
+            return_code = self._process.poll()
+            if return_code is not None:
+                self._remove_config_dir()
+                self._process = None
+                raise RsyncDaemonError(self.port, return_code)
+            try:
+                with socket.create_connection((self.address, self.port), timeout=0.5):
+                    return
+            except OSError:
+                if time.monotonic() > deadline:
+                    self.stop()
+                    raise RsyncDaemonError(self.port)
+                time.sleep(0.05)
+
+    def get_command(self, config: str) -> List[str]:
+        """Generate the command running the daemon in the foreground.
+
+        Args:
+            config (str): The path to the config file.
+
+        Returns:
+            List[str]: The rsync daemon command.
+        """
+        return ['rsync', '--daemon', '--no-detach', f'--config={config}',
+                f'--address={self.address}', f'--port={self.port}']
+
+    def stop(self):
+        """Stop the daemon and remove its config."""
+        if self._process is None:
+            return
+
+        self._process.terminate()
+        try:
+            self._process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        self._process = None
+        self._remove_config_dir()
+
+    def _write(self, name: str, contents: str) -> str:
+        path = os.path.join(self.config_dir, name)
+        with open(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as file:
+            file.write(contents)
+
+        return path
+
+    def _remove_config_dir(self):
+        shutil.rmtree(self.config_dir, ignore_errors=True)
+        self.config_dir = None
+
+
+def _get_free_port(address: str) -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind((address, 0))
+        return probe.getsockname()[1]
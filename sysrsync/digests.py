@@ -0,0 +1,223 @@
+"""Caches content digests of local source files, so only files whose content changed are sent."""
+import hashlib
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+from sysrsync.cache import ManifestCache
+
+DEFAULT_DIGESTS_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'sysrsync', 'digests')
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+PROCESS_POOL_THRESHOLD = 64
+DIGEST_SIZE = 16
+READ_SIZE = 1024 * 1024
+
+_MAGIC = b'sysrsync-digests-1\n'
+_RECORD = struct.Struct(f'<QqqqH{DIGEST_SIZE}s')
+
+
+class FileState(NamedTuple):
+    """The stat key and content digest of a file."""
+
+    inode: int
+    size: int
+    mtime_ns: int
+    ctime_ns: int
+    digest: bytes
+
+
+class DigestScan(NamedTuple):
+    """The state of a local source, and how it differs from the state recorded for it."""
+
+    states: Dict[str, FileState]
+    changed: List[str]
+    deleted: List[str]
+    hashed: int
+
+
+def hash_file(path: str) -> bytes:
+    """Compute the content digest of a file, or of the target of a symbolic link.
+
+    Args:
+        path (str): The path to the file.
+
+    Returns:
+        bytes: The BLAKE2b digest.
+    """
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    if os.path.islink(path):
+        digest.update(os.fsencode(os.readlink(path)))
+        return digest.digest()
+
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(READ_SIZE), b''):
+            digest.update(chunk)
+
+    return digest.digest()
+
+
+class DigestCache:
+    """Records the content digest of every file of a local source after each successful sync.
+
+    Files are hashed again only when their inode, size, modification time or
+    change time differ from the recorded ones, and only files whose digest changed
+    are sent. This replaces `--checksum` on sources with unreliable modification
+    times without re-reading the whole tree, as long as the destination is only
+    modified by these syncs.
+
+    Each sync's digests are stored in one file of fixed-size binary records. When
+    the stored files exceed `max_size` bytes, the least recently used are removed.
+
+    Args:
+        directory (str, optional): Where the digests are stored. Defaults to
+            `~/.cache/sysrsync/digests`.
+        max_size (int, optional): Maximum bytes of stored digests. Defaults to 256 MiB.
+        processes (Optional[int], optional): Number of processes hashing files.
+            Defaults to None, for one per CPU.
+        pool_threshold (int, optional): Minimum number of files to hash before a
+            process pool is used. Defaults to 64.
+    """
+
+    get_key = staticmethod(ManifestCache.get_key)
+
+    def __init__(self,
+                 directory: str = DEFAULT_DIGESTS_DIR,
+                 max_size: int = DEFAULT_MAX_SIZE,
+                 processes: Optional[int] = None,
+                 pool_threshold: int = PROCESS_POOL_THRESHOLD):
+        """Initialize the cache, creating its directory if needed."""
+        self.directory = directory
+        self.max_size = max_size
+        self.processes = processes
+        self.pool_threshold = pool_threshold
+        os.makedirs(self.directory, exist_ok=True)
+
+    def load(self, key: str) -> Dict[str, FileState]:
+        """Load the digests recorded for a key.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Dict[str, FileState]: The recorded state of each file, by path relative to
+                the source. Empty when nothing, or something unreadable, was recorded.
+        """
+        try:
+            with open(self._path(key), 'rb') as entry:
+                data = entry.read()
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            return {}
+        if not data.startswith(_MAGIC):
+            return {}
+
+        states = {}
+        offset = len(_MAGIC)
+        try:
+            while offset < len(data):
+                inode, size, mtime_ns, ctime_ns, length, digest = _RECORD.unpack_from(data, offset)
+                offset += _RECORD.size
+                path = os.fsdecode(data[offset:offset + length])
+                offset += length
+                states[path] = FileState(inode, size, mtime_ns, ctime_ns, digest)
+        except struct.error:
+            return {}
+
+        return states
+
+    def record(self, key: str, states: Dict[str, FileState]):
+        """Record the digests of a successful sync, atomically replacing the previous ones.
+
+        Args:
+            key (str): The cache key.
+            states (Dict[str, FileState]): The state of each file.
+        """
+        chunks = [_MAGIC]
+        for path, state in states.items():
+            encoded = os.fsencode(path)
+            chunks.append(_RECORD.pack(state.inode, state.size, state.mtime_ns, state.ctime_ns,
+                                       len(encoded), state.digest))
+            chunks.append(encoded)
+
+        temporary_path = f'{self._path(key)}.{os.getpid()}.tmp'
+        with open(temporary_path, 'wb') as entry:
+            entry.write(b''.join(chunks))
+        os.replace(temporary_path, self._path(key))
+        self.evict(keep=key)
+
+    def scan(self, source: str, previous: Dict[str, FileState]) -> DigestScan:
+        """Compare a local source with its recorded state, hashing the files whose stat key changed.
+
+        Args:
+            source (str): The path to the source directory.
+            previous (Dict[str, FileState]): The recorded state, as returned by `load`.
+
+        Returns:
+            DigestScan: The new state, the paths whose content is new or changed, the
+                recorded paths that no longer exist, and how many files were hashed.
+        """
+        keys = {}
+        stack = [source]
+        while stack:
+            current = stack.pop()
+            with os.scandir(current) as iterator:
+                for entry in iterator:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False) or entry.is_symlink():
+                        entry_stat = entry.stat(follow_symlinks=False)
+                        keys[os.path.relpath(entry.path, source)] = (entry_stat.st_ino, entry_stat.st_size,
+                                                                     entry_stat.st_mtime_ns, entry_stat.st_ctime_ns)
+
+        stale = [path for path, key in keys.items()
+                 if path not in previous or previous[path][:4] != key]
+        digests = dict(zip(stale, self._hash([os.path.join(source, path) for path in stale])))
+
+        states = {path: (FileState(*key, digests[path]) if path in digests else previous[path])
+                  for path, key in keys.items()}
+        changed = sorted(path for path in stale
+                         if path not in previous or previous[path].digest != states[path].digest)
+        deleted = sorted(path for path in previous if path not in keys)
+
+        return DigestScan(states, changed, deleted, len(stale))
+
+    def invalidate(self, key: str):
+        """Forget the digests recorded for a key, so every file of its next sync is sent."""
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def evict(self, keep: Optional[str] = None):
+        """Remove the least recently used digests until they fit in `max_size`.
+
+        Args:
+            keep (Optional[str], optional): A key never removed, such as the one just
+                recorded. Defaults to None.
+        """
+        entries = sorted((entry for entry in os.scandir(self.directory)
+                          if entry.is_file() and entry.name != keep),
+                         key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.is_file())
+        for entry in entries:
+            if total <= self.max_size:
+                break
+            total -= entry.stat().st_size
+            os.remove(entry.path)
+
+    def clear(self):
+        """Forget every recorded digest."""
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                os.remove(entry.path)
+
+    def _hash(self, paths: List[str]) -> List[bytes]:
+        if len(paths) < self.pool_threshold or self.processes == 1:
+            return [hash_file(path) for path in paths]
+
+        with ProcessPoolExecutor(max_workers=self.processes) as executor:
+            return list(executor.map(hash_file, paths, chunksize=16))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
@@ -15,9 +15,37 @@ class RemotesError(Exception):
 
 
 class RsyncError(Exception):
-    """Exception raised for errors related to rsync operations."""
+    """
+    Exception raised for errors related to rsync operations.
+
+    Args:
+        message: The error message.
+        return_code: The rsync exit code, if the error comes from an rsync run.
+        stderr_tail: The last lines rsync wrote to its standard error, if they were
+            captured.
+
+    Attributes:
+        return_code: The rsync exit code, or None.
+        stderr_tail: The captured standard error lines, or None.
+    """
+
+    def __init__(self, message, return_code=None, stderr_tail=None):
+        """Initialize the RsyncError exception."""
+        super().__init__(message)
+        self.return_code = return_code
+        self.stderr_tail = stderr_tail
+
 
-    pass
+class RetryableRsyncError(RsyncError):
+    """Exception raised when rsync fails with a transient error, such as a timeout or a dropped connection."""
+
+
+class PartialTransferError(RsyncError):
+    """Exception raised when rsync could not transfer some files, or some files vanished during the transfer."""
+
+
+class FatalRsyncError(RsyncError):
+    """Exception raised when rsync fails with an error that retrying will not fix."""
 
 
 class PrivateKeyError(Exception):
@@ -35,3 +63,45 @@ class PrivateKeyError(Exception):
         """Initialize the PrivateKeyError exception."""
         message = f'Private Key File "{key_file}" does not exist'
         super().__init__(message)
+
+
+class SSHSessionError(Exception):
+    """
+    Exception raised when a shared ssh connection cannot be opened or is not open.
+
+    Args:
+        host: The host the connection was meant for.
+        return_code: The exit code of the ssh command, or None if the connection was
+            never opened.
+
+    Attributes:
+        message: The error message indicating the host and the ssh exit code.
+    """
+
+    def __init__(self, host, return_code=None):
+        """Initialize the SSHSessionError exception."""
+        message = (f'ssh master connection to "{host}" is not open'
+                   if return_code is None
+                   else f'Could not open ssh master connection to "{host}", ssh exited with code {return_code}')
+        super().__init__(message)
+
+
+class RsyncDaemonError(Exception):
+    """
+    Exception raised when a local rsync daemon does not start.
+
+    Args:
+        port: The port the daemon was meant to listen on.
+        return_code: The exit code of the daemon, or None if it is still running but
+            not accepting connections.
+
+    Attributes:
+        message: The error message indicating the port and the daemon exit code.
+    """
+
+    def __init__(self, port, return_code=None):
+        """Initialize the RsyncDaemonError exception."""
+        message = (f'rsync daemon on port {port} did not accept connections in time'
+                   if return_code is None
+                   else f'rsync daemon on port {port} exited with code {return_code}')
+        super().__init__(message)
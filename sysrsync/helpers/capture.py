@@ -0,0 +1,42 @@
+"""Bounded capture of rsync output for sysrsync."""
+import contextlib
+import gzip
+from typing import IO, Callable, Deque, Iterator, Optional, Union
+
+from sysrsync.helpers.progress import iter_lines
+
+Output = Union[str, Callable[[str], None]]
+
+
+@contextlib.contextmanager
+def open_line_sink(output: Optional[Output], compress: bool = False) -> Iterator[Callable[[str], None]]:
+    """Open where output lines are written to, one at a time.
+
+    Args:
+        output (Optional[Output]): A file path, a callback receiving each line, or
+            None to print the lines.
+        compress (bool, optional): Whether a file path is written gzip compressed.
+            Defaults to False.
+
+    Yields:
+        Callable[[str], None]: A function writing one line, without line terminator.
+    """
+    if output is None:
+        yield print
+    elif callable(output):
+        yield output
+    else:
+        with (gzip.open(output, 'wt', encoding='utf-8', errors='surrogateescape')
+              if compress
+              else open(output, 'w', encoding='utf-8', errors='surrogateescape')) as file:
+            yield lambda line: file.write(f'{line}\n')
+
+
+def collect_tail(stream: IO[bytes], tail: Deque[str]):
+    """Read a stream to its end, keeping its last lines.
+
+    Args:
+        stream (IO[bytes]): The stream to read from.
+        tail (Deque[str]): A deque bounded with `maxlen`, receiving the lines.
+    """
+    tail.extend(iter_lines(stream))
@@ -20,6 +20,84 @@ def get_directory_with_ssh(directory: str, ssh: Optional[str]) -> str:
     return f'{ssh}:{directory}'
 
 
+def get_directory_with_daemon(directory: str, daemon: Optional[str]) -> str:
+    """
+    Return the directory path on an rsync daemon if a daemon is provided.
+
+    Args:
+        directory (str): The path on the daemon, starting with the module name.
+        daemon (Optional[str]): The daemon host, as `[user@]host[:port]`. Defaults
+            to None.
+
+    Returns:
+        str: `rsync://[user@]host:port/directory` when the daemon has a port,
+            `[user@]host::directory` when it has none, otherwise the directory path
+            itself.
+    """
+    if daemon is None:
+        return directory
+
+    directory = directory.lstrip('/')
+    if ':' in daemon.rpartition('@')[2]:
+        return f'rsync://{daemon}/{directory}'
+
+    return f'{daemon}::{directory}'
+
+
+def is_daemon_path(directory: str) -> bool:
+    """
+    Check whether a path points at an rsync daemon, as `rsync://host/module` or `host::module`.
+
+    Args:
+        directory (str): The path.
+
+    Returns:
+        bool: Whether the path is a daemon path.
+    """
+    return directory.startswith('rsync://') or '::' in directory.split('/', 1)[0]
+
+
+def is_remote_directory(directory: str, ssh: Optional[str] = None, daemon: Optional[str] = None) -> bool:
+    """
+    Check whether a path is on another machine, through ssh or an rsync daemon.
+
+    Args:
+        directory (str): The path.
+        ssh (Optional[str], optional): The SSH prefix. Defaults to None.
+        daemon (Optional[str], optional): The daemon host. Defaults to None.
+
+    Returns:
+        bool: Whether the path is remote.
+    """
+    return ssh is not None or daemon is not None or is_daemon_path(directory)
+
+
+def get_remote_host(directory: str, ssh: Optional[str] = None, daemon: Optional[str] = None) -> Optional[str]:
+    """
+    Return the host a path is on, through ssh or an rsync daemon.
+
+    Args:
+        directory (str): The path, which can be a daemon path such as
+            `rsync://host/module` or `host::module`.
+        ssh (Optional[str], optional): The SSH prefix. Defaults to None.
+        daemon (Optional[str], optional): The daemon host. Defaults to None.
+
+    Returns:
+        Optional[str]: The host, without the user and port parts, or None if the
+            path is local.
+    """
+    if ssh is not None:
+        return ssh.rpartition('@')[2]
+    if daemon is not None:
+        return daemon.rpartition('@')[2].partition(':')[0]
+    if directory.startswith('rsync://'):
+        return directory[len('rsync://'):].partition('/')[0].rpartition('@')[2].partition(':')[0]
+    if is_daemon_path(directory):
+        return directory.partition('::')[0].rpartition('@')[2]
+
+    return None
+
+
 def sanitize_trailing_slash(source_dir, target_dir, sync_sourcedir_contents=True):
     # type: (str, str, bool) -> Tuple[str, str]
     """
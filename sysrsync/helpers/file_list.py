@@ -0,0 +1,100 @@
+"""File list helper functions for rsync's --files-from in sysrsync."""
+import hashlib
+import os
+from typing import IO, Iterable, List, Optional, Tuple
+
+
+def write_file_list(file_path: str, paths: Iterable[str]) -> str:
+    """Write paths to a file, NUL separated, to be read by rsync with `--from0`.
+
+    Args:
+        file_path (str): The path of the file list to write.
+        paths (Iterable[str]): The paths, relative to the transfer root, or filter
+            patterns.
+
+    Returns:
+        str: The SHA-256 digest of the written content.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'wb') as file_list:
+        for path in paths:
+            line = os.fsencode(path) + b'\0'
+            digest.update(line)
+            file_list.write(line)
+
+    return digest.hexdigest()
+
+
+def write_paths(stream: IO[bytes], paths: Iterable[str]):
+    """Write paths to a stream, NUL separated, and close it.
+
+    Used to feed `--files-from=-` through rsync's standard input. Stops quietly if
+    rsync exits before reading everything. If iterating `paths` raises, the
+    exception propagates and the stream is left open, so the caller can stop rsync
+    before it takes the truncated list for the whole one.
+
+    Args:
+        stream (IO[bytes]): The stream to write to.
+        paths (Iterable[str]): The paths, relative to the transfer root.
+    """
+    try:
+        for path in paths:
+            stream.write(os.fsencode(path) + b'\0')
+    except BrokenPipeError:
+        pass
+    close_quietly(stream)
+
+
+def close_quietly(stream: IO[bytes]):
+    """Close a pipe, ignoring that the process reading it already exited."""
+    try:
+        stream.close()
+    except BrokenPipeError:
+        pass
+
+
+def get_filter_options(directory: str,
+                       inclusions: Optional[Iterable[str]] = None,
+                       exclusions: Optional[Iterable[str]] = None) -> Tuple[List[str], str]:
+    """Write include and exclude patterns to filter files and generate the options that read them.
+
+    Patterns are written one at a time, so the size of the command and the memory
+    used do not depend on how many patterns there are. Inclusions come first, so
+    they take precedence over exclusions.
+
+    Args:
+        directory (str): Where to write the filter files.
+        inclusions (Optional[Iterable[str]], optional): Include patterns. Defaults to
+            None.
+        exclusions (Optional[Iterable[str]], optional): Exclude patterns. Defaults to
+            None.
+
+    Returns:
+        Tuple[List[str], str]: The rsync options, and a digest of the filter files'
+            content.
+    """
+    options: List[str] = []
+    digest = hashlib.sha256()
+    for name, patterns in (('include', inclusions), ('exclude', exclusions)):
+        if patterns is None:
+            continue
+        file_path = os.path.join(directory, f'{name}-from')
+        digest.update(f'{name}:{write_file_list(file_path, patterns)}'.encode())
+        options.extend([f'--{name}-from', file_path])
+
+    if options:
+        options.insert(0, '--from0')
+
+    return options, digest.hexdigest()
+
+
+def get_files_from_options(file_path: str) -> List[str]:
+    """Generate the rsync options that read the transfer list from a NUL separated file.
+
+    Args:
+        file_path (str): The path of the file list, or `-` for standard input.
+
+    Returns:
+        List[str]: The rsync options.
+    """
+    return ['--from0', '--files-from', file_path]
@@ -0,0 +1,57 @@
+"""Parses the itemized changes printed by rsync for sysrsync."""
+import re
+from typing import NamedTuple, Optional
+
+from sysrsync.helpers.progress import parse_size
+
+ITEMIZE_FORMAT = '%i %l %n'
+ITEMIZE_OPTIONS = ['--itemize-changes', f'--out-format={ITEMIZE_FORMAT}']
+
+_ITEMIZED_LINE = re.compile(r'^([<>ch.][fdLDS].{9}|\*deleting  ) (\S+) (.+)$')
+
+
+class ItemizedChange(NamedTuple):
+    """One file, directory or link rsync would create, update or delete."""
+
+    path: str
+    size: int
+    flags: str
+
+    @property
+    def is_dir(self) -> bool:
+        """Whether the entry is a directory."""
+        return self.path.endswith('/')
+
+    @property
+    def is_deleted(self) -> bool:
+        """Whether the entry is deleted from the destination."""
+        return self.flags.startswith('*deleting')
+
+    @property
+    def is_new(self) -> bool:
+        """Whether the entry does not exist on the destination yet."""
+        return set(self.flags[2:]) == {'+'}
+
+    @property
+    def transfers_data(self) -> bool:
+        """Whether the entry's content is sent, rather than only its attributes updated."""
+        return self.flags[0] in '<>'
+
+
+def parse_itemized_line(line: str) -> Optional[ItemizedChange]:
+    """Parse a line printed with `--out-format='%i %l %n'`.
+
+    Args:
+        line (str): A line of rsync's output.
+
+    Returns:
+        Optional[ItemizedChange]: The change, or None if the line does not describe
+            one.
+    """
+    match = _ITEMIZED_LINE.match(line)
+    if match is None:
+        return None
+
+    flags, size, path = match.groups()
+
+    return ItemizedChange(path, parse_size(size), flags)
@@ -0,0 +1,55 @@
+"""Parses the output of `rsync --list-only` for sysrsync."""
+import re
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sysrsync.helpers.progress import parse_size
+
+_LIST_PATTERN = re.compile(
+    r'^(?P<mode>[-bcdlps][-rwxsStT]{9})\s+(?P<size>[\d,.]+[KMGTP]?)\s+'
+    r'(?P<mtime>\d{4}/\d{2}/\d{2} \d{2}:\d{2}:\d{2}) (?P<path>.+)$')
+
+
+class ListEntry(NamedTuple):
+    """A file, directory or link listed by rsync."""
+
+    path: str
+    size: int
+    mtime: datetime
+    mode: str
+    link_target: Optional[str] = None
+
+    @property
+    def is_dir(self) -> bool:
+        """Whether the entry is a directory."""
+        return self.mode.startswith('d')
+
+    @property
+    def is_link(self) -> bool:
+        """Whether the entry is a symbolic link."""
+        return self.mode.startswith('l')
+
+
+def parse_list_line(line: str) -> Optional[ListEntry]:
+    """Parse one line of `rsync --list-only` output.
+
+    Args:
+        line (str): The output line, without line terminator.
+
+    Returns:
+        Optional[ListEntry]: The listed entry, or None if the line is not an entry.
+            Modification times are naive, in the local time of the listed host.
+    """
+    match = _LIST_PATTERN.match(line)
+    if match is None:
+        return None
+
+    path, link_target = match.group('path'), None
+    if match.group('mode').startswith('l'):
+        path, _, link_target = path.partition(' -> ')
+
+    return ListEntry(path=path,
+                     size=parse_size(match.group('size')),
+                     mtime=datetime.strptime(match.group('mtime'), '%Y/%m/%d %H:%M:%S'),
+                     mode=match.group('mode'),
+                     link_target=link_target)
@@ -0,0 +1,132 @@
+"""Parses rsync progress and itemized-change output for sysrsync."""
+import re
+from typing import IO, Iterator, NamedTuple, Optional, Union
+
+OUT_FORMAT_PREFIX = '[sysrsync] '
+OUT_FORMAT = f'{OUT_FORMAT_PREFIX}%i %l %n'
+
+_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4, 'P': 1024 ** 5}
+
+_PROGRESS_PATTERN = re.compile(
+    r'^\s*(?P<bytes>[\d.,]+[KMGTP]?)\s+(?P<percent>\d+)%\s+'
+    r'(?P<rate>[\d.,]+)(?P<rate_unit>[kKMGTP]?)B/s\s+(?P<eta>\d+:\d{2}:\d{2})'
+    r'(?:\s+\(xfr#(?P<transfers>\d+),\s*(?:ir|to)-chk=(?P<remaining>\d+)/(?P<total>\d+)\))?')
+
+
+class FileEvent(NamedTuple):
+    """A file or directory reported by rsync's itemized output."""
+
+    changes: str
+    size: int
+    path: str
+
+
+class ProgressEvent(NamedTuple):
+    """An update of the overall transfer progress, as reported by `--info=progress2`."""
+
+    bytes: int
+    percent: int
+    rate: float
+    eta: int
+    transfers: Optional[int]
+    remaining: Optional[int]
+    total: Optional[int]
+
+
+class MessageEvent(NamedTuple):
+    """Any other line written by rsync."""
+
+    text: str
+
+
+Event = Union[FileEvent, ProgressEvent, MessageEvent]
+
+
+def parse_size(size: str) -> int:
+    """Parse a size as printed by rsync, such as `1,234,567` or `1.23M`, into bytes.
+
+    Args:
+        size (str): The size string.
+
+    Returns:
+        int: The size in bytes.
+    """
+    unit = size[-1].upper() if size[-1].isalpha() else ''
+    number = size[:-1] if unit else size
+    if unit:
+        return int(float(number.replace(',', '.')) * _UNITS[unit])
+
+    return int(number.replace(',', '').replace('.', ''))
+
+
+def parse_duration(duration: str) -> int:
+    """Parse a `h:mm:ss` duration into seconds.
+
+    Args:
+        duration (str): The duration string.
+
+    Returns:
+        int: The duration in seconds.
+    """
+    hours, minutes, seconds = (int(part) for part in duration.split(':'))
+
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def parse_line(line: str) -> Event:
+    """Parse one line of rsync output into an event.
+
+    Args:
+        line (str): The output line, without line terminator.
+
+    Returns:
+        Event: A `FileEvent` for lines in `OUT_FORMAT`, a `ProgressEvent` for progress
+            updates, or a `MessageEvent` otherwise.
+    """
+    if line.startswith(OUT_FORMAT_PREFIX):
+        changes, size, path = line[len(OUT_FORMAT_PREFIX):].split(' ', 2)
+        return FileEvent(changes, int(size), path)
+
+    match = _PROGRESS_PATTERN.match(line)
+    if match is None:
+        return MessageEvent(line)
+
+    def optional_int(group):
+        return int(match.group(group)) if match.group(group) is not None else None
+
+    return ProgressEvent(bytes=parse_size(match.group('bytes')),
+                         percent=int(match.group('percent')),
+                         rate=float(match.group('rate').replace(',', '.'))
+                         * _UNITS[match.group('rate_unit').upper()],
+                         eta=parse_duration(match.group('eta')),
+                         transfers=optional_int('transfers'),
+                         remaining=optional_int('remaining'),
+                         total=optional_int('total'))
+
+
+def iter_lines(stream: IO[bytes], chunk_size: int = 64 * 1024) -> Iterator[str]:
+    r"""Read a binary stream incrementally and yield its lines.
+
+    Both `\n` and `\r` terminate lines, since rsync rewrites progress lines in place
+    with carriage returns. Only the current incomplete line is kept in memory.
+
+    Args:
+        stream (IO[bytes]): The stream to read from.
+        chunk_size (int, optional): How many bytes to read at a time. Defaults to 64 KiB.
+
+    Yields:
+        str: Each non-empty line, decoded with surrogate escapes for undecodable names.
+    """
+    pending = b''
+    while True:
+        chunk = stream.read1(chunk_size) if hasattr(stream, 'read1') else stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + chunk).replace(b'\r', b'\n').split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            if line:
+                yield line.decode('utf-8', 'surrogateescape')
+
+    if pending:
+        yield pending.decode('utf-8', 'surrogateescape')
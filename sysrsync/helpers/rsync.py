@@ -1,7 +1,7 @@
 """Generates rsync arguments based on the provided options for sysrsync."""
 import os
 from pathlib import Path
-from typing import Iterable, List, Optional
+from typing import Dict, Iterable, List, Optional
 
 from sysrsync.exceptions import PrivateKeyError
 from sysrsync.helpers.iterators import flatten
@@ -23,7 +23,8 @@ def get_exclusions(exclusions: Iterable[str]) -> Iterable[str]:
                     if exclusion != '--exclude'))
 
 
-def get_rsh_command(private_key: Optional[str] = None, port: Optional[int] = None, strict_host_key_checking: Optional[bool] = None):
+def get_rsh_command(private_key: Optional[str] = None, port: Optional[int] = None, strict_host_key_checking: Optional[bool] = None,
+                    ssh_options: Optional[Dict[str, str]] = None):
     """Generate rsync remote shell (rsh) command with the specified options.
 
     Args:
@@ -33,6 +34,8 @@ def get_rsh_command(private_key: Optional[str] = None, port: Optional[int] = Non
             Defaults to None.
         strict_host_key_checking (Optional[bool], optional): Whether to perform strict
             host key checking. Defaults to None.
+        ssh_options (Optional[Dict[str, str]], optional): Additional ssh options, passed
+            as `-o "Name value"`. Defaults to None.
 
     Returns:
         List[str]: A list containing the rsync rsh command and its options.
@@ -53,6 +56,9 @@ def get_rsh_command(private_key: Optional[str] = None, port: Optional[int] = Non
     if strict_host_key_checking is not None:
         args.extend(["-o", f'"StrictHostKeyChecking {"yes" if strict_host_key_checking else "no"}"'])
 
+    for name, value in (ssh_options or {}).items():
+        args.extend(["-o", f'"{name} {value}"'])
+
     string_args = " ".join(args)
 
     return ["--rsh", f"ssh {string_args}"]
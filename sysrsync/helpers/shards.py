@@ -0,0 +1,156 @@
+"""Source tree sharding helper functions for sysrsync."""
+import heapq
+import os
+from typing import Iterator, List, NamedTuple, Tuple
+
+# Rough cost, in bytes, of the per-file metadata exchange rsync performs. Used
+# to balance shards with many tiny files against shards with a few large ones.
+FILE_WEIGHT = 32 * 1024
+
+
+class TreeEntry(NamedTuple):
+    """A path relative to the source root and the size of the tree under it."""
+
+    path: str
+    size: int
+    files: int
+    is_dir: bool
+
+    @property
+    def weight(self) -> int:
+        """Balancing weight of the entry, combining its size and file count."""
+        return self.size + self.files * FILE_WEIGHT
+
+
+class Shard(NamedTuple):
+    """A group of entries to be transferred by a single rsync process."""
+
+    paths: List[str]
+    size: int
+    files: int
+
+
+def measure_tree(path: str) -> Tuple[int, int]:
+    """Measure the total size and number of files under a directory.
+
+    Symbolic links are counted as files and never followed.
+
+    Args:
+        path (str): The directory path.
+
+    Returns:
+        Tuple[int, int]: The total size in bytes and the number of files.
+    """
+    size, files = 0, 0
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as iterator:
+                for entry in iterator:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    else:
+                        size += entry.stat(follow_symlinks=False).st_size
+                        files += 1
+        except OSError:
+            continue
+
+    return size, files
+
+
+def scan_entries(root: str, relative: str = '') -> Iterator[TreeEntry]:
+    """Yield the entries directly under `relative`, measuring each subdirectory.
+
+    Args:
+        root (str): The source root directory.
+        relative (str, optional): The directory to scan, relative to `root`.
+            Defaults to the root itself.
+
+    Yields:
+        TreeEntry: One entry per file or directory found.
+    """
+    with os.scandir(os.path.join(root, relative)) as iterator:
+        for entry in iterator:
+            path = os.path.join(relative, entry.name) if relative else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                size, files = measure_tree(entry.path)
+                yield TreeEntry(path, size, files, True)
+            else:
+                yield TreeEntry(path, entry.stat(follow_symlinks=False).st_size, 1, False)
+
+
+def split_entries(root: str, count: int, max_depth: int = 3) -> List[TreeEntry]:
+    """List the top level entries of `root`, splitting directories that are too heavy.
+
+    A directory heavier than an even share of the tree is replaced by its own
+    entries, down to `max_depth` levels, so a single huge subdirectory does not
+    end up in one shard.
+
+    Args:
+        root (str): The source root directory.
+        count (int): The number of shards the entries will be distributed into.
+        max_depth (int, optional): How many levels deep directories can be split.
+            Defaults to 3.
+
+    Returns:
+        List[TreeEntry]: The entries to be distributed.
+    """
+    entries = list(scan_entries(root))
+    target = sum(entry.weight for entry in entries) / max(count, 1)
+
+    for _ in range(max_depth):
+        heavy = [entry for entry in entries if entry.is_dir and entry.weight > target]
+        if not heavy:
+            break
+        entries = [entry for entry in entries if entry not in heavy]
+        for entry in heavy:
+            children = list(scan_entries(root, entry.path))
+            entries.extend(children
+                           if children
+                           else [entry])
+
+    return entries
+
+
+def balance_entries(entries: List[TreeEntry], count: int) -> List[Shard]:
+    """Distribute entries into at most `count` shards of similar weight.
+
+    Uses the longest-processing-time heuristic: heaviest entries are assigned
+    first, each to the currently lightest shard.
+
+    Args:
+        entries (List[TreeEntry]): The entries to distribute.
+        count (int): The maximum number of shards.
+
+    Returns:
+        List[Shard]: The non-empty shards.
+    """
+    heap = [(0, index) for index in range(max(count, 1))]
+    buckets: List[List[TreeEntry]] = [[] for _ in heap]
+
+    for entry in sorted(entries, key=lambda item: item.weight, reverse=True):
+        load, index = heapq.heappop(heap)
+        buckets[index].append(entry)
+        heapq.heappush(heap, (load + entry.weight, index))
+
+    return [Shard([entry.path for entry in bucket],
+                  sum(entry.size for entry in bucket),
+                  sum(entry.files for entry in bucket))
+            for bucket in buckets
+            if bucket]
+
+
+def plan_shards(root: str, count: int, max_depth: int = 3) -> List[Shard]:
+    """Split a local source tree into `count` balanced shards.
+
+    Args:
+        root (str): The source root directory.
+        count (int): The maximum number of shards.
+        max_depth (int, optional): How many levels deep directories can be split.
+            Defaults to 3.
+
+    Returns:
+        List[Shard]: The non-empty shards.
+    """
+    return balance_entries(split_entries(root, count, max_depth), count)
@@ -0,0 +1,107 @@
+"""Parses the transfer statistics printed by `rsync --stats` for sysrsync."""
+from typing import Iterable, NamedTuple, Optional
+
+from sysrsync.helpers.progress import parse_size
+
+STATS_OPTIONS = ['--stats']
+
+_COUNT_LABELS = {
+    'Number of files': 'files',
+    'Number of created files': 'created_files',
+    'Number of deleted files': 'deleted_files',
+    'Number of regular files transferred': 'transferred_files',
+    'Number of files transferred': 'transferred_files',
+    'Total file size': 'total_size',
+    'Total transferred file size': 'transferred_size',
+    'Literal data': 'literal_data',
+    'Matched data': 'matched_data',
+    'File list size': 'file_list_size',
+    'Total bytes sent': 'bytes_sent',
+    'Total bytes received': 'bytes_received',
+}
+
+_TIME_LABELS = {
+    'File list generation time': 'file_list_generation_time',
+    'File list transfer time': 'file_list_transfer_time',
+}
+
+
+class RsyncStats(NamedTuple):
+    """Transfer statistics of one rsync run. Fields rsync did not report are None."""
+
+    files: Optional[int] = None
+    created_files: Optional[int] = None
+    deleted_files: Optional[int] = None
+    transferred_files: Optional[int] = None
+    total_size: Optional[int] = None
+    transferred_size: Optional[int] = None
+    literal_data: Optional[int] = None
+    matched_data: Optional[int] = None
+    file_list_size: Optional[int] = None
+    file_list_generation_time: Optional[float] = None
+    file_list_transfer_time: Optional[float] = None
+    bytes_sent: Optional[int] = None
+    bytes_received: Optional[int] = None
+    speedup: Optional[float] = None
+
+    @property
+    def delta_efficiency(self) -> Optional[float]:
+        """Fraction of the transferred data that the delta algorithm matched instead of sending."""
+        if self.literal_data is None or self.matched_data is None:
+            return None
+        total = self.literal_data + self.matched_data
+
+        return self.matched_data / total if total else None
+
+
+def parse_stats(lines: Iterable[str]) -> RsyncStats:
+    """Parse the `--stats` summary out of rsync's output.
+
+    Every line is consumed but only the statistics are kept, so the output can be
+    streamed through this function.
+
+    Args:
+        lines (Iterable[str]): rsync's output lines.
+
+    Returns:
+        RsyncStats: The parsed statistics.
+    """
+    values = {}
+    for line in lines:
+        label, _, value = line.partition(': ')
+        if label in _COUNT_LABELS and value:
+            values[_COUNT_LABELS[label]] = parse_size(value.split()[0])
+        elif label in _TIME_LABELS and value:
+            values[_TIME_LABELS[label]] = float(value.split()[0])
+        elif line.startswith('total size is ') and 'speedup is ' in line:
+            values['speedup'] = float(line.rpartition('speedup is ')[2].split()[0].replace(',', ''))
+
+    return RsyncStats(**values)
+
+
+def merge_stats(stats: Iterable[Optional[RsyncStats]]) -> RsyncStats:
+    """Add up the statistics of several rsync runs into one.
+
+    Counts, sizes and times are summed over the runs that reported them. The
+    speedup is recomputed from the summed sizes.
+
+    Args:
+        stats (Iterable[Optional[RsyncStats]]): The statistics of each run, None for
+            runs without statistics.
+
+    Returns:
+        RsyncStats: The combined statistics.
+    """
+    values = {}
+    for run_stats in stats:
+        if run_stats is None:
+            continue
+        for field, value in run_stats._asdict().items():
+            if field != 'speedup' and value is not None:
+                values[field] = values.get(field, 0) + value
+
+    sent = values.get('bytes_sent', 0) + values.get('bytes_received', 0)
+    if 'total_size' in values and sent:
+        values['speedup'] = values['total_size'] / sent
+
+    return RsyncStats(**values)
@@ -0,0 +1,226 @@
+"""File system watchers used by sysrsync's watch mode."""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from typing import Dict, Optional, Set, Tuple
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+               | _IN_CREATE | _IN_DELETE)
+_EVENT_HEADER = struct.Struct('iIII')
+
+# Relative path reported when individual changes were lost and the whole tree
+# must be synced.
+ROOT = '.'
+
+
+class PollingWatcher:
+    """Detects changes under a directory by comparing periodic `os.scandir` snapshots.
+
+    Reports created, modified and removed files, and created and removed
+    directories, as paths relative to the root.
+
+    Args:
+        root (str): The directory to watch.
+        interval (float, optional): Seconds between snapshots. Defaults to 1.0.
+    """
+
+    def __init__(self, root: str, interval: float = 1.0):
+        """Take the initial snapshot."""
+        self.root = root
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def wait(self, timeout: Optional[float] = None) -> Set[str]:
+        """Wait up to `timeout` seconds, or forever if None, for changes.
+
+        Args:
+            timeout (Optional[float], optional): Seconds to wait. Defaults to None.
+
+        Returns:
+            Set[str]: The changed paths, or an empty set if the timeout expired.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self._scan()
+            changes = {path
+                       for path in self._snapshot.keys() | snapshot.keys()
+                       if self._changed(self._snapshot.get(path), snapshot.get(path))}
+            self._snapshot = snapshot
+            if changes:
+                return changes
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return set()
+            time.sleep(self.interval if remaining is None else min(self.interval, remaining))
+
+    def close(self):
+        """Release the watcher. Polling holds no resources."""
+
+    @staticmethod
+    def _changed(before: Optional[Tuple], after: Optional[Tuple]) -> bool:
+        if before is None or after is None:
+            return before != after
+        if before[0] or after[0]:
+            # directories only matter when created, removed or replaced by a file
+            return before[0] != after[0]
+
+        return before != after
+
+    def _scan(self) -> Dict[str, Tuple]:
+        snapshot = {}
+        stack = ['']
+        while stack:
+            relative = stack.pop()
+            try:
+                with os.scandir(os.path.join(self.root, relative)) as iterator:
+                    for entry in iterator:
+                        path = os.path.join(relative, entry.name)
+                        entry_stat = entry.stat(follow_symlinks=False)
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        snapshot[path] = (is_dir, entry_stat.st_size, entry_stat.st_mtime_ns, entry_stat.st_ino)
+                        if is_dir:
+                            stack.append(path)
+            except FileNotFoundError:
+                continue
+
+        return snapshot
+
+
+class InotifyWatcher:
+    """Detects changes under a directory with Linux inotify, watching every subdirectory.
+
+    Reports the same kind of paths as `PollingWatcher`. When the kernel event
+    queue overflows, `ROOT` is reported so the whole tree gets synced.
+
+    Args:
+        root (str): The directory to watch.
+
+    Raises:
+        OSError: If inotify is not available.
+    """
+
+    def __init__(self, root: str):
+        """Create the inotify instance and watch every directory under root."""
+        library = ctypes.util.find_library('c')
+        self._libc = ctypes.CDLL(library, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError('inotify is not available')
+
+        self.root = root
+        self._fd = self._libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._directories: Dict[int, str] = {}
+        self._watch_tree('')
+
+    def wait(self, timeout: Optional[float] = None) -> Set[str]:
+        """Wait up to `timeout` seconds, or forever if None, for changes.
+
+        Args:
+            timeout (Optional[float], optional): Seconds to wait. Defaults to None.
+
+        Returns:
+            Set[str]: The changed paths, or an empty set if the timeout expired.
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changes = set()
+        while True:
+            try:
+                buffer = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            changes |= self._parse_events(buffer)
+
+        return changes
+
+    def close(self):
+        """Close the inotify instance."""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _parse_events(self, buffer: bytes) -> Set[str]:
+        changes = set()
+        offset = 0
+        while offset < len(buffer):
+            watch, mask, _, length = _EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(buffer[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & _IN_Q_OVERFLOW:
+                changes.add(ROOT)
+                continue
+            if mask & _IN_IGNORED:
+                self._directories.pop(watch, None)
+                continue
+            if watch not in self._directories or not name:
+                continue
+
+            path = os.path.join(self._directories[watch], name)
+            if mask & _IN_ISDIR:
+                if mask & (_IN_CREATE | _IN_MOVED_TO):
+                    self._watch_tree(path)
+                elif not mask & (_IN_DELETE | _IN_MOVED_FROM):
+                    continue
+            changes.add(path)
+
+        return changes
+
+    def _watch_tree(self, relative: str):
+        stack = [relative]
+        while stack:
+            current = stack.pop()
+            absolute = os.path.join(self.root, current)
+            watch = self._libc.inotify_add_watch(self._fd, os.fsencode(absolute), _WATCH_MASK)
+            if watch < 0:
+                continue
+            self._directories[watch] = current
+            try:
+                with os.scandir(absolute) as iterator:
+                    stack.extend(os.path.join(current, entry.name)
+                                 for entry in iterator
+                                 if entry.is_dir(follow_symlinks=False))
+            except FileNotFoundError:
+                continue
+
+
+def get_watcher(root: str, use_inotify: Optional[bool] = None, interval: float = 1.0):
+    """Create the best watcher available for a directory.
+
+    Args:
+        root (str): The directory to watch.
+        use_inotify (Optional[bool], optional): Force (True) or disable (False)
+            inotify. By default inotify is used when available.
+        interval (float, optional): Seconds between snapshots of the polling
+            watcher. Defaults to 1.0.
+
+    Returns:
+        Union[InotifyWatcher, PollingWatcher]: The watcher.
+    """
+    if use_inotify is False:
+        return PollingWatcher(root, interval)
+
+    try:
+        return InotifyWatcher(root)
+    except (OSError, AttributeError, TypeError):
+        if use_inotify is True:
+            raise
+        return PollingWatcher(root, interval)
@@ -0,0 +1,113 @@
+"""Records the throughput of past syncs per host pair, to estimate how long a sync will take."""
+import json
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from sysrsync.helpers.directories import get_remote_host
+
+DEFAULT_HISTORY_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'sysrsync', 'throughput.json')
+DEFAULT_SAMPLES = 20
+LOCAL_HOST = 'local'
+
+
+def get_host_pair(kwargs: Dict[str, Any]) -> Tuple[str, str]:
+    """Derive the source and destination hosts of a sync.
+
+    Args:
+        kwargs (Dict[str, Any]): The sync's `get_rsync_command` arguments.
+
+    Returns:
+        Tuple[str, str]: The host of each side, without the user and port parts, or
+            `local` for local paths. Daemon paths given directly, such as
+            `rsync://host/module`, are on their daemon's host.
+    """
+    return (get_remote_host(kwargs.get('source', ''), kwargs.get('source_ssh'), kwargs.get('source_daemon'))
+            or LOCAL_HOST,
+            get_remote_host(kwargs.get('destination', ''), kwargs.get('destination_ssh'),
+                            kwargs.get('destination_daemon'))
+            or LOCAL_HOST)
+
+
+class ThroughputHistory:
+    """Keeps the bytes transferred and time taken by the last successful syncs between each pair of hosts.
+
+    Args:
+        path (str, optional): The JSON file the history is stored in. Defaults to
+            `~/.cache/sysrsync/throughput.json`.
+        samples (int, optional): How many syncs are kept per host pair. Defaults to 20.
+    """
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH, samples: int = DEFAULT_SAMPLES):
+        """Initialize the history, creating its directory if needed."""
+        self.path = path
+        self.samples = samples
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+    def record(self, source_host: str, destination_host: str, size: int, seconds: float):
+        """Record a sync, atomically replacing the stored history.
+
+        Args:
+            source_host (str): The source host, as returned by `get_host_pair`.
+            destination_host (str): The destination host.
+            size (int): The bytes transferred.
+            seconds (float): How long the transfer took.
+        """
+        if size <= 0 or seconds <= 0:
+            return
+
+        with self._lock:
+            history = self._load()
+            key = f'{source_host} -> {destination_host}'
+            history[key] = [*history.get(key, []), [size, seconds]][-self.samples:]
+
+            temporary_path = f'{self.path}.{os.getpid()}.tmp'
+            with open(temporary_path, 'w') as history_file:
+                json.dump(history, history_file)
+            os.replace(temporary_path, self.path)
+
+    def get_throughput(self, source_host: str, destination_host: str) -> Optional[float]:
+        """Return the recorded throughput between two hosts.
+
+        Args:
+            source_host (str): The source host, as returned by `get_host_pair`.
+            destination_host (str): The destination host.
+
+        Returns:
+            Optional[float]: Bytes per second over the kept syncs, or None if none was
+                recorded.
+        """
+        with self._lock:
+            samples = self._load().get(f'{source_host} -> {destination_host}', [])[-self.samples:]
+        if not samples:
+            return None
+
+        return sum(size for size, _ in samples) / sum(seconds for _, seconds in samples)
+
+    def estimate(self, source_host: str, destination_host: str, size: int) -> Optional[float]:
+        """Estimate how long transferring `size` bytes between two hosts takes.
+
+        Returns:
+            Optional[float]: The estimated seconds, or None if nothing was recorded for
+                the host pair.
+        """
+        throughput = self.get_throughput(source_host, destination_host)
+
+        return None if throughput is None else size / throughput
+
+    def clear(self):
+        """Forget every recorded sync."""
+        with self._lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, 'r') as history_file:
+                return json.load(history_file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
@@ -0,0 +1,245 @@
+"""Hooks observing each `sysrsync.run` call, with per-phase timings and a metrics collector."""
+import bisect
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from sysrsync.helpers.progress import ProgressEvent
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0, 300.0, 3600.0)
+
+_hooks: List['Hook'] = []
+
+
+class Hook:
+    """Receives the events of `sysrsync.run` calls. Override the methods of interest.
+
+    Hooks are called synchronously from the thread running rsync, so they should
+    return quickly. Exceptions raised by a hook propagate to the caller of `run`.
+    """
+
+    def on_start(self, trace: 'RunTrace'):
+        """Called when `run` is entered, before the command is built."""
+
+    def on_spawned(self, trace: 'RunTrace'):
+        """Called once the rsync process started, with its `pid` set on the trace."""
+
+    def on_progress(self, trace: 'RunTrace', event: ProgressEvent):
+        """Called for each `--info=progress2` update rsync prints."""
+
+    def on_finished(self, trace: 'RunTrace', process):
+        """Called when `run` returns, including when rsync exited non-zero without `strict`."""
+
+    def on_failed(self, trace: 'RunTrace', error: BaseException):
+        """Called when `run` raises, whether building the command, spawning or checking the exit code."""
+
+
+class RunTrace:
+    """Timings of one `sysrsync.run` call, shared by the hooks observing it.
+
+    Phases are timed with a monotonic clock: `build` for tuning and command
+    construction, `key_validation` for checking the private key and building the
+    remote shell command, `prepare` for filter files, the digest scan and cache
+    fingerprints, `spawn` until the rsync process exists and `transfer` until it
+    exits. With `--stats`, `file_list` holds the time rsync reports building its
+    file list, which is part of `transfer`. Waits between retries are timed as `backoff`, and retries add
+    to the `spawn` and `transfer` phases.
+
+    Attributes:
+        hooks (List[Hook]): The hooks the events are sent to.
+        cwd (str): The working directory of the run.
+        command (Optional[List[str]]): The rsync command, once built.
+        pid (Optional[int]): The id of the last rsync process spawned.
+        started_at (float): Monotonic time the run started.
+        timings (Dict[str, float]): Seconds spent in each phase.
+    """
+
+    __slots__ = ('hooks', 'cwd', 'command', 'pid', 'started_at', 'timings', '_mark')
+
+    def __init__(self, hooks: List[Hook], cwd: str):
+        """Start timing a run."""
+        self.hooks = hooks
+        self.cwd = cwd
+        self.command: Optional[List[str]] = None
+        self.pid: Optional[int] = None
+        self.started_at = time.monotonic()
+        self.timings: Dict[str, float] = {}
+        self._mark = self.started_at
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the run started."""
+        return time.monotonic() - self.started_at
+
+    def mark(self, phase: str):
+        """End a phase, adding the time since the previous mark to it."""
+        now = time.monotonic()
+        self.timings[phase] = self.timings.get(phase, 0.0) + now - self._mark
+        self._mark = now
+
+    def add(self, phase: str, seconds: float):
+        """Add time measured elsewhere to a phase, without ending the current one."""
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+
+    def emit(self, event: str, *args):
+        """Call `on_<event>` on every hook."""
+        for hook in self.hooks:
+            getattr(hook, f'on_{event}')(self, *args)
+
+
+def add_hook(hook: Hook):
+    """Register a hook observing every `sysrsync.run` call.
+
+    Args:
+        hook (Hook): The hook.
+    """
+    _hooks.append(hook)
+
+
+def remove_hook(hook: Hook):
+    """Unregister a hook added with `add_hook`.
+
+    Args:
+        hook (Hook): The hook.
+    """
+    _hooks.remove(hook)
+
+
+def start_trace(hooks: Optional[Iterable[Hook]], cwd: str) -> Optional[RunTrace]:
+    """Start tracing a run, unless no hook would observe it.
+
+    Args:
+        hooks (Optional[Iterable[Hook]]): Hooks for this run only, besides the
+            registered ones.
+        cwd (str): The working directory of the run.
+
+    Returns:
+        Optional[RunTrace]: The trace, or None when there are no hooks.
+    """
+    if not _hooks and not hooks:
+        return None
+
+    return RunTrace([*_hooks, *(hooks or [])], cwd)
+
+
+class Histogram:
+    """Counts of observed values per bucket, with their sum and extremes."""
+
+    __slots__ = ('bounds', 'counts', 'count', 'total', 'minimum', 'maximum')
+
+    def __init__(self, bounds: Iterable[float] = LATENCY_BUCKETS):
+        """Initialize an empty histogram. The last bucket counts values above every bound."""
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+
+    def observe(self, value: float):
+        """Add a value."""
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        """Estimate a quantile as the upper bound of the bucket it falls in.
+
+        Args:
+            fraction (float): The quantile, between 0 and 1.
+
+        Returns:
+            Optional[float]: The estimate, capped to the maximum value observed, or
+                None if the histogram is empty.
+        """
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                bound = self.bounds[index] if index < len(self.bounds) else self.maximum
+                return min(bound, self.maximum)
+
+        return self.maximum
+
+    def get_summary(self) -> Dict[str, Optional[float]]:
+        """Summarize the histogram.
+
+        Returns:
+            Dict[str, Optional[float]]: Count, mean, minimum, median, 95th percentile
+                and maximum.
+        """
+        return {'count': self.count,
+                'mean': self.total / self.count if self.count else None,
+                'min': self.minimum,
+                'p50': self.quantile(0.5),
+                'p95': self.quantile(0.95),
+                'max': self.maximum}
+
+
+class MetricsCollector(Hook):
+    """Aggregates latency histograms per phase and transfer rates across runs.
+
+    Bytes per second are measured over the `transfer` phase, from the
+    `transferred_size` of runs with `stats=True`, or else from the last
+    `--info=progress2` update.
+
+    Example:
+        metrics = sysrsync.MetricsCollector()
+        sysrsync.add_hook(metrics)
+        sysrsync.run(source='/a', destination='/b', stats=True)
+        print(metrics.get_summary())
+    """
+
+    def __init__(self):
+        """Initialize a collector without observations."""
+        self.runs = 0
+        self.failures = 0
+        self.latencies: Dict[str, Histogram] = {}
+        self.rates = Histogram((2 ** power * 1024 for power in range(0, 32, 2)))
+        self._progress_bytes: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def on_progress(self, trace: RunTrace, event: ProgressEvent):
+        """Remember how many bytes the run has sent."""
+        self._progress_bytes[id(trace)] = event.bytes
+
+    def on_finished(self, trace: RunTrace, process):
+        """Record the timings and rate of a finished run."""
+        stats = getattr(process, 'stats', None)
+        sent = stats.transferred_size if stats is not None else None
+        self._record(trace, failed=process.returncode != 0, sent=sent)
+
+    def on_failed(self, trace: RunTrace, error: BaseException):
+        """Record the timings of a failed run."""
+        self._record(trace, failed=True, sent=None)
+
+    def get_summary(self) -> Dict[str, object]:
+        """Summarize the collected metrics.
+
+        Returns:
+            Dict[str, object]: Run and failure counts, a latency summary per phase
+                (including `total`), and a summary of the bytes per second.
+        """
+        with self._lock:
+            return {'runs': self.runs,
+                    'failures': self.failures,
+                    'latency': {phase: histogram.get_summary() for phase, histogram in self.latencies.items()},
+                    'bytes_per_second': self.rates.get_summary()}
+
+    def _record(self, trace: RunTrace, failed: bool, sent: Optional[int]):
+        elapsed = trace.elapsed
+        progress_bytes = self._progress_bytes.pop(id(trace), None)
+        sent = sent if sent is not None else progress_bytes
+        transfer_time = trace.timings.get('transfer')
+        with self._lock:
+            self.runs += 1
+            self.failures += failed
+            for phase, seconds in [*trace.timings.items(), ('total', elapsed)]:
+                self.latencies.setdefault(phase, Histogram()).observe(seconds)
+            if sent is not None and transfer_time:
+                self.rates.observe(sent / transfer_time)
@@ -0,0 +1,241 @@
+"""Splits a local source into a small-file lane and concurrent large-file lanes, each tuned for its load."""
+import os
+import re
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from sysrsync.helpers.directories import is_remote_directory, strip_trailing_slash
+from sysrsync.helpers.shards import TreeEntry, balance_entries
+from sysrsync.helpers.stats import merge_stats
+from sysrsync.history import get_host_pair
+from sysrsync.retry import merge_return_codes
+from sysrsync.runner import DRY_RUN_OPTIONS, _check_return_codes, _deletes_extraneous, run
+
+DEFAULT_THRESHOLD = 64 * 1024 * 1024
+LARGE_FILE_MODES = {
+    'whole-file': ['--whole-file'],
+    'inplace': ['--inplace'],
+    'delta': ['--no-whole-file'],
+}
+SMALL_FILE_LANE_OPTIONS = ['--recursive', '--inc-recursive']
+
+_WILDCARDS = re.compile(r'[*?[]')
+
+
+class SourceLanes(NamedTuple):
+    """The paths of a local source, relative to its transfer root, split by lane."""
+
+    small: List[str]
+    large: List[TreeEntry]
+
+
+class LanePolicy:
+    """How `sysrsync.run` splits a local source between a small-file lane and large-file lanes.
+
+    Files up to `threshold` bytes, directories and links go through a single rsync
+    tuned for the per-file metadata exchange, which walks the source itself with
+    incremental recursion and excludes the large files. Larger files are balanced
+    by size over `parallelism` rsyncs tuned for bulk data, running next to it, so
+    neither kind of file stalls behind the other.
+
+    Args:
+        threshold (int, optional): Size in bytes above which a file goes through the
+            large-file lanes. Defaults to 64 MiB.
+        parallelism (int, optional): Maximum number of large-file rsyncs. Defaults
+            to 4.
+        large_file_mode (str, optional): How large files are written: `whole-file`
+            sends them without the delta algorithm, `inplace` updates the destination
+            files directly and `delta` forces the delta algorithm. Defaults to
+            `whole-file`.
+        small_file_options (Optional[List[str]], optional): Options added to the
+            small-file lane. Defaults to `--no-compress`, since compressing many tiny
+            files costs more than it saves.
+        large_file_options (Optional[List[str]], optional): Options added to the
+            large-file lanes, after the ones of `large_file_mode`. Defaults to None.
+
+    Raises:
+        ValueError: If `large_file_mode` is not one of `whole-file`, `inplace` or
+            `delta`.
+    """
+
+    def __init__(self,
+                 threshold: int = DEFAULT_THRESHOLD,
+                 parallelism: int = 4,
+                 large_file_mode: str = 'whole-file',
+                 small_file_options: Optional[List[str]] = None,
+                 large_file_options: Optional[List[str]] = None):
+        """Initialize the lane policy."""
+        if large_file_mode not in LARGE_FILE_MODES:
+            raise ValueError(f'unknown large file mode "{large_file_mode}", '
+                             f'expected one of {", ".join(LARGE_FILE_MODES)}')
+        self.threshold = threshold
+        self.parallelism = parallelism
+        self.large_file_mode = large_file_mode
+        self.small_file_options = ['--no-compress'] if small_file_options is None else small_file_options
+        self.large_file_options = large_file_options or []
+
+    def classify(self, root: str, prefix: str = '') -> SourceLanes:
+        """Split the entries under a local directory by lane.
+
+        Args:
+            root (str): The transfer root.
+            prefix (str, optional): The directory under the root to classify, when
+                syncing the directory itself rather than its contents. Defaults to
+                the root.
+
+        Returns:
+            SourceLanes: The directories, links and small files, and the large files
+                with their size.
+        """
+        small = [prefix] if prefix else []
+        large = []
+        for path, size in self._walk(root, prefix):
+            if size is not None and size > self.threshold:
+                large.append(TreeEntry(path, size, 1, False))
+            else:
+                small.append(path)
+
+        return SourceLanes(small, large)
+
+    def find_large_files(self, root: str, prefix: str = '') -> List[TreeEntry]:
+        """Find the files above the threshold under a local directory, keeping only them in memory.
+
+        Args:
+            root (str): The transfer root.
+            prefix (str, optional): The directory under the root to search, when
+                syncing the directory itself rather than its contents. Defaults to
+                the root.
+
+        Returns:
+            List[TreeEntry]: The large files with their size.
+        """
+        return [TreeEntry(path, size, 1, False)
+                for path, size in self._walk(root, prefix)
+                if size is not None and size > self.threshold]
+
+    def _walk(self, root: str, prefix: str) -> Iterator[Tuple[str, Optional[int]]]:
+        stack = [prefix]
+        while stack:
+            relative = stack.pop()
+            with os.scandir(os.path.join(root, relative)) as iterator:
+                for entry in iterator:
+                    path = os.path.join(relative, entry.name) if relative else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(path)
+                        yield path, None
+                    elif entry.is_file(follow_symlinks=False):
+                        yield path, entry.stat(follow_symlinks=False).st_size
+                    else:
+                        yield path, None
+
+    def run(self, cwd=os.getcwd(), strict=True, verbose=False, stats=False, **kwargs) -> subprocess.CompletedProcess:
+        """Sync a local source through the small-file and large-file lanes concurrently.
+
+        Called by `sysrsync.run` when given `lanes`. The small-file lane syncs the
+        source with `--recursive --inc-recursive`, excluding the large files, so the
+        file list is built while transferring instead of being held up front. The
+        large-file lanes list their files through `--files-from` with
+        `--no-recursive`. Deletions are refused: the small-file lane would delete
+        the temporary files of the large-file lanes running next to it.
+
+        Args:
+            cwd (str, optional): The current working directory. Defaults to the current
+                directory.
+            strict (bool, optional): Whether to raise a single exception if any lane
+                returns a non-zero exit code. Defaults to True.
+            verbose (bool, optional): Whether to print the rsync commands before
+                executing them. Defaults to False.
+            stats (bool, optional): Whether to set the combined `--stats` of the lanes
+                in the `stats` attribute of the returned process. Defaults to False.
+            **kwargs: Additional options to be passed to the `sysrsync.run` function of
+                each lane, except `history`, which records a single sample of the
+                combined bytes over the time all the lanes took.
+
+        Returns:
+            subprocess.CompletedProcess: A process object whose `args` are the commands
+                of every lane and whose `returncode` merges their exit codes.
+
+        Raises:
+            ValueError: If the source is remote, if `cache`, `digests`, `files_from` or
+                a file `output` is given, if a `--del` or `--delete*` option is given,
+                or if the `inplace` large file mode is combined with a `retry` policy
+                using a partial directory.
+        """
+        if is_remote_directory(kwargs['source'], kwargs.get('source_ssh'), kwargs.get('source_daemon')):
+            raise ValueError('size-aware lanes require a local source')
+        if any(kwargs.get(name) is not None for name in ('cache', 'digests', 'files_from')):
+            raise ValueError('size-aware lanes cannot be combined with cache, digests or files_from')
+        if isinstance(kwargs.get('output'), str):
+            raise ValueError('size-aware lanes can only write their output to a callback')
+        if _deletes_extraneous(kwargs.get('options') or []):
+            raise ValueError('size-aware lanes cannot delete destination files: '
+                             'the small-file lane would delete the files the large-file lanes are writing')
+        retry = kwargs.get('retry')
+        if self.large_file_mode == 'inplace' and retry is not None and '--partial-dir' in retry.get_options():
+            raise ValueError('rsync refuses --inplace with the retry policy\'s --partial-dir: '
+                             'use RetryPolicy(partial_dir=None) or another large file mode')
+
+        source = os.path.join(cwd, kwargs['source'])
+        if not os.path.isdir(source):
+            return run(cwd=cwd, strict=strict, verbose=verbose, stats=stats, **kwargs)
+
+        root, prefix = source, ''
+        if kwargs.get('sync_source_contents', True) is False:
+            root, prefix = os.path.split(strip_trailing_slash(source))
+        large = self.find_large_files(root, prefix)
+        # the filters are read by every lane
+        kwargs.update({name: list(kwargs[name])
+                       for name in ('inclusions_from', 'exclusions_from')
+                       if kwargs.get(name) is not None})
+
+        options = kwargs.get('options') or []
+        lane_kwargs = [{'source': kwargs['source'],
+                        'sync_source_contents': kwargs.get('sync_source_contents', True),
+                        'exclusions_from': [*(kwargs.get('exclusions_from') or []),
+                                            *(_get_exclusion(entry.path) for entry in large)],
+                        'options': [*options, *SMALL_FILE_LANE_OPTIONS, *self.small_file_options]}]
+        lane_kwargs.extend({'files_from': shard.paths,
+                            'options': [*options, '--no-recursive', *LARGE_FILE_MODES[self.large_file_mode],
+                                        *self.large_file_options]}
+                           for shard in balance_entries(large, self.parallelism))
+
+        if verbose is True:
+            print(f'[sysrsync lanes] small files in 1 lane, '
+                  f'{len(large)} large files in {len(lane_kwargs) - 1} lanes')
+
+        history = kwargs.get('history')
+
+        def run_lane(lane: dict) -> subprocess.CompletedProcess:
+            return run(cwd=cwd, strict=False, verbose=verbose, stats=stats or history is not None,
+                       **{**kwargs, 'source': root, 'sync_source_contents': True, 'history': None, **lane})
+
+        started_at = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(lane_kwargs)) as executor:
+            processes = list(executor.map(run_lane, lane_kwargs))
+        elapsed = time.monotonic() - started_at
+
+        if strict is True:
+            _check_return_codes(processes, 'lanes')
+
+        process = subprocess.CompletedProcess(args=[process.args for process in processes],
+                                              returncode=merge_return_codes(process.returncode
+                                                                            for process in processes))
+        if stats is True or history is not None:
+            process.stats = merge_stats(getattr(process, 'stats', None) for process in processes)
+
+        # the lanes overlap, so their throughput is recorded once, over the wall time of all of them
+        if (history is not None and process.returncode == 0
+                and not DRY_RUN_OPTIONS.intersection(kwargs.get('options') or [])):
+            history.record(*get_host_pair(kwargs), process.stats.transferred_size or 0, elapsed)
+
+        return process
+
+
+def _get_exclusion(path: str) -> str:
+    # rsync only honours backslash escapes in patterns holding a wildcard
+    if _WILDCARDS.search(path):
+        path = re.sub(r'([*?[\\])', r'\\\1', path)
+
+    return f'/{path}'
@@ -0,0 +1,169 @@
+"""Lists local or remote trees with `rsync --list-only`, streaming typed entries."""
+import os
+import subprocess
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sysrsync.helpers.directories import get_directory_with_daemon, get_directory_with_ssh
+from sysrsync.helpers.listing import ListEntry, parse_list_line
+from sysrsync.helpers.progress import iter_lines
+from sysrsync.helpers.rsync import get_rsh_command
+from sysrsync.runner import _check_return_code
+
+
+class ListingCache:
+    """Keeps listings in memory for `ttl` seconds, per host, path and listing options.
+
+    Args:
+        ttl (float, optional): Seconds a listing is reused for. Defaults to 60.0.
+    """
+
+    def __init__(self, ttl: float = 60.0):
+        """Initialize an empty cache."""
+        self.ttl = ttl
+        self._listings: Dict[Tuple, Tuple[float, List[ListEntry]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[List[ListEntry]]:
+        """Return the listing recorded for a key, unless it expired."""
+        with self._lock:
+            listing = self._listings.get(key)
+            if listing is None or listing[0] < time.monotonic():
+                self._listings.pop(key, None)
+                return None
+
+            return listing[1]
+
+    def record(self, key: Tuple, entries: List[ListEntry]):
+        """Record a complete listing."""
+        with self._lock:
+            self._listings[key] = (time.monotonic() + self.ttl, entries)
+
+    def invalidate(self, path: str, ssh: Optional[str] = None):
+        """Forget every listing of a path on a host, such as after syncing to it."""
+        with self._lock:
+            for key in [key for key in self._listings if key[:2] == (ssh, path)]:
+                del self._listings[key]
+
+    def clear(self):
+        """Forget every listing."""
+        with self._lock:
+            self._listings.clear()
+
+
+def get_list_command(path: str,
+                     ssh: Optional[str] = None,
+                     recursive: bool = True,
+                     daemon: Optional[str] = None,
+                     options: Optional[Iterable[str]] = None,
+                     private_key: Optional[str] = None,
+                     rsh_port: Optional[int] = None,
+                     strict_host_key_checking: Optional[bool] = None,
+                     ssh_options: Optional[Dict[str, str]] = None,
+                     password_file: Optional[str] = None) -> List[str]:
+    """Generate an rsync command listing a path.
+
+    Args:
+        path (str): The path to list. With a trailing slash, a directory's contents
+            are listed; without it, the directory itself.
+        ssh (Optional[str], optional): The SSH prefix of the host the path is on.
+            Defaults to None.
+        recursive (bool, optional): Whether to list subdirectories. Defaults to True.
+        daemon (Optional[str], optional): The rsync daemon serving the path. Defaults
+            to None.
+        options (Optional[Iterable[str]], optional): Additional rsync options. Defaults
+            to None.
+        private_key (Optional[str], optional): The path to the private key file for SSH
+            authentication. Defaults to None.
+        rsh_port (Optional[int], optional): The port number to use for the SSH
+            connection. Defaults to None.
+        strict_host_key_checking (Optional[bool], optional): Whether to perform strict
+            host key checking. Defaults to None.
+        ssh_options (Optional[Dict[str, str]], optional): Additional ssh options for the
+            rsh command. Defaults to None.
+        password_file (Optional[str], optional): The file holding the rsync daemon
+            password. Defaults to None.
+
+    Returns:
+        List[str]: The rsync command.
+    """
+    rsh = (get_rsh_command(private_key, rsh_port, strict_host_key_checking, ssh_options)
+           if any((private_key, rsh_port, (strict_host_key_checking is not None), ssh_options))
+           else [])
+
+    return ['rsync',
+            '--list-only',
+            *(['--recursive'] if recursive else []),
+            *(options or []),
+            *([f'--password-file={password_file}'] if password_file is not None else []),
+            *rsh,
+            get_directory_with_daemon(get_directory_with_ssh(path, ssh), daemon)]
+
+
+def list_files(path: str,
+               ssh: Optional[str] = None,
+               recursive: bool = True,
+               cache: Optional[ListingCache] = None,
+               cwd: str = os.getcwd(),
+               strict: bool = True,
+               verbose: bool = False,
+               **kwargs) -> Iterator[ListEntry]:
+    """List a local or remote path, yielding entries while rsync is still listing.
+
+    If the consumer stops iterating before rsync exits, the rsync process is
+    terminated.
+
+    Args:
+        path (str): The path to list. With a trailing slash, a directory's contents
+            are listed; without it, the directory itself.
+        ssh (Optional[str], optional): The SSH prefix of the host the path is on.
+            Defaults to None.
+        recursive (bool, optional): Whether to list subdirectories. Defaults to True.
+        cache (Optional[ListingCache], optional): Reuses complete listings of the same
+            host, path and options until they expire. Defaults to None.
+        cwd (str, optional): The current working directory. Defaults to the current
+            directory.
+        strict (bool, optional): Whether to raise an exception if the rsync command
+            returns a non-zero exit code. Defaults to True.
+        verbose (bool, optional): Whether to print the rsync command before executing
+            it. Defaults to False.
+        **kwargs: Additional options to be passed to the `get_list_command` function.
+
+    Yields:
+        ListEntry: Each listed file, directory or link.
+    """
+    key = (ssh or kwargs.get('daemon'), path, recursive, tuple(kwargs.get('options') or ()))
+    if cache is not None:
+        entries = cache.get(key)
+        if entries is not None:
+            yield from entries
+            return
+
+    rsync_command = get_list_command(path, ssh, recursive, **kwargs)
+    rsync_string = ' '.join(rsync_command)
+
+    if verbose is True:
+        print(f'[sysrsync runner] running command on "{cwd}":')
+        print(rsync_string)
+
+    entries = []
+    with subprocess.Popen(rsync_command, cwd=cwd, shell=False, stdout=subprocess.PIPE) as process:
+        finished = False
+        try:
+            for line in iter_lines(process.stdout):
+                entry = parse_list_line(line)
+                if entry is not None:
+                    if cache is not None:
+                        entries.append(entry)
+                    yield entry
+            finished = True
+        finally:
+            if not finished and process.poll() is None:
+                process.terminate()
+
+    if strict is True:
+        _check_return_code(process.returncode, rsync_string)
+
+    if cache is not None and process.returncode == 0:
+        cache.record(key, entries)
@@ -0,0 +1,262 @@
+"""Migrates huge local trees subtree by subtree, journaling finished subtrees so restarts resume."""
+import inspect
+import os
+import sqlite3
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sysrsync.cache import ManifestCache
+from sysrsync.command_maker import get_rsync_command
+from sysrsync.helpers.directories import is_remote_directory, strip_trailing_slash
+from sysrsync.helpers.shards import TreeEntry, scan_entries, split_entries
+from sysrsync.retry import merge_return_codes
+from sysrsync.runner import _check_return_codes, run
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+_COMMAND_KEYS = set(inspect.signature(get_rsync_command).parameters)
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS migration (
+    key TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS subtrees (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    files INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    state TEXT NOT NULL,
+    return_code INTEGER,
+    updated_at REAL NOT NULL
+);
+'''
+
+
+class MigrationProgress(NamedTuple):
+    """How far a migration got, by subtree, file and byte."""
+
+    subtrees: int
+    done: int
+    running: int
+    failed: int
+    pending: int
+    files: int
+    files_done: int
+    size: int
+    size_done: int
+
+
+class MigrationJournal:
+    """Records the subtrees of a migration and which of them finished, in a SQLite database.
+
+    Every state change is committed before the next subtree starts, so after a
+    crash the journal tells which subtrees were fully synced. The journal can be
+    opened by another thread or process to query progress while a migration runs.
+
+    Args:
+        path (str): The path to the journal database.
+    """
+
+    def __init__(self, path: str):
+        """Open the journal, creating it if needed."""
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.executescript(_SCHEMA)
+
+    def __enter__(self):
+        """Return the journal."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close the journal."""
+        self.close()
+
+    def close(self):
+        """Close the database connection."""
+        self._connection.close()
+
+    def bind(self, key: str):
+        """Tie the journal to a migration, identified by its cache key.
+
+        Args:
+            key (str): The key of the migration's rsync command.
+
+        Raises:
+            ValueError: If the journal already belongs to another migration.
+        """
+        with self._lock, self._connection:
+            row = self._connection.execute('SELECT key FROM migration').fetchone()
+            if row is None:
+                self._connection.execute('INSERT INTO migration (key) VALUES (?)', (key,))
+            elif row[0] != key:
+                raise ValueError(f'{self.path} journals another migration')
+
+    def get_paths(self) -> List[str]:
+        """Return the paths of the recorded subtrees."""
+        with self._lock:
+            return [path for path, in self._connection.execute('SELECT path FROM subtrees ORDER BY path')]
+
+    def plan(self, subtrees: Dict[str, Tuple[TreeEntry, str]]) -> List[str]:
+        """Record the current subtrees, keeping finished ones whose fingerprint did not change.
+
+        Args:
+            subtrees (Dict[str, Tuple[TreeEntry, str]]): Each subtree's entry and
+                fingerprint, by path relative to the source.
+
+        Returns:
+            List[str]: The paths of the subtrees left to sync.
+        """
+        with self._lock, self._connection:
+            finished = dict(self._connection.execute('SELECT path, fingerprint FROM subtrees WHERE state = ?',
+                                                     (DONE,)))
+            pending = sorted(path for path, (_, fingerprint) in subtrees.items()
+                             if finished.get(path) != fingerprint)
+            self._connection.execute('DELETE FROM subtrees')
+            self._connection.executemany(
+                'INSERT INTO subtrees (path, size, files, fingerprint, state, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+                ((path, entry.size, entry.files, fingerprint, DONE if finished.get(path) == fingerprint else PENDING,
+                  time.time())
+                 for path, (entry, fingerprint) in subtrees.items()))
+
+        return pending
+
+    def mark(self, path: str, state: str, return_code: Optional[int] = None):
+        """Record the state of a subtree."""
+        with self._lock, self._connection:
+            self._connection.execute('UPDATE subtrees SET state = ?, return_code = ?, updated_at = ? WHERE path = ?',
+                                     (state, return_code, time.time(), path))
+
+    def get_progress(self) -> MigrationProgress:
+        """Summarize the state of every subtree.
+
+        Returns:
+            MigrationProgress: The number of subtrees in each state, and the files and
+                bytes of the finished ones against the totals.
+        """
+        with self._lock:
+            rows = self._connection.execute('SELECT state, size, files FROM subtrees').fetchall()
+
+        states = [state for state, _, _ in rows]
+        return MigrationProgress(subtrees=len(rows),
+                                 done=states.count(DONE),
+                                 running=states.count(RUNNING),
+                                 failed=states.count(FAILED),
+                                 pending=states.count(PENDING),
+                                 files=sum(files for _, _, files in rows),
+                                 files_done=sum(files for state, _, files in rows if state == DONE),
+                                 size=sum(size for _, size, _ in rows),
+                                 size_done=sum(size for state, size, _ in rows if state == DONE))
+
+
+def migrate(journal: str,
+            cwd=os.getcwd(),
+            strict=True,
+            verbose=False,
+            parallelism=1,
+            subtrees=256,
+            max_depth=3,
+            **kwargs):
+    """Sync a huge local tree one subtree at a time, resuming from the journal after a failure.
+
+    The source is split into about `subtrees` subtrees of similar weight, each
+    fingerprinted by the path, size, modification time and inode of everything
+    under it. Subtrees the journal records as finished with the same fingerprint
+    are not synced again, so a restart only rescans what is unfinished or
+    changed. The split is recorded on the first run and reused afterwards, with
+    entries created since then becoming subtrees of their own. Each subtree is
+    synced by its own rsync through `--files-from`, so `--delete` only applies
+    inside the subtrees being synced.
+
+    Args:
+        journal (str): The path to the journal database, created on the first run.
+        cwd (str, optional): The current working directory. Defaults to the current
+            directory.
+        strict (bool, optional): Whether to raise an exception if any subtree failed.
+            Defaults to True.
+        verbose (bool, optional): Whether to print the rsync commands before executing
+            them. Defaults to False.
+        parallelism (int, optional): Number of subtrees synced concurrently. Defaults
+            to 1.
+        subtrees (int, optional): The number of subtrees to aim for. Defaults to 256.
+        max_depth (int, optional): How many levels deep heavy directories can be split
+            into subtrees. Defaults to 3.
+        **kwargs: Additional options to be passed to the `sysrsync.run` function.
+
+    Returns:
+        subprocess.CompletedProcess: A process object whose `args` are the commands of
+            the subtrees synced in this run and whose `returncode` merges their exit
+            codes, with the journal's `progress` at the end of the run.
+
+    Raises:
+        ValueError: If the source is remote or not a directory, or if the journal
+            belongs to another migration.
+    """
+    if is_remote_directory(kwargs['source'], kwargs.get('source_ssh'), kwargs.get('source_daemon')):
+        raise ValueError('migration requires a local source')
+
+    source = os.path.join(cwd, kwargs['source'])
+    if not os.path.isdir(source):
+        raise ValueError('migration requires a source directory')
+
+    root, prefix = source, ''
+    if kwargs.get('sync_source_contents', True) is False:
+        root, prefix = os.path.split(strip_trailing_slash(source))
+    tree = os.path.join(root, prefix)
+
+    rsync_command = get_rsync_command(**{key: value for key, value in kwargs.items() if key in _COMMAND_KEYS})
+    options = [*(kwargs.get('options') or []), '--recursive']
+
+    with MigrationJournal(journal) as migration_journal:
+        migration_journal.bind(ManifestCache.get_key(rsync_command, cwd))
+        recorded = migration_journal.get_paths()
+        entries = _replan(tree, recorded) if recorded else split_entries(tree, subtrees, max_depth)
+        pending = migration_journal.plan({entry.path: (entry, ManifestCache.fingerprint(os.path.join(tree, entry.path)))
+                                          for entry in entries})
+
+        if verbose is True:
+            print(f'[sysrsync migration] {len(pending)} subtrees left to sync from "{tree}"')
+
+        def sync_subtree(path: str) -> subprocess.CompletedProcess:
+            migration_journal.mark(path, RUNNING)
+            process = run(cwd=cwd, strict=False, verbose=verbose,
+                          files_from=[os.path.join(prefix, path)],
+                          **{**kwargs, 'source': root, 'sync_source_contents': True, 'options': options})
+            migration_journal.mark(path, DONE if process.returncode == 0 else FAILED, process.returncode)
+            return process
+
+        with ThreadPoolExecutor(max_workers=max(parallelism, 1)) as executor:
+            processes = list(executor.map(sync_subtree, pending))
+
+        progress = migration_journal.get_progress()
+
+    if strict is True:
+        _check_return_codes(processes, 'subtrees')
+
+    process = subprocess.CompletedProcess(args=[process.args for process in processes],
+                                          returncode=merge_return_codes(process.returncode for process in processes))
+    process.progress = progress
+    return process
+
+
+def _replan(tree: str, recorded: List[str]) -> List[TreeEntry]:
+    split_directories = {''}
+    for path in recorded:
+        parent = os.path.dirname(path)
+        while parent not in split_directories:
+            split_directories.add(parent)
+            parent = os.path.dirname(parent)
+
+    return [entry
+            for directory in sorted(split_directories)
+            if os.path.isdir(os.path.join(tree, directory))
+            for entry in scan_entries(tree, directory)
+            if entry.path not in split_directories]
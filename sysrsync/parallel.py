@@ -0,0 +1,89 @@
+"""Runs several rsync processes concurrently over shards of a local source tree."""
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from sysrsync.command_maker import get_rsync_command
+from sysrsync.helpers.directories import is_remote_directory, strip_trailing_slash
+from sysrsync.helpers.file_list import get_files_from_options, write_file_list
+from sysrsync.helpers.shards import plan_shards
+from sysrsync.retry import merge_return_codes
+from sysrsync.runner import _check_return_codes, run
+
+
+def run_parallel(parallelism: int, cwd=os.getcwd(), strict=True, verbose=False, max_depth=3, **kwargs):
+    """Run rsync as `parallelism` concurrent processes, each one syncing a shard of the source.
+
+    The local source tree is split into balanced shards, by top level entry
+    weighted by size and file count, and each shard is transferred by its own
+    rsync process through `--files-from`. Since every process only sees its own
+    shard, `--delete` only applies inside the directories a shard lists.
+
+    Args:
+        parallelism (int): The maximum number of concurrent rsync processes.
+        cwd (str, optional): The current working directory. Defaults to the current
+            directory.
+        strict (bool, optional): Whether to raise an exception if any of the rsync
+            processes returns a non-zero exit code. Defaults to True.
+        verbose (bool, optional): Whether to print the rsync commands before executing
+            them. Defaults to False.
+        max_depth (int, optional): How many levels deep heavy directories can be
+            split into smaller shards. Defaults to 3.
+        **kwargs: Additional options to be passed to the `get_rsync_command` function.
+
+    Returns:
+        subprocess.CompletedProcess: A process object whose `args` are the commands of
+            every shard and whose `returncode` merges their exit codes.
+
+    Raises:
+        ValueError: If the source is remote.
+    """
+    if is_remote_directory(kwargs['source'], kwargs.get('source_ssh'), kwargs.get('source_daemon')):
+        raise ValueError('parallel sync requires a local source')
+
+    source = os.path.join(cwd, kwargs['source'])
+    if parallelism <= 1 or os.path.isfile(source):
+        return run(cwd=cwd, strict=strict, verbose=verbose, **kwargs)
+
+    root, prefix = source, ''
+    if kwargs.get('sync_source_contents', True) is False:
+        root, prefix = os.path.split(strip_trailing_slash(source))
+
+    shards = plan_shards(os.path.join(root, prefix), parallelism, max_depth)
+    if len(shards) <= 1:
+        return run(cwd=cwd, strict=strict, verbose=verbose, **kwargs)
+
+    with tempfile.TemporaryDirectory(prefix='sysrsync-') as lists_dir:
+        commands = []
+        for index, shard in enumerate(shards):
+            files_from = os.path.join(lists_dir, f'shard-{index}')
+            write_file_list(files_from, (os.path.join(prefix, path) for path in shard.paths))
+            commands.append(_get_shard_command(root, files_from, kwargs))
+
+        if verbose is True:
+            print(f'[sysrsync parallel] running {len(commands)} commands on "{cwd}":')
+            for command in commands:
+                print(' '.join(command))
+
+        with ThreadPoolExecutor(max_workers=len(commands)) as executor:
+            processes = list(executor.map(lambda command: subprocess.run(command, cwd=cwd, shell=False),
+                                          commands))
+
+    return_code = merge_return_codes(process.returncode for process in processes)
+
+    if strict is True:
+        _check_return_codes(processes, 'shards')
+
+    return subprocess.CompletedProcess(args=commands, returncode=return_code)
+
+
+def _get_shard_command(root: str, files_from: str, kwargs: dict) -> List[str]:
+    options = [*(kwargs.get('options') or []), '--recursive', *get_files_from_options(files_from)]
+    shard_kwargs = {**kwargs,
+                    'source': root,
+                    'sync_source_contents': True,
+                    'options': options}
+
+    return get_rsync_command(**shard_kwargs)
@@ -0,0 +1,92 @@
+"""Plans a sync with a dry run, reporting what it would transfer and how long it would take."""
+import os
+from typing import List, NamedTuple, Optional
+
+from sysrsync.helpers.itemize import ITEMIZE_OPTIONS, ItemizedChange, parse_itemized_line
+from sysrsync.helpers.stats import RsyncStats
+from sysrsync.history import ThroughputHistory, get_host_pair
+from sysrsync.runner import run
+
+
+class ChangeSet(NamedTuple):
+    """What a sync would create, update and delete on the destination, each in rsync's order."""
+
+    new: List[ItemizedChange]
+    changed: List[ItemizedChange]
+    deleted: List[ItemizedChange]
+
+    @property
+    def transfer_size(self) -> int:
+        """Bytes of the new and changed files whose content would be sent, before delta matching."""
+        return sum(change.size for change in (*self.new, *self.changed) if change.transfers_data)
+
+    @property
+    def files_from(self) -> List[str]:
+        """The paths of the new, changed and deleted entries, to be passed as `files_from` to the real run."""
+        return [change.path for change in (*self.new, *self.changed, *self.deleted)]
+
+    @property
+    def options(self) -> List[str]:
+        """The options the real run needs next to `files_from`: `--delete-missing-args` when deleting entries."""
+        return ['--delete-missing-args'] if self.deleted else []
+
+
+class TransferPlan(NamedTuple):
+    """The changes of a planned sync, rsync's statistics for them and the estimated duration."""
+
+    changes: ChangeSet
+    stats: Optional[RsyncStats]
+    throughput: Optional[float]
+    estimated_duration: Optional[float]
+
+
+def plan(cwd=os.getcwd(), strict=True, verbose=False, history: Optional[ThroughputHistory] = None,
+         **kwargs) -> TransferPlan:
+    """Find out what a sync would do, with a `--dry-run --itemize-changes --stats` pass.
+
+    The change set can be passed to the real run as `files_from`, with the same
+    arguments plus the change set's `options`, so it only transfers what was planned
+    instead of comparing the trees again. Entries deleted because a `--delete`
+    option was given are listed too, and deleted through `--delete-missing-args`.
+    The paths are relative to the source directory, so the change set can only be
+    reused when syncing its contents, as by default, and not with
+    `sync_source_contents=False`.
+
+    Args:
+        cwd (str, optional): The current working directory. Defaults to the current
+            directory.
+        strict (bool, optional): Whether to raise an exception if the dry run returns
+            a non-zero exit code. Defaults to True.
+        verbose (bool, optional): Whether to print the rsync command before executing
+            it. Defaults to False.
+        history (Optional[ThroughputHistory], optional): The throughput of past runs,
+            recorded by passing it to `sysrsync.run`, used to estimate the duration
+            for the same host pair. Defaults to None.
+        **kwargs: Additional options to be passed to the `sysrsync.run` function,
+            except `stats` and `output`.
+
+    Returns:
+        TransferPlan: The change set, the dry run's statistics, and the throughput and
+            estimated duration for the host pair, which are None without history.
+    """
+    lines: List[str] = []
+    process = run(cwd=cwd, strict=strict, verbose=verbose, stats=True, output=lines.append,
+                  **{**kwargs, 'options': [*(kwargs.get('options') or []), '--dry-run', *ITEMIZE_OPTIONS]})
+
+    new, changed, deleted = [], [], []
+    for change in filter(None, map(parse_itemized_line, lines)):
+        if change.is_deleted:
+            deleted.append(change)
+        elif change.is_new:
+            new.append(change)
+        else:
+            changed.append(change)
+    changes = ChangeSet(new, changed, deleted)
+
+    throughput, estimated_duration = None, None
+    if history is not None:
+        throughput = history.get_throughput(*get_host_pair(kwargs))
+        if throughput is not None:
+            estimated_duration = changes.transfer_size / throughput
+
+    return TransferPlan(changes, getattr(process, 'stats', None), throughput, estimated_duration)
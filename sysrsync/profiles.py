@@ -0,0 +1,181 @@
+"""Pre-renders the invariant part of rsync commands, for dispatchers issuing many small syncs."""
+import os
+import subprocess
+from typing import Dict, Iterable, List, Optional
+
+from sysrsync.exceptions import RemotesError
+from sysrsync.helpers.directories import (get_directory_with_daemon, get_directory_with_ssh, is_daemon_path,
+                                          sanitize_trailing_slash)
+from sysrsync.helpers.rsync import get_exclusions, get_rsh_command
+from sysrsync.runner import _check_return_code
+
+
+class SyncProfile:
+    """The options shared by many syncs, validated and rendered once.
+
+    The rsh command, options and exclusions are rendered when the profile is
+    created, including the private key lookup, so each command only adds the
+    source and destination. `get_command` returns the same command as
+    `get_rsync_command` called with the profile's arguments. Profiles are
+    immutable and can be shared between threads.
+
+    Example:
+        profile = sysrsync.SyncProfile(destination_ssh='myserver', options=['-a'])
+        for source, destination in pairs:
+            profile.run(source, destination)
+
+    Args:
+        source_ssh (Optional[str], optional): The SSH prefix for the source. Defaults
+            to None.
+        destination_ssh (Optional[str], optional): The SSH prefix for the destination.
+            Defaults to None.
+        exclusions (Optional[Iterable[str]], optional): The exclusions to be applied
+            during synchronization. Defaults to None.
+        sync_source_contents (bool, optional): Whether to sync the contents of the
+            source directory. Defaults to True.
+        options (Optional[Iterable[str]], optional): Additional rsync options. Defaults
+            to None.
+        private_key (Optional[str], optional): The path to the private key file for SSH
+            authentication. Defaults to None.
+        rsh_port (Optional[int], optional): The port number to use for the SSH
+            connection. Defaults to None.
+        strict_host_key_checking (Optional[bool], optional): Whether to perform strict
+            host key checking. Defaults to None.
+        ssh_options (Optional[Dict[str, str]], optional): Additional ssh options for the
+            rsh command. Defaults to None.
+        source_daemon (Optional[str], optional): The rsync daemon serving the source,
+            as `[user@]host[:port]`. Defaults to None.
+        destination_daemon (Optional[str], optional): The rsync daemon serving the
+            destination, as `[user@]host[:port]`. Defaults to None.
+        password_file (Optional[str], optional): The file holding the rsync daemon
+            password. Defaults to None.
+
+    Raises:
+        RemotesError: If both sides are remote.
+        ValueError: If a side has both an SSH prefix and a daemon.
+        PrivateKeyError: If `private_key` does not exist.
+    """
+
+    __slots__ = ('source_ssh', 'destination_ssh', 'sync_source_contents', 'source_daemon', 'destination_daemon',
+                 'password_file', '_prefix', '_exclusions')
+
+    def __init__(self,
+                 source_ssh: Optional[str] = None,
+                 destination_ssh: Optional[str] = None,
+                 exclusions: Optional[Iterable[str]] = None,
+                 sync_source_contents: bool = True,
+                 options: Optional[Iterable[str]] = None,
+                 private_key: Optional[str] = None,
+                 rsh_port: Optional[int] = None,
+                 strict_host_key_checking: Optional[bool] = None,
+                 ssh_options: Optional[Dict[str, str]] = None,
+                 source_daemon: Optional[str] = None,
+                 destination_daemon: Optional[str] = None,
+                 password_file: Optional[str] = None):
+        """Validate the profile and render the invariant arguments."""
+        if ((source_ssh is not None or source_daemon is not None)
+                and (destination_ssh is not None or destination_daemon is not None)):
+            raise RemotesError()
+        if (source_ssh is not None and source_daemon is not None
+                or destination_ssh is not None and destination_daemon is not None):
+            raise ValueError('a path cannot be reached through both ssh and an rsync daemon')
+
+        rsh = (get_rsh_command(private_key, rsh_port, strict_host_key_checking, ssh_options)
+               if any((private_key, rsh_port, (strict_host_key_checking is not None), ssh_options))
+               else [])
+        password_options = [f'--password-file={password_file}'] if password_file is not None else []
+
+        initialize = object.__setattr__
+        initialize(self, 'source_ssh', source_ssh)
+        initialize(self, 'destination_ssh', destination_ssh)
+        initialize(self, 'sync_source_contents', sync_source_contents)
+        initialize(self, 'source_daemon', source_daemon)
+        initialize(self, 'destination_daemon', destination_daemon)
+        initialize(self, 'password_file', password_file)
+        initialize(self, '_prefix', ('rsync', *(options or []), *password_options, *rsh))
+        initialize(self, '_exclusions', tuple(get_exclusions(exclusions)) if exclusions else ())
+
+    def __setattr__(self, name, value):
+        """Refuse to modify the profile."""
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name):
+        """Refuse to modify the profile."""
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def get_command(self, source: str, destination: str, source_is_file: Optional[bool] = None) -> List[str]:
+        """Generate the rsync command syncing a source to a destination with the profile's options.
+
+        Args:
+            source (str): The source directory or file path.
+            destination (str): The destination directory or file path.
+            source_is_file (Optional[bool], optional): Whether a local source is a file,
+                when the caller already knows, to save a `stat`. Defaults to None, for
+                checking the file system as `get_rsync_command` does.
+
+        Returns:
+            List[str]: The rsync command.
+
+        Raises:
+            RemotesError: If both the source and the destination are remote.
+            ValueError: If `password_file` is set and neither path is a daemon path.
+        """
+        source_remote = self.source_ssh is not None or self.source_daemon is not None or is_daemon_path(source)
+        destination_remote = (self.destination_ssh is not None or self.destination_daemon is not None
+                              or is_daemon_path(destination))
+        if source_remote and destination_remote:
+            raise RemotesError()
+
+        source = get_directory_with_daemon(get_directory_with_ssh(source, self.source_ssh), self.source_daemon)
+        destination = get_directory_with_daemon(get_directory_with_ssh(destination, self.destination_ssh),
+                                                self.destination_daemon)
+        if self.password_file is not None and not (is_daemon_path(source) or is_daemon_path(destination)):
+            raise ValueError('password_file can only be used with an rsync daemon')
+
+        sync_source_contents = self.sync_source_contents
+        if sync_source_contents and not source_remote:
+            if source_is_file is None:
+                source_is_file = os.path.isfile(source)
+            sync_source_contents = not source_is_file
+
+        source, destination = sanitize_trailing_slash(source, destination, sync_source_contents)
+
+        return [*self._prefix, source, destination, *self._exclusions]
+
+    def run(self,
+            source: str,
+            destination: str,
+            cwd=os.getcwd(),
+            strict=True,
+            verbose=False,
+            source_is_file: Optional[bool] = None) -> subprocess.CompletedProcess:
+        """Sync a source to a destination with the profile's options.
+
+        Args:
+            source (str): The source directory or file path.
+            destination (str): The destination directory or file path.
+            cwd (str, optional): The current working directory. Defaults to the current
+                directory.
+            strict (bool, optional): Whether to raise an exception if the rsync command
+                returns a non-zero exit code. Defaults to True.
+            verbose (bool, optional): Whether to print the rsync command before executing
+                it. Defaults to False.
+            source_is_file (Optional[bool], optional): Whether a local source is a file,
+                as in `get_command`. Defaults to None.
+
+        Returns:
+            subprocess.CompletedProcess: The completed process object representing the
+                execution of the rsync command.
+        """
+        rsync_command = self.get_command(source, destination, source_is_file)
+
+        if verbose is True:
+            print(f'[sysrsync runner] running command on "{cwd}":')
+            print(' '.join(rsync_command))
+
+        process = subprocess.run(rsync_command, cwd=cwd, shell=False)
+
+        if strict is True:
+            _check_return_code(process.returncode, ' '.join(rsync_command))
+
+        return process
@@ -0,0 +1,146 @@
+"""Syncs between two remote hosts by running rsync on the source host, without staging locally."""
+import os
+import random
+import shlex
+import subprocess
+from typing import Dict, Iterable, List, Optional
+
+from sysrsync.helpers.directories import get_directory_with_ssh, sanitize_trailing_slash
+from sysrsync.helpers.rsync import get_exclusions, get_rsh_command
+from sysrsync.runner import _check_return_code
+
+MODES = ('direct', 'relay')
+RELAY_PORTS = (20000, 59999)
+
+
+def get_remote_to_remote_command(source: str,
+                                 destination: str,
+                                 source_ssh: str,
+                                 destination_ssh: str,
+                                 mode: str = 'direct',
+                                 forward_agent: bool = True,
+                                 remote_private_key: Optional[str] = None,
+                                 destination_port: Optional[int] = None,
+                                 relay_port: Optional[int] = None,
+                                 exclusions: Optional[Iterable[str]] = None,
+                                 sync_source_contents: bool = True,
+                                 options: Optional[Iterable[str]] = None,
+                                 private_key: Optional[str] = None,
+                                 rsh_port: Optional[int] = None,
+                                 strict_host_key_checking: Optional[bool] = None,
+                                 ssh_options: Optional[Dict[str, str]] = None) -> List[str]:
+    """Generate an ssh command running rsync on the source host, pushing to the destination host.
+
+    In `direct` mode the source host connects to the destination host itself. In
+    `relay` mode, for hosts that cannot reach each other, the ssh connection to the
+    source host forwards a port back through the local machine to the destination
+    host, and the source host's rsync connects through it: data streams through
+    this machine without being stored.
+
+    Args:
+        source (str): The source directory or file path, on the source host.
+        destination (str): The destination directory or file path, on the
+            destination host.
+        source_ssh (str): The SSH prefix for the source, reached from this machine.
+        destination_ssh (str): The SSH prefix for the destination, as reached from the
+            source host in `direct` mode, or from this machine in `relay` mode.
+        mode (str, optional): `direct` or `relay`. Defaults to `direct`.
+        forward_agent (bool, optional): Whether the local ssh agent is forwarded to the
+            source host, to authenticate it to the destination host. Defaults to True.
+        remote_private_key (Optional[str], optional): The path, on the source host, to
+            the private key authenticating it to the destination host. Defaults to None.
+        destination_port (Optional[int], optional): The ssh port of the destination
+            host. Defaults to None, for 22.
+        relay_port (Optional[int], optional): The port forwarded on the source host in
+            `relay` mode. Defaults to None, for a random port.
+        exclusions (Optional[Iterable[str]], optional): The exclusions to be applied
+            during synchronization. Defaults to None.
+        sync_source_contents (bool, optional): Whether to sync the contents of the
+            source directory. Defaults to True.
+        options (Optional[Iterable[str]], optional): Additional rsync options. Defaults
+            to None.
+        private_key (Optional[str], optional): The path to the private key file
+            authenticating this machine to the source host. Defaults to None.
+        rsh_port (Optional[int], optional): The ssh port of the source host. Defaults
+            to None.
+        strict_host_key_checking (Optional[bool], optional): Whether to perform strict
+            host key checking, on both connections. Defaults to None.
+        ssh_options (Optional[Dict[str, str]], optional): Additional ssh options for the
+            connection to the source host. Defaults to None.
+
+    Returns:
+        List[str]: The ssh command.
+
+    Raises:
+        ValueError: If `mode` is neither `direct` nor `relay`.
+    """
+    if mode not in MODES:
+        raise ValueError(f'unknown mode "{mode}", expected one of {", ".join(MODES)}')
+
+    inner_ssh = ['ssh']
+    if remote_private_key is not None:
+        inner_ssh.extend(['-i', remote_private_key])
+    if strict_host_key_checking is not None:
+        inner_ssh.extend(['-o', f'StrictHostKeyChecking={"yes" if strict_host_key_checking else "no"}'])
+
+    forwarding: List[str] = []
+    target_ssh = destination_ssh
+    if mode == 'relay':
+        user, _, host = destination_ssh.rpartition('@')
+        if relay_port is None:
+            relay_port = random.randint(*RELAY_PORTS)
+        forwarding = ['-R', f'{relay_port}:{host}:{destination_port or 22}', '-o', 'ExitOnForwardFailure=yes']
+        target_ssh = f'{user}@localhost' if user else 'localhost'
+        inner_ssh.extend(['-p', str(relay_port), '-o', f'HostKeyAlias={host}'])
+    elif destination_port is not None:
+        inner_ssh.extend(['-p', str(destination_port)])
+
+    source, destination = sanitize_trailing_slash(source, get_directory_with_ssh(destination, target_ssh),
+                                                  sync_source_contents)
+    rsh = ['--rsh', ' '.join(shlex.quote(argument) for argument in inner_ssh)] if len(inner_ssh) > 1 else []
+    rsync_command = ['rsync',
+                     *(options or []),
+                     *rsh,
+                     source,
+                     destination,
+                     *(get_exclusions(exclusions) if exclusions else [])]
+
+    outer_ssh = shlex.split(get_rsh_command(private_key, rsh_port, strict_host_key_checking, ssh_options)[1])
+    if forward_agent is True:
+        outer_ssh.append('-A')
+
+    return [*outer_ssh,
+            *forwarding,
+            source_ssh,
+            ' '.join(shlex.quote(argument) for argument in rsync_command)]
+
+
+def run_remote_to_remote(cwd=os.getcwd(), strict=True, verbose=False, **kwargs):
+    """Sync from one remote host to another, running rsync on the source host.
+
+    Args:
+        cwd (str, optional): The current working directory. Defaults to the current
+            directory.
+        strict (bool, optional): Whether to raise an exception if rsync, or the ssh
+            connection to the source host, exits with a non-zero code. Defaults to True.
+        verbose (bool, optional): Whether to print the command before executing it.
+            Defaults to False.
+        **kwargs: Options to be passed to the `get_remote_to_remote_command` function.
+
+    Returns:
+        subprocess.CompletedProcess: The completed process of the ssh command, whose
+            return code is the one of the remote rsync, or 255 if ssh failed.
+    """
+    command = get_remote_to_remote_command(**kwargs)
+    command_string = ' '.join(command)
+
+    if verbose is True:
+        print(f'[sysrsync runner] running command on "{cwd}":')
+        print(command_string)
+
+    process = subprocess.run(command, cwd=cwd, shell=False)
+
+    if strict is True:
+        _check_return_code(process.returncode, command_string)
+
+    return process
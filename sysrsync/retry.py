@@ -0,0 +1,158 @@
+"""Classifies rsync exit codes and decides when to retry a failed sync."""
+import random
+from typing import Iterable, List, Optional
+
+from sysrsync.exceptions import FatalRsyncError, PartialTransferError, RetryableRsyncError, RsyncError
+
+# Timeouts and connection or protocol stream failures, usually caused by flaky links
+RETRYABLE_CODES = (10, 12, 30, 35)
+# Some files could not be transferred, or vanished during the transfer
+PARTIAL_CODES = (23, 24)
+# Syntax and protocol incompatibility errors, which no retry will fix
+FATAL_CODES = (1, 2)
+
+
+def classify_return_code(return_code: int) -> str:
+    """Classify an rsync exit code.
+
+    Args:
+        return_code (int): The rsync exit code.
+
+    Returns:
+        str: `success`, `retryable`, `partial` or `fatal`. Codes outside the known
+            classes are considered fatal.
+    """
+    if return_code == 0:
+        return 'success'
+    if return_code in RETRYABLE_CODES:
+        return 'retryable'
+    if return_code in PARTIAL_CODES:
+        return 'partial'
+
+    return 'fatal'
+
+
+def get_rsync_error(return_code: int, message: str, stderr_tail: Optional[List[str]] = None) -> RsyncError:
+    """Create the exception matching the class of an rsync exit code.
+
+    Args:
+        return_code (int): The non-zero rsync exit code.
+        message (str): The error message.
+        stderr_tail (Optional[List[str]], optional): The last lines rsync wrote to its
+            standard error. Defaults to None.
+
+    Returns:
+        RsyncError: A `RetryableRsyncError`, `PartialTransferError` or
+            `FatalRsyncError`.
+    """
+    error_class = {'retryable': RetryableRsyncError,
+                   'partial': PartialTransferError}.get(classify_return_code(return_code), FatalRsyncError)
+
+    return error_class(message, return_code, stderr_tail)
+
+
+def merge_return_codes(return_codes: Iterable[int]) -> int:
+    """Merge the exit codes of several rsync processes into one.
+
+    Hard failures take precedence over partial transfers, which take precedence
+    over success.
+
+    Args:
+        return_codes (Iterable[int]): The exit codes to merge.
+
+    Returns:
+        int: The first hard failure code, else the first partial transfer code, else 0.
+    """
+    failures = [code for code in return_codes if code != 0]
+    hard_failures = [code for code in failures if code not in PARTIAL_CODES]
+
+    return (hard_failures or failures or [0])[0]
+
+
+class RetryPolicy:
+    """When and how to retry rsync runs that failed with a retryable exit code.
+
+    Retries wait with exponential backoff and jitter, and resume the bytes already
+    sent by keeping partially transferred files in `partial_dir`.
+
+    Args:
+        attempts (int, optional): Maximum number of runs, including the first one.
+            Defaults to 5.
+        backoff (float, optional): Seconds to wait before the first retry, doubled
+            on each subsequent retry. Defaults to 1.0.
+        max_backoff (float, optional): Maximum seconds between retries. Defaults
+            to 60.0.
+        jitter (float, optional): Fraction of each delay that is randomized, to keep
+            concurrent syncs from retrying in lockstep. Defaults to 0.5.
+        retry_partial (bool, optional): Whether partial transfers (23, 24) are
+            retried too. Defaults to False.
+        partial_dir (Optional[str], optional): Where rsync keeps partially
+            transferred files, passed as `--partial-dir`. When None, `--partial` keeps
+            them in place. Defaults to `.rsync-partial`.
+        append_verify (bool, optional): Whether to add `--append-verify`, so resumed
+            files are appended to instead of delta-transferred. Only safe when files
+            are never modified in the middle. Since rsync refuses it together with
+            `--partial-dir`, partial files are then kept in place with `--partial`.
+            Defaults to False.
+    """
+
+    def __init__(self,
+                 attempts: int = 5,
+                 backoff: float = 1.0,
+                 max_backoff: float = 60.0,
+                 jitter: float = 0.5,
+                 retry_partial: bool = False,
+                 partial_dir: Optional[str] = '.rsync-partial',
+                 append_verify: bool = False):
+        """Initialize the retry policy."""
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_partial = retry_partial
+        self.partial_dir = partial_dir
+        self.append_verify = append_verify
+
+    def get_options(self) -> List[str]:
+        """Generate the rsync options that let retries resume partially sent files.
+
+        Returns:
+            List[str]: The rsync options.
+        """
+        if self.append_verify is True:
+            # rsync refuses --append-verify together with --partial-dir
+            return ['--partial', '--append-verify']
+
+        return (['--partial-dir', self.partial_dir]
+                if self.partial_dir is not None
+                else ['--partial'])
+
+    def should_retry(self, return_code: int, attempt: int) -> bool:
+        """Decide whether to retry after a run.
+
+        Args:
+            return_code (int): The exit code of the run.
+            attempt (int): How many runs were already made.
+
+        Returns:
+            bool: Whether to run rsync again.
+        """
+        if attempt >= self.attempts:
+            return False
+
+        retryable = ('retryable', 'partial') if self.retry_partial else ('retryable',)
+
+        return classify_return_code(return_code) in retryable
+
+    def get_delay(self, attempt: int) -> float:
+        """Compute how long to wait before a retry.
+
+        Args:
+            attempt (int): How many runs were already made.
+
+        Returns:
+            float: The delay in seconds.
+        """
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+
+        return delay * (1 - self.jitter * random.random())
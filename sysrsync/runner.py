@@ -1,12 +1,36 @@
 """Runs the rsync command with the specified options."""
+import collections
+import contextlib
 import os
 import subprocess
+import tempfile
+import threading
+import time
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
 
 from sysrsync.command_maker import get_rsync_command
-from sysrsync.exceptions import RsyncError
+from sysrsync.helpers.capture import collect_tail, open_line_sink
+from sysrsync.helpers.directories import get_remote_host, is_remote_directory, strip_trailing_slash
+from sysrsync.helpers.file_list import close_quietly, get_files_from_options, get_filter_options, write_paths
+from sysrsync.helpers.progress import ProgressEvent, iter_lines, parse_line
+from sysrsync.helpers.rsync import get_rsh_command
+from sysrsync.helpers.stats import STATS_OPTIONS, parse_stats
+from sysrsync.history import get_host_pair
+from sysrsync.instrumentation import RunTrace, start_trace
+from sysrsync.retry import get_rsync_error, merge_return_codes
+from sysrsync.tuning import drop_conflicting_options, get_preset
 
+DRY_RUN_OPTIONS = {'--dry-run', '-n'}
+# --delete-missing-args only deletes the listed paths, not the files missing from the source
+NOT_DELETE_OPTIONS = {'--delete-missing-args'}
+CHECKSUM_OPTIONS = {'--checksum', '-c'}
+RSH_KEYS = ('private_key', 'rsh_port', 'strict_host_key_checking', 'ssh_options')
 
-def run(cwd=os.getcwd(), strict=True, verbose=False, **kwargs):
+
+def run(cwd=os.getcwd(), strict=True, verbose=False, stats=False, cache=None,
+        files_from=None, inclusions_from=None, exclusions_from=None, retry=None, tune=None,
+        hooks=None, digests=None, output=None, compress_output=False, stderr_lines=None, history=None,
+        lanes=None, **kwargs):
     """Run the rsync command with the specified options.
 
     Args:
@@ -16,38 +40,365 @@ def run(cwd=os.getcwd(), strict=True, verbose=False, **kwargs):
             returns a non-zero exit code. Defaults to True.
         verbose (bool, optional): Whether to print the rsync command before executing
             it. Defaults to False.
+        stats (bool, optional): Whether to add `--stats` to the command and parse the
+            transfer statistics into the `stats` attribute of the returned process.
+            rsync's output is still printed as it is read. Defaults to False.
+        cache (Optional[ManifestCache], optional): A fingerprint cache of the source,
+            ignored when the source is remote or `files_from` is given. When the
+            source did not change since the last successful run of the same command,
+            rsync is not spawned and the returned process has its `skipped` attribute
+            set to True, no `stats` and 0 `attempts`. Defaults to None.
+        files_from (Optional[Iterable[str]], optional): Paths relative to the source to
+            transfer instead of the whole source, streamed to rsync's standard input
+            with `--files-from=-`. If iterating it raises, rsync is killed and the
+            exception is raised. Defaults to None.
+        inclusions_from (Optional[Iterable[str]], optional): Include patterns, written
+            to a temporary filter file read with `--include-from`. Defaults to None.
+        exclusions_from (Optional[Iterable[str]], optional): Exclude patterns, written
+            to a temporary filter file read with `--exclude-from`. Defaults to None.
+        retry (Optional[RetryPolicy], optional): Retries runs that fail with a
+            retryable exit code, resuming partially sent files. The number of runs is
+            set in the `attempts` attribute of the returned process. When retrying,
+            `files_from` must be a sequence rather than an iterator. Defaults to None.
+        tune (Optional[str], optional): When `auto`, transfer options are chosen from
+            the link type, the compressibility of the source and its shape, ahead of
+            `options` so explicit options still win. The choice is cached per pair of
+            paths and set, with its reasons, in the `preset` attribute of the
+            returned process. Tuned options that rsync refuses next to the ones of
+            `retry` are dropped. Defaults to None.
+        hooks (Optional[Iterable[Hook]], optional): Hooks observing this run, besides
+            the ones registered with `sysrsync.add_hook`. While any hook observes a
+            run, rsync's output is read and echoed line by line to report progress.
+            Defaults to None.
+        digests (Optional[DigestCache], optional): A content digest cache of a local
+            source directory, ignored when the source is remote or `files_from` is
+            given. Only files whose content changed since the last successful run of
+            the same command are sent, through `--files-from` with `--ignore-times`
+            unless `--checksum` is among the options, and files deleted
+            since are deleted on the destination when `--del` or any `--delete*`
+            option is among the options.
+            When nothing changed, rsync is not spawned and the returned process has
+            its `skipped` attribute set to True. Defaults to None.
+        output (Optional[Union[str, Callable[[str], None]]], optional): Where rsync's
+            standard output goes, line by line as it is read: a file path, or a
+            callback receiving each line. Defaults to None, for the terminal.
+        compress_output (bool, optional): Whether an `output` file is written gzip
+            compressed. Defaults to False.
+        stderr_lines (Optional[int], optional): When set, rsync's standard error is
+            captured instead of written to the terminal, keeping only its last
+            `stderr_lines` lines in the `stderr_tail` attribute of the returned
+            process and of the raised `RsyncError`. Defaults to None.
+        history (Optional[ThroughputHistory], optional): Records the throughput of
+            successful runs for their host pair, as used by `sysrsync.plan` to
+            estimate durations. Implies `stats`. Defaults to None.
+        lanes (Optional[LanePolicy], optional): Splits a local source directory by
+            file size, syncing small files through one rsync and large files through
+            concurrent rsyncs, each tuned for its load. The returned process merges
+            their exit codes and, with `stats`, their statistics. Cannot be combined
+            with `cache`, `digests`, `files_from` or a file `output`. Defaults to None.
         **kwargs: Additional options to be passed to the `get_rsync_command` function.
 
     Returns:
         subprocess.CompletedProcess: The completed process object representing the
             execution of the rsync command.
+
+    Raises:
+        ValueError: If `retry` is given and `files_from` is an iterator, or if `tune`
+            is neither None nor `auto`.
     """
+    if lanes is not None:
+        return lanes.run(cwd=cwd, strict=strict, verbose=verbose, stats=stats, cache=cache, files_from=files_from,
+                         inclusions_from=inclusions_from, exclusions_from=exclusions_from, retry=retry, tune=tune,
+                         hooks=hooks, digests=digests, output=output, compress_output=compress_output,
+                         stderr_lines=stderr_lines, history=history, **kwargs)
+
+    trace = start_trace(hooks, cwd)
+    if trace is None:
+        return _run(None, cwd, strict, verbose, stats, cache, files_from, inclusions_from, exclusions_from,
+                    retry, tune, digests, output, compress_output, stderr_lines, history, **kwargs)
+
+    trace.emit('start')
+    try:
+        process = _run(trace, cwd, strict, verbose, stats, cache, files_from, inclusions_from, exclusions_from,
+                       retry, tune, digests, output, compress_output, stderr_lines, history, **kwargs)
+    except Exception as error:
+        trace.emit('failed', error)
+        raise
+    trace.emit('finished', process)
+
+    return process
+
+
+def _run(trace: Optional[RunTrace], cwd, strict, verbose, stats, cache, files_from, inclusions_from,
+         exclusions_from, retry, tune, digests, output, compress_output, stderr_lines, history, **kwargs):
+    """Run rsync as described in `run`, timing the phases on `trace` when given."""
+    if retry is not None and files_from is not None and iter(files_from) is files_from:
+        raise ValueError('files_from must be a sequence to be sent again on retries')
+
+    preset = None
+    if tune == 'auto':
+        preset = get_preset(kwargs['source'], kwargs['destination'],
+                            get_remote_host(kwargs['source'], kwargs.get('source_ssh'), kwargs.get('source_daemon')),
+                            get_remote_host(kwargs['destination'], kwargs.get('destination_ssh'),
+                                            kwargs.get('destination_daemon')),
+                            cwd)
+        tuned_options = (drop_conflicting_options(preset.options, retry.get_options())
+                         if retry is not None
+                         else preset.options)
+        kwargs['options'] = [*tuned_options, *(kwargs.get('options') or [])]
+        if verbose is True:
+            print('[sysrsync runner] tuned options:')
+            for reason in preset.reasons:
+                print(f'  {reason}')
+    elif tune is not None:
+        raise ValueError(f'unknown tune mode "{tune}", expected "auto"')
+
+    if history is not None:
+        stats = True
+    if stats is True:
+        kwargs['options'] = [*(kwargs.get('options') or []), *STATS_OPTIONS]
+    if retry is not None:
+        kwargs['options'] = [*(kwargs.get('options') or []), *retry.get_options()]
+
+    scan_root = None
+    source_remote = is_remote_directory(kwargs['source'], kwargs.get('source_ssh'), kwargs.get('source_daemon'))
+    if (digests is not None and files_from is None and not source_remote
+            and os.path.isdir(os.path.join(cwd, kwargs['source']))):
+        scan_root, prefix = os.path.join(cwd, kwargs['source']), ''
+        if kwargs.get('sync_source_contents', True) is False:
+            root, prefix = os.path.split(strip_trailing_slash(scan_root))
+            kwargs = {**kwargs, 'source': root, 'sync_source_contents': True}
+
+    if trace is not None:
+        trace.mark('build')
+        if any(kwargs.get(name) is not None for name in RSH_KEYS):
+            get_rsh_command(kwargs.get('private_key'), kwargs.get('rsh_port'),
+                            kwargs.get('strict_host_key_checking'), kwargs.get('ssh_options'))
+            trace.mark('key_validation')
     rsync_command = get_rsync_command(**kwargs)
+    if trace is not None:
+        trace.command = rsync_command
+        trace.mark('build')
+
+    with contextlib.ExitStack() as stack:
+        filter_options, filter_digest = [], ''
+        if inclusions_from is not None or exclusions_from is not None:
+            filters_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix='sysrsync-'))
+            filter_options, filter_digest = get_filter_options(filters_dir, inclusions_from, exclusions_from)
+
+        use_cache = cache is not None and files_from is None and not source_remote
+        digest_scan = None
+        if scan_root is not None:
+            digest_key = digests.get_key(rsync_command, cwd, filter_digest)
+            digest_scan = digests.scan(scan_root, digests.load(digest_key))
+            files_from = [os.path.join(prefix, path) for path in digest_scan.changed]
+            # the content of these files changed, whatever their size and modification time say
+            if files_from and not CHECKSUM_OPTIONS.intersection(kwargs.get('options') or []):
+                filter_options.append('--ignore-times')
+            if _deletes_extraneous(kwargs.get('options') or []) and digest_scan.deleted:
+                files_from.extend(os.path.join(prefix, path) for path in digest_scan.deleted)
+                filter_options.append('--delete-missing-args')
+
+        if files_from is not None:
+            filter_options.extend(get_files_from_options('-'))
+
+        if use_cache:
+            cache_key = cache.get_key(rsync_command, cwd, filter_digest)
+            fingerprint = cache.fingerprint(os.path.join(cwd, kwargs['source']))
+        rsync_command[1:1] = filter_options
+
+        rsync_string = ' '.join(rsync_command)
+        if trace is not None:
+            trace.mark('prepare')
 
-    rsync_string = ' '.join(rsync_command)
+        if use_cache and cache.is_fresh(cache_key, fingerprint) or digest_scan is not None and not files_from:
+            if verbose is True:
+                print(f'[sysrsync runner] skipping unchanged source on "{cwd}":')
+                print(rsync_string)
+            if digest_scan is not None:
+                digests.record(digest_key, digest_scan.states)
+            process = subprocess.CompletedProcess(rsync_command, 0)
+            process.skipped = True
+            process.stats = None
+            process.attempts = 0
+            process.preset = preset
+            return process
 
-    if verbose is True:
-        print(f'[sysrsync runner] running command on "{cwd}":')
-        print(rsync_string)
-    process = subprocess.run(rsync_command, cwd=cwd, shell=False)
+        if verbose is True:
+            print(f'[sysrsync runner] running command on "{cwd}":')
+            print(rsync_string)
+
+        write_line = (stack.enter_context(open_line_sink(output, compress_output))
+                      if output is not None
+                      else None)
+        started_at = time.monotonic()
+        process = _execute(rsync_command, cwd, stats, files_from, trace, write_line, stderr_lines)
+        attempts = 1
+        while retry is not None and retry.should_retry(process.returncode, attempts):
+            delay = retry.get_delay(attempts)
+            if verbose is True:
+                print(f'[sysrsync runner] exited with code {process.returncode}, retrying in {delay:.1f}s')
+            time.sleep(delay)
+            if trace is not None:
+                trace.mark('backoff')
+            started_at = time.monotonic()
+            process = _execute(rsync_command, cwd, stats, files_from, trace, write_line, stderr_lines)
+            attempts += 1
+        finished_at = time.monotonic()
+        process.skipped = False
+        process.attempts = attempts
+        process.preset = preset
 
     if strict is True:
         code = process.returncode
-        _check_return_code(code, rsync_string)
+        _check_return_code(code, rsync_string, getattr(process, 'stderr_tail', None))
+
+    if use_cache and process.returncode == 0:
+        cache.record(cache_key, fingerprint)
+    if digest_scan is not None and process.returncode == 0:
+        digests.record(digest_key, digest_scan.states)
+    if (history is not None and process.returncode == 0 and process.stats is not None
+            and not DRY_RUN_OPTIONS.intersection(kwargs.get('options') or [])):
+        history.record(*get_host_pair(kwargs), process.stats.transferred_size or 0, finished_at - started_at)
 
     return process
 
 
-def _check_return_code(return_code: int, action: str):
+def _execute(rsync_command: List[str], cwd: str, stats: bool = False,
+             files_from: Optional[Iterable[str]] = None,
+             trace: Optional[RunTrace] = None,
+             write_line: Optional[Callable[[str], None]] = None,
+             stderr_lines: Optional[int] = None) -> subprocess.CompletedProcess:
+    """Run rsync, streaming `files_from` to its standard input and its output to `write_line`.
+
+    `--stats` are parsed from the output, and the last `stderr_lines` lines of the
+    standard error are kept in the `stderr_tail` attribute of the returned process.
+    """
+    read_output = stats is True or trace is not None or write_line is not None
+    if not read_output and files_from is None and stderr_lines is None:
+        return subprocess.run(rsync_command, cwd=cwd, shell=False)
+
+    with subprocess.Popen(rsync_command, cwd=cwd, shell=False,
+                          stdin=subprocess.PIPE if files_from is not None else None,
+                          stdout=subprocess.PIPE if read_output else None,
+                          stderr=subprocess.PIPE if stderr_lines is not None else None) as popen:
+        if trace is not None:
+            trace.pid = popen.pid
+            trace.mark('spawn')
+            trace.emit('spawned')
+
+        writer, writer_errors = None, []
+        if files_from is not None:
+            writer = threading.Thread(target=_write_files_from, args=(popen, files_from, writer_errors), daemon=True)
+            writer.start()
+
+        stderr_tail, reader = None, None
+        if stderr_lines is not None:
+            stderr_tail = collections.deque(maxlen=stderr_lines)
+            reader = threading.Thread(target=collect_tail, args=(popen.stderr, stderr_tail), daemon=True)
+            reader.start()
+
+        rsync_stats = None
+        if read_output:
+            lines = _forward(iter_lines(popen.stdout), write_line or print)
+            if trace is not None:
+                lines = _report_progress(lines, trace)
+            if stats is True:
+                rsync_stats = parse_stats(lines)
+            else:
+                collections.deque(lines, maxlen=0)
+
+        popen.wait()
+        if trace is not None and rsync_stats is not None and rsync_stats.file_list_generation_time is not None:
+            trace.add('file_list', rsync_stats.file_list_generation_time)
+        if writer is not None:
+            writer.join()
+        if reader is not None:
+            reader.join()
+        if writer_errors:
+            raise writer_errors[0]
+        if trace is not None:
+            trace.mark('transfer')
+
+    process = subprocess.CompletedProcess(rsync_command, popen.returncode)
+    if stats is True:
+        process.stats = rsync_stats
+    if stderr_tail is not None:
+        process.stderr_tail = list(stderr_tail)
+
+    return process
+
+
+def _write_files_from(popen: subprocess.Popen, files_from: Iterable[str], errors: List[BaseException]):
+    """Stream `files_from` to rsync, killing it if the paths cannot all be produced."""
+    try:
+        write_paths(popen.stdin, files_from)
+    except Exception as error:  # pylint: disable=broad-except
+        # killed before its standard input closes, so rsync never syncs the truncated list
+        errors.append(error)
+        popen.kill()
+        close_quietly(popen.stdin)
+
+
+def _deletes_extraneous(options: Iterable[str]) -> bool:
+    """Whether the options make rsync delete destination files missing from the source."""
+    return any(option == '--del' or option.startswith('--delete') and option not in NOT_DELETE_OPTIONS
+               for option in options)
+
+
+def _forward(lines: Iterable[str], write_line: Callable[[str], None]) -> Iterator[str]:
+    for line in lines:
+        write_line(line)
+        yield line
+
+
+def _report_progress(lines: Iterable[str], trace: RunTrace) -> Iterator[str]:
+    for line in lines:
+        event = parse_line(line)
+        if isinstance(event, ProgressEvent):
+            trace.emit('progress', event)
+        yield line
+
+
+def _check_return_code(return_code: int, action: str, stderr_tail: Optional[List[str]] = None):
     """Check the return code of an action and raises an exception if it is non-zero.
 
     Args:
         return_code (int): The return code of the action.
         action (str): The description of the action.
+        stderr_tail (Optional[List[str]], optional): The last lines of the action's
+            standard error, appended to the error message. Defaults to None.
 
     Raises:
         RsyncError: If the return code is non-zero, an exception is raised with an
-            error message indicating the action and the return code.
+            error message indicating the action and the return code. Its class is
+            `RetryableRsyncError`, `PartialTransferError` or `FatalRsyncError`
+            depending on the return code.
     """
     if return_code != 0:
-        raise RsyncError(f"[sysrsync runner] {action} exited with code {return_code}")
+        message = f"[sysrsync runner] {action} exited with code {return_code}"
+        if stderr_tail:
+            message += ''.join(f'\n  {line}' for line in stderr_tail)
+        raise get_rsync_error(return_code, message, stderr_tail)
+
+
+def _check_return_codes(processes: Sequence[subprocess.CompletedProcess], context: str):
+    """Check the return codes of several rsync processes and raise a single exception for all failures.
+
+    Args:
+        processes (Sequence[subprocess.CompletedProcess]): The completed processes.
+        context (str): What the processes were, such as "shards" or "destinations".
+
+    Raises:
+        RsyncError: If any return code is non-zero, listing every failed command and
+            its return code. Its class depends on the merged return code, as in
+            `_check_return_code`.
+    """
+    failures = [f'"{" ".join(process.args)}" exited with code {process.returncode}'
+                for process in processes
+                if process.returncode != 0]
+    if failures:
+        return_code = merge_return_codes(process.returncode for process in processes)
+        raise get_rsync_error(return_code,
+                              f'[sysrsync runner] {len(failures)} of {len(processes)} {context} failed: '
+                              + '; '.join(failures))
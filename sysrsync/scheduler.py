@@ -0,0 +1,217 @@
+"""Schedules many rsync jobs under global and per-host concurrency limits and a shared bandwidth budget."""
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+from sysrsync.runner import run
+
+
+class ScheduledJob:
+    """A job submitted to a `Scheduler`.
+
+    Attributes:
+        kwargs (Dict[str, Any]): The arguments the job passes to `sysrsync.run`.
+        priority (int): Jobs with higher priority start first.
+        host (Optional[str]): The remote host the job counts against, or None for
+            local jobs.
+        sequence (int): Submission order, breaking ties between equal priorities.
+        future (Future): Resolves to the job's completed process, or its exception.
+        bwlimit (Optional[int]): The `--bwlimit`, in KiB/s, the job was started with.
+        queued_at (float): Monotonic time the job was submitted.
+        started_at (Optional[float]): Monotonic time the job started.
+        finished_at (Optional[float]): Monotonic time the job finished.
+    """
+
+    def __init__(self, kwargs: Dict[str, Any], priority: int, host: Optional[str], sequence: int = 0):
+        """Initialize a queued job."""
+        self.kwargs = kwargs
+        self.priority = priority
+        self.host = host
+        self.sequence = sequence
+        self.future: Future = Future()
+        self.bwlimit: Optional[int] = None
+        self.queued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def wait_time(self) -> Optional[float]:
+        """Seconds the job waited in the queue."""
+        return None if self.started_at is None else self.started_at - self.queued_at
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Seconds the job ran for."""
+        return None if self.finished_at is None else self.finished_at - self.started_at
+
+
+class Scheduler:
+    """Runs rsync jobs concurrently, limiting how many run at once overall and per remote host.
+
+    Each job is started with a `--bwlimit` share of the total bandwidth budget,
+    split evenly between it and the jobs already running, so a job running alone
+    gets the whole budget. Shares are fixed when a job starts, so jobs started
+    earlier keep their larger share until they finish.
+
+    Example:
+        with sysrsync.Scheduler(max_concurrency=8, per_host_limit=2, bandwidth=100_000) as scheduler:
+            for host in hosts:
+                scheduler.submit(source='/srv/release', destination='/srv/app',
+                                 destination_ssh=host, options=['-a'])
+
+    Args:
+        max_concurrency (int, optional): Maximum number of concurrent rsync processes.
+            Defaults to 8.
+        per_host_limit (Optional[int], optional): Maximum number of concurrent rsync
+            processes per remote host. Defaults to 2.
+        bandwidth (Optional[int], optional): Total bandwidth budget in KiB/s, as in
+            rsync's `--bwlimit`. Defaults to None, for no limit.
+    """
+
+    def __init__(self, max_concurrency: int = 8, per_host_limit: Optional[int] = 2,
+                 bandwidth: Optional[int] = None):
+        """Initialize an idle scheduler."""
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.bandwidth = bandwidth
+        self.jobs: List[ScheduledJob] = []
+        self._queue: List[ScheduledJob] = []
+        self._active_per_host: Dict[Optional[str], int] = {}
+        self._active = 0
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        """Use the scheduler as a context manager that waits for every job on exit."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Wait for every submitted job to finish."""
+        self.wait()
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of jobs waiting to start."""
+        with self._condition:
+            return len(self._queue)
+
+    @property
+    def active_jobs(self) -> int:
+        """Number of jobs running."""
+        with self._condition:
+            return self._active
+
+    def submit(self, priority: int = 0, **kwargs) -> ScheduledJob:
+        """Queue a job, starting it right away if the limits allow.
+
+        Args:
+            priority (int, optional): Jobs with higher priority start first. Jobs with
+                the same priority start in submission order. Defaults to 0.
+            **kwargs: Options to be passed to the `sysrsync.run` function.
+
+        Returns:
+            ScheduledJob: The queued job.
+        """
+        with self._condition:
+            job = ScheduledJob(kwargs, priority, get_job_host(kwargs), next(self._order))
+            self.jobs.append(job)
+            self._queue.append(job)
+            self._dispatch()
+
+        return job
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for every submitted job to finish.
+
+        Args:
+            timeout (Optional[float], optional): Maximum seconds to wait. Defaults to
+                None, to wait forever.
+
+        Returns:
+            bool: Whether every job finished.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._queue and not self._active, timeout)
+
+    def get_latency_summary(self) -> Dict[str, Optional[float]]:
+        """Summarize queue wait and run time of the finished jobs.
+
+        Returns:
+            Dict[str, Optional[float]]: Mean and maximum wait and run seconds.
+        """
+        with self._condition:
+            finished = [job for job in self.jobs if job.finished_at is not None]
+        waits = [job.wait_time for job in finished]
+        durations = [job.duration for job in finished]
+
+        return {'finished': len(finished),
+                'mean_wait': sum(waits) / len(waits) if waits else None,
+                'max_wait': max(waits, default=None),
+                'mean_duration': sum(durations) / len(durations) if durations else None,
+                'max_duration': max(durations, default=None)}
+
+    def _dispatch(self):
+        """Start queued jobs, by priority, while the limits allow. Must hold the condition."""
+        while self._active < self.max_concurrency:
+            eligible = [job for job in self._queue if self._host_has_capacity(job.host)]
+            if not eligible:
+                return
+            job = min(eligible, key=lambda item: (-item.priority, item.sequence))
+            self._queue.remove(job)
+            self._active += 1
+            self._active_per_host[job.host] = self._active_per_host.get(job.host, 0) + 1
+
+            if self.bandwidth is not None:
+                job.bwlimit = max(1, self.bandwidth // self._active)
+
+            job.started_at = time.monotonic()
+            threading.Thread(target=self._run_job, args=(job,), daemon=True).start()
+
+    def _host_has_capacity(self, host: Optional[str]) -> bool:
+        if host is None or self.per_host_limit is None:
+            return True
+
+        return self._active_per_host.get(host, 0) < self.per_host_limit
+
+    def _run_job(self, job: ScheduledJob):
+        kwargs = dict(job.kwargs)
+        if job.bwlimit is not None:
+            kwargs['options'] = [*(kwargs.get('options') or []), f'--bwlimit={job.bwlimit}']
+
+        try:
+            result = run(**kwargs)
+        except Exception as error:  # pylint: disable=broad-except
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(result)
+        finally:
+            with self._condition:
+                job.finished_at = time.monotonic()
+                self._active -= 1
+                self._active_per_host[job.host] -= 1
+                self._dispatch()
+                self._condition.notify_all()
+
+
+def get_job_host(kwargs: Dict[str, Any]) -> Optional[str]:
+    """Derive the remote host a job transfers to or from.
+
+    Args:
+        kwargs (Dict[str, Any]): The job's `get_rsync_command` arguments.
+
+    Returns:
+        Optional[str]: The host of `source_ssh`, `destination_ssh`, `source_daemon` or
+            `destination_daemon`, without the user and port parts, or None for local
+            jobs.
+    """
+    ssh = kwargs.get('source_ssh') or kwargs.get('destination_ssh')
+    if ssh is not None:
+        return ssh.rpartition('@')[2]
+
+    daemon = kwargs.get('source_daemon') or kwargs.get('destination_daemon')
+    if daemon is not None:
+        return daemon.rpartition('@')[2].partition(':')[0]
+
+    return None
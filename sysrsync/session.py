@@ -0,0 +1,159 @@
+"""Shares one ssh connection across several rsync runs to the same host."""
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import List, Optional
+
+from sysrsync.command_maker import get_rsync_command
+from sysrsync.exceptions import PrivateKeyError, SSHSessionError
+from sysrsync.runner import run
+
+
+class SSHSession:
+    """An OpenSSH ControlMaster connection reused by every rsync run in the session.
+
+    Only the first connection pays for the TCP and ssh handshakes; every rsync
+    started through the session multiplexes over the master connection socket.
+
+    Example:
+        with sysrsync.SSHSession('myserver', private_key='~/.ssh/id_rsa') as session:
+            session.run(source='/home/user/a', destination='/home/server/a')
+            session.run(source='/home/user/b', destination='/home/server/b')
+
+    Args:
+        host (str): The ssh host, as it would be given to `source_ssh` or
+            `destination_ssh`.
+        private_key (Optional[str], optional): The path to the private key file for SSH
+            authentication. Defaults to None.
+        port (Optional[int], optional): The port number to use for the SSH connection.
+            Defaults to None.
+        strict_host_key_checking (Optional[bool], optional): Whether to perform strict
+            host key checking. Defaults to None.
+        control_persist (int, optional): Seconds the master connection stays open after
+            the last client disconnects, in case the session is not closed. Defaults
+            to 60.
+    """
+
+    def __init__(self,
+                 host: str,
+                 private_key: Optional[str] = None,
+                 port: Optional[int] = None,
+                 strict_host_key_checking: Optional[bool] = None,
+                 control_persist: int = 60):
+        """Initialize the session without connecting."""
+        self.host = host
+        self.private_key = private_key
+        self.port = port
+        self.strict_host_key_checking = strict_host_key_checking
+        self.control_persist = control_persist
+        self.control_path: Optional[str] = None
+        self._control_dir: Optional[str] = None
+
+    def __enter__(self):
+        """Open the master connection."""
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close the master connection."""
+        self.close()
+
+    def open(self):
+        """Open the master connection in the background.
+
+        Raises:
+            SSHSessionError: If ssh fails to connect.
+        """
+        if self.control_path is not None:
+            return
+
+        self._control_dir = tempfile.mkdtemp(prefix='sysrsync-')
+        self.control_path = os.path.join(self._control_dir, 'control')
+
+        try:
+            process = subprocess.run(['ssh', '-M', '-N', '-f',
+                                      '-o', f'ControlPersist={self.control_persist}',
+                                      *self._ssh_args(), self.host],
+                                     shell=False)
+        except PrivateKeyError:
+            self._remove_control_dir()
+            raise
+
+        if process.returncode != 0:
+            self._remove_control_dir()
+            raise SSHSessionError(self.host, process.returncode)
+
+    def close(self):
+        """Ask the master connection to exit and remove its socket."""
+        if self.control_path is None:
+            return
+
+        subprocess.run(['ssh', '-O', 'exit', *self._ssh_args(), self.host],
+                       shell=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self._remove_control_dir()
+
+    def get_rsync_command(self, **kwargs) -> List[str]:
+        """Generate an rsync command that goes through the master connection.
+
+        If neither `source_ssh` nor `destination_ssh` is given, the session host is
+        used as the destination.
+
+        Args:
+            **kwargs: Options to be passed to the `get_rsync_command` function.
+
+        Returns:
+            List[str]: The rsync command.
+        """
+        return get_rsync_command(**self._rsync_kwargs(kwargs))
+
+    def run(self, **kwargs):
+        """Run rsync through the master connection.
+
+        If neither `source_ssh` nor `destination_ssh` is given, the session host is
+        used as the destination.
+
+        Args:
+            **kwargs: Options to be passed to the `sysrsync.run` function.
+
+        Returns:
+            subprocess.CompletedProcess: The completed process object representing the
+                execution of the rsync command.
+        """
+        return run(**self._rsync_kwargs(kwargs))
+
+    def _rsync_kwargs(self, kwargs: dict) -> dict:
+        if self.control_path is None:
+            raise SSHSessionError(self.host)
+
+        if kwargs.get('source_ssh') is None and kwargs.get('destination_ssh') is None:
+            kwargs = {**kwargs, 'destination_ssh': self.host}
+
+        return {**kwargs,
+                'private_key': self.private_key,
+                'rsh_port': self.port,
+                'strict_host_key_checking': self.strict_host_key_checking,
+                'ssh_options': {**(kwargs.get('ssh_options') or {}),
+                                'ControlPath': self.control_path}}
+
+    def _ssh_args(self) -> List[str]:
+        args = ['-o', f'ControlPath={self.control_path}']
+
+        if self.private_key is not None:
+            expanded_key_file = os.path.expandvars(os.path.expanduser(self.private_key))
+            if not os.path.exists(expanded_key_file):
+                raise PrivateKeyError(expanded_key_file)
+            args.extend(['-i', expanded_key_file])
+
+        if self.port is not None:
+            args.extend(['-p', str(self.port)])
+
+        if self.strict_host_key_checking is not None:
+            args.extend(['-o', f'StrictHostKeyChecking={"yes" if self.strict_host_key_checking else "no"}'])
+
+        return args
+
+    def _remove_control_dir(self):
+        shutil.rmtree(self._control_dir, ignore_errors=True)
+        self._control_dir = None
+        self.control_path = None
@@ -0,0 +1,186 @@
+"""Manages rolling, hard-linked incremental snapshots built on rsync's --link-dest."""
+import os
+import shlex
+import shutil
+import subprocess
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from sysrsync.helpers.rsync import get_rsh_command
+from sysrsync.runner import run
+
+SNAPSHOT_FORMAT = '%Y-%m-%dT%H%M%SZ'
+IN_PROGRESS_SUFFIX = '.in-progress'
+DELETING_SUFFIX = '.deleting'
+
+
+class Retention(NamedTuple):
+    """How many snapshots to keep: the latest ones, plus the newest of each recent period."""
+
+    last: int = 1
+    hourly: int = 0
+    daily: int = 0
+    weekly: int = 0
+    monthly: int = 0
+
+
+class SnapshotResult(NamedTuple):
+    """The snapshot created by `snapshot`, and the snapshots it pruned."""
+
+    name: str
+    process: subprocess.CompletedProcess
+    pruned: List[str]
+
+
+def parse_snapshot_name(name: str) -> Optional[datetime]:
+    """Parse the time of a snapshot from its directory name.
+
+    Args:
+        name (str): The directory name.
+
+    Returns:
+        Optional[datetime]: The snapshot time, or None if the name is not a snapshot.
+    """
+    try:
+        return datetime.strptime(name, SNAPSHOT_FORMAT).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def select_snapshots_to_keep(names: Iterable[str], retention: Retention) -> Set[str]:
+    """Select the snapshots a retention policy keeps.
+
+    Args:
+        names (Iterable[str]): Snapshot directory names.
+        retention (Retention): The retention policy.
+
+    Returns:
+        Set[str]: The names to keep. Names that are not snapshots are never selected.
+    """
+    snapshots = sorted(((parse_snapshot_name(name), name) for name in names
+                        if parse_snapshot_name(name) is not None),
+                       reverse=True)
+    keep = {name for _, name in snapshots[:retention.last]}
+
+    periods = (('hourly', '%Y-%m-%dT%H'), ('daily', '%Y-%m-%d'), ('weekly', '%G-%V'), ('monthly', '%Y-%m'))
+    for field, period_format in periods:
+        count = getattr(retention, field)
+        seen: Dict[str, str] = {}
+        for time, name in snapshots:
+            period = time.strftime(period_format)
+            if period not in seen and len(seen) < count:
+                seen[period] = name
+        keep.update(seen.values())
+
+    return keep
+
+
+def snapshot(source: str,
+             destination_root: str,
+             keep: Optional[Retention] = None,
+             link_dest_count: int = 1,
+             destination_ssh: Optional[str] = None,
+             now: Optional[datetime] = None,
+             **kwargs) -> SnapshotResult:
+    """Create a timestamped snapshot of `source` under `destination_root`, hard linking unchanged files.
+
+    The sync goes into a `.in-progress` directory, with `--link-dest` pointing at
+    the latest `link_dest_count` snapshots, and is renamed to its final name only
+    once rsync succeeded, so an interrupted snapshot is never mistaken for a
+    complete one. Snapshots the retention policy does not keep are then renamed
+    to `.deleting` and removed, along with leftovers of interrupted runs.
+
+    Args:
+        source (str): The source directory.
+        destination_root (str): The directory holding the snapshots.
+        keep (Optional[Retention], optional): The retention policy. Defaults to None,
+            to never prune.
+        link_dest_count (int, optional): How many previous snapshots rsync compares
+            against for hard linking. Defaults to 1.
+        destination_ssh (Optional[str], optional): The SSH prefix for the destination.
+            Defaults to None.
+        now (Optional[datetime], optional): The snapshot time. Defaults to now.
+        **kwargs: Additional options to be passed to the `sysrsync.run` function.
+
+    Returns:
+        SnapshotResult: The new snapshot name, its rsync process and the pruned names.
+    """
+    target = _SnapshotRoot(destination_root, destination_ssh, kwargs)
+    target.create()
+
+    names = target.list()
+    previous = sorted((name for name in names if parse_snapshot_name(name) is not None),
+                      key=parse_snapshot_name)
+    name = (now or datetime.now(timezone.utc)).astimezone(timezone.utc).strftime(SNAPSHOT_FORMAT)
+    in_progress = f'{name}{IN_PROGRESS_SUFFIX}'
+
+    link_dests = [f'--link-dest=../{link_name}'
+                  for link_name in previous[-link_dest_count:]
+                  if link_name != name] if link_dest_count > 0 else []
+    process = run(source=source,
+                  destination=f'{destination_root.rstrip("/")}/{in_progress}',
+                  destination_ssh=destination_ssh,
+                  **{**kwargs, 'options': [*(kwargs.get('options') or []), *link_dests]})
+    if process.returncode != 0:
+        return SnapshotResult(name, process, [])
+    target.rename(in_progress, name)
+
+    pruned = []
+    if keep is not None:
+        kept = select_snapshots_to_keep([*previous, name], keep)
+        pruned = [old_name for old_name in previous if old_name not in kept]
+        for old_name in pruned:
+            target.rename(old_name, f'{old_name}{DELETING_SUFFIX}')
+        leftovers = [leftover for leftover in names if leftover.endswith((IN_PROGRESS_SUFFIX, DELETING_SUFFIX))]
+        target.remove([*(f'{old_name}{DELETING_SUFFIX}' for old_name in pruned), *leftovers])
+
+    return SnapshotResult(name, process, pruned)
+
+
+class _SnapshotRoot:
+    """File operations on the snapshot root, run locally or over ssh."""
+
+    def __init__(self, root: str, ssh: Optional[str], kwargs: dict):
+        self.root = root
+        self.ssh = ssh
+        rsh_arguments = (kwargs.get('private_key'), kwargs.get('rsh_port'),
+                         kwargs.get('strict_host_key_checking'), kwargs.get('ssh_options'))
+        self._ssh_command = (shlex.split(get_rsh_command(*rsh_arguments)[1])
+                             if ssh is not None
+                             else [])
+
+    def create(self):
+        if self.ssh is None:
+            os.makedirs(self.root, exist_ok=True)
+        else:
+            self._remote(f'mkdir -p -- {shlex.quote(self.root)}')
+
+    def list(self) -> List[str]:
+        if self.ssh is None:
+            return os.listdir(self.root)
+
+        return self._remote(f'ls -1A -- {shlex.quote(self.root)}').splitlines()
+
+    def rename(self, name: str, new_name: str):
+        if self.ssh is None:
+            os.rename(os.path.join(self.root, name), os.path.join(self.root, new_name))
+        else:
+            self._remote(f'mv -- {shlex.quote(self._path(name))} {shlex.quote(self._path(new_name))}')
+
+    def remove(self, names: List[str]):
+        if not names:
+            return
+        if self.ssh is None:
+            for name in names:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+        else:
+            self._remote('rm -rf -- ' + ' '.join(shlex.quote(self._path(name)) for name in names))
+
+    def _path(self, name: str) -> str:
+        return f'{self.root.rstrip("/")}/{name}'
+
+    def _remote(self, command: str) -> str:
+        process = subprocess.run([*self._ssh_command, self.ssh, command],
+                                 stdout=subprocess.PIPE, universal_newlines=True, check=True)
+
+        return process.stdout
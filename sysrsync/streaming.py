@@ -0,0 +1,53 @@
+"""Runs the rsync command and streams its progress as typed events."""
+import os
+import subprocess
+from typing import Iterator
+
+from sysrsync.command_maker import get_rsync_command
+from sysrsync.helpers.progress import OUT_FORMAT, Event, iter_lines, parse_line
+from sysrsync.runner import _check_return_code
+
+STREAM_OPTIONS = ['--info=progress2', f'--out-format={OUT_FORMAT}']
+
+
+def stream(cwd=os.getcwd(), strict=True, verbose=False, **kwargs) -> Iterator[Event]:
+    """Run the rsync command and yield its progress and transferred files as they happen.
+
+    rsync's standard output is read incrementally, so memory usage does not grow
+    with the size of the transfer. Standard error is inherited. If the consumer
+    stops iterating before rsync exits, the rsync process is terminated.
+
+    Args:
+        cwd (str, optional): The current working directory. Defaults to the current
+            directory.
+        strict (bool, optional): Whether to raise an exception if the rsync command
+            returns a non-zero exit code. Defaults to True.
+        verbose (bool, optional): Whether to print the rsync command before executing
+            it. Defaults to False.
+        **kwargs: Additional options to be passed to the `get_rsync_command` function.
+
+    Yields:
+        Event: A `FileEvent` for each itemized change, a `ProgressEvent` for each
+            progress update and a `MessageEvent` for any other output line.
+    """
+    kwargs['options'] = [*(kwargs.get('options') or []), *STREAM_OPTIONS]
+    rsync_command = get_rsync_command(**kwargs)
+
+    rsync_string = ' '.join(rsync_command)
+
+    if verbose is True:
+        print(f'[sysrsync runner] running command on "{cwd}":')
+        print(rsync_string)
+
+    with subprocess.Popen(rsync_command, cwd=cwd, shell=False, stdout=subprocess.PIPE) as process:
+        finished = False
+        try:
+            for line in iter_lines(process.stdout):
+                yield parse_line(line)
+            finished = True
+        finally:
+            if not finished and process.poll() is None:
+                process.terminate()
+
+    if strict is True:
+        _check_return_code(process.returncode, rsync_string)
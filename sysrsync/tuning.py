@@ -0,0 +1,246 @@
+"""Picks rsync transfer options from the link type, data compressibility and tree shape."""
+import functools
+import os
+import re
+import socket
+import subprocess
+import threading
+import zlib
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sysrsync.helpers.directories import get_remote_host
+
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1')
+SAMPLE_FILES = 64
+SAMPLE_BYTES = 64 * 1024
+SCAN_LIMIT = 10_000
+INCOMPRESSIBLE_RATIO = 0.9
+SMALL_TREE_FILES = 10_000
+LARGE_FILE_SIZE = 64 * 1024 * 1024
+
+_presets: Dict[Tuple, 'Preset'] = {}
+_presets_lock = threading.Lock()
+
+
+class Preset(NamedTuple):
+    """Options chosen by the tuner, and why each one was chosen."""
+
+    options: List[str]
+    reasons: List[str]
+
+
+class TreeSample(NamedTuple):
+    """What was learned by scanning part of a local source tree."""
+
+    files: int
+    total_size: int
+    complete: bool
+    compression_ratio: Optional[float]
+
+
+def is_local_host(ssh: Optional[str]) -> bool:
+    """Check whether an ssh prefix points at the local machine.
+
+    Args:
+        ssh (Optional[str]): The ssh prefix, such as `user@host`, or None.
+
+    Returns:
+        bool: Whether the prefix is None or names this machine.
+    """
+    if ssh is None:
+        return True
+
+    host = ssh.rpartition('@')[2]
+
+    return host in LOCAL_HOSTS or host in (socket.gethostname(), socket.getfqdn())
+
+
+def sample_tree(source: str, sample_files: int = SAMPLE_FILES, scan_limit: int = SCAN_LIMIT) -> TreeSample:
+    """Scan up to `scan_limit` files of a local source and compress a sample of them.
+
+    Args:
+        source (str): The path to the local file or directory.
+        sample_files (int, optional): How many files to read for the compressibility
+            estimate. Defaults to 64.
+        scan_limit (int, optional): How many files to stat at most. Defaults to 10000.
+
+    Returns:
+        TreeSample: File count and size of the scanned part, whether the whole tree
+            was scanned, and the compressed to original size ratio of the sample.
+    """
+    paths = []
+    total_size = 0
+    complete = True
+    stack = [source] if os.path.isdir(source) else []
+    if not stack:
+        paths.append(source)
+        total_size = os.path.getsize(source)
+
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as iterator:
+                for entry in iterator:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        paths.append(entry.path)
+                        total_size += entry.stat(follow_symlinks=False).st_size
+                    if len(paths) >= scan_limit:
+                        break
+        except OSError:
+            continue
+        if len(paths) >= scan_limit:
+            complete = False
+            break
+
+    step = max(1, len(paths) // sample_files)
+    original, compressed = 0, 0
+    for path in paths[::step][:sample_files]:
+        try:
+            with open(path, 'rb') as file:
+                data = file.read(SAMPLE_BYTES)
+        except OSError:
+            continue
+        original += len(data)
+        compressed += len(zlib.compress(data, 1))
+
+    return TreeSample(len(paths), total_size, complete, compressed / original if original else None)
+
+
+@functools.lru_cache(maxsize=None)
+def get_rsync_version() -> Tuple[int, ...]:
+    """Return the version of the local rsync, or an empty tuple if it cannot be determined."""
+    try:
+        output = subprocess.run(['rsync', '--version'], stdout=subprocess.PIPE, universal_newlines=True).stdout
+    except OSError:
+        return ()
+    match = re.search(r'version\s+(\d+)\.(\d+)\.(\d+)', output)
+
+    return tuple(int(part) for part in match.groups()) if match else ()
+
+
+def choose_preset(source: str,
+                  destination: str,
+                  source_ssh: Optional[str] = None,
+                  destination_ssh: Optional[str] = None,
+                  cwd: str = os.getcwd()) -> Preset:
+    """Choose transfer options for a sync.
+
+    - `--whole-file` when both paths are on this machine, where the delta
+      algorithm only costs CPU and reads.
+    - Over the network, `--compress` at a fast level (with `--compress-choice=zstd`
+      on rsync 3.2+) when a sample of the local source compresses well, and no
+      compression when it does not.
+    - `--inplace` when the files are few and large, so updates do not rewrite a
+      whole temporary copy of each file.
+    - `--no-inc-recursive` for small trees, where building the whole file list up
+      front is cheap.
+
+    Daemon paths given directly, as `rsync://host/module` or `host::module`, are
+    remote.
+
+    Args:
+        source (str): The source directory or file path.
+        destination (str): The destination directory or file path.
+        source_ssh (Optional[str], optional): The SSH prefix for the source. Defaults
+            to None.
+        destination_ssh (Optional[str], optional): The SSH prefix for the destination.
+            Defaults to None.
+        cwd (str, optional): The directory relative paths are resolved from. Defaults
+            to the current directory.
+
+    Returns:
+        Preset: The chosen options and the reasoning behind them.
+    """
+    options: List[str] = []
+    reasons: List[str] = []
+
+    source_host = get_remote_host(source, source_ssh)
+    local = is_local_host(source_host) and is_local_host(get_remote_host(destination, destination_ssh))
+    if local:
+        options.append('--whole-file')
+        reasons.append('both paths are on this machine: delta transfer would only cost CPU and reads')
+
+    local_source = source_host is None and os.path.exists(os.path.join(cwd, source))
+    if not local_source:
+        reasons.append('remote source: compressibility and tree shape cannot be sampled')
+        return Preset(options, reasons)
+
+    sample = sample_tree(os.path.join(cwd, source))
+
+    if not local:
+        if sample.compression_ratio is not None and sample.compression_ratio < INCOMPRESSIBLE_RATIO:
+            options.extend(['--compress', '--compress-level=1'])
+            if get_rsync_version() >= (3, 2, 0):
+                options.insert(-1, '--compress-choice=zstd')
+            reasons.append(f'sampled data compresses to {sample.compression_ratio:.0%}: compressing over the network')
+        else:
+            reasons.append('sampled data is already compressed: not compressing')
+
+    if sample.files and sample.complete and sample.total_size / sample.files >= LARGE_FILE_SIZE:
+        options.append('--inplace')
+        reasons.append(f'{sample.files} files averaging {sample.total_size // sample.files} bytes: '
+                       'updating in place instead of rewriting temporary copies')
+
+    if sample.complete and sample.files < SMALL_TREE_FILES:
+        options.append('--no-inc-recursive')
+        reasons.append(f'{sample.files} files: building the whole file list up front is cheap')
+
+    return Preset(options, reasons)
+
+
+def drop_conflicting_options(options: List[str], retry_options: List[str]) -> List[str]:
+    """Drop tuned options that rsync refuses together with the options of a retry policy.
+
+    Args:
+        options (List[str]): The tuned options.
+        retry_options (List[str]): The options of the retry policy.
+
+    Returns:
+        List[str]: The tuned options rsync accepts next to the retry options.
+    """
+    conflicting = set()
+    if '--append-verify' in retry_options:
+        conflicting.add('--whole-file')
+    if '--partial-dir' in retry_options:
+        conflicting.add('--inplace')
+
+    return [option for option in options if option not in conflicting]
+
+
+def get_preset(source: str,
+               destination: str,
+               source_ssh: Optional[str] = None,
+               destination_ssh: Optional[str] = None,
+               cwd: str = os.getcwd()) -> Preset:
+    """Choose transfer options for a sync, reusing the choice made earlier for the same pair of paths.
+
+    Args:
+        source (str): The source directory or file path.
+        destination (str): The destination directory or file path.
+        source_ssh (Optional[str], optional): The SSH prefix for the source. Defaults
+            to None.
+        destination_ssh (Optional[str], optional): The SSH prefix for the destination.
+            Defaults to None.
+        cwd (str, optional): The directory relative paths are resolved from. Defaults
+            to the current directory.
+
+    Returns:
+        Preset: The chosen options and the reasoning behind them.
+    """
+    key = (source_ssh, os.path.join(cwd, source), destination_ssh, os.path.join(cwd, destination))
+    with _presets_lock:
+        preset = _presets.get(key)
+    if preset is None:
+        preset = choose_preset(source, destination, source_ssh, destination_ssh, cwd)
+        with _presets_lock:
+            _presets[key] = preset
+
+    return preset
+
+
+def clear_presets():
+    """Forget every cached preset, so the next syncs are tuned again."""
+    with _presets_lock:
+        _presets.clear()
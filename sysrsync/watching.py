@@ -0,0 +1,125 @@
+"""Watches a local source and syncs its changes in debounced batches."""
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Iterable, Iterator, Optional
+
+from sysrsync.command_maker import get_rsync_command
+from sysrsync.helpers.directories import is_remote_directory, strip_trailing_slash
+from sysrsync.helpers.file_list import get_files_from_options, write_file_list
+from sysrsync.helpers.watchers import get_watcher
+from sysrsync.runner import _check_return_code, run
+
+WATCH_OPTIONS = ['--recursive', '--delete-missing-args']
+
+
+def watch(cwd=os.getcwd(), strict=True, verbose=False, debounce=1.0, max_delay=30.0,
+          initial_sync=True, use_inotify: Optional[bool] = None, poll_interval=1.0,
+          stop: Optional[threading.Event] = None, **kwargs) -> Iterator[subprocess.CompletedProcess]:
+    """Watch the local source and sync only the changed paths, yielding one process per batch.
+
+    Changes are collected until the source has been quiet for `debounce` seconds, or
+    for at most `max_delay` seconds under constant activity, and the batch is then
+    synced through `--files-from`. Deleted paths are removed from the destination
+    with `--delete-missing-args`.
+
+    Example:
+        for process in sysrsync.watch(source='/home/user/files',
+                                      destination='/home/server/files',
+                                      destination_ssh='myserver',
+                                      options=['-a']):
+            print(process.args)
+
+    Args:
+        cwd (str, optional): The current working directory. Defaults to the current
+            directory.
+        strict (bool, optional): Whether to raise an exception if an rsync command
+            returns a non-zero exit code. Defaults to True.
+        verbose (bool, optional): Whether to print the rsync commands before executing
+            them. Defaults to False.
+        debounce (float, optional): Seconds without changes before a batch is synced.
+            Defaults to 1.0.
+        max_delay (float, optional): Maximum seconds a change waits before being
+            synced. Defaults to 30.0.
+        initial_sync (bool, optional): Whether to run a full sync before watching.
+            Defaults to True.
+        use_inotify (Optional[bool], optional): Force (True) or disable (False)
+            inotify. By default inotify is used when available, falling back to
+            polling.
+        poll_interval (float, optional): Seconds between snapshots when polling.
+            Defaults to 1.0.
+        stop (Optional[threading.Event], optional): Stops watching when set, after
+            syncing the changes not synced yet. Defaults to None.
+        **kwargs: Additional options to be passed to the `get_rsync_command` function.
+
+    Yields:
+        subprocess.CompletedProcess: The completed process of each synced batch.
+
+    Raises:
+        ValueError: If the source is remote or not a directory.
+    """
+    if is_remote_directory(kwargs['source'], kwargs.get('source_ssh'), kwargs.get('source_daemon')):
+        raise ValueError('watch requires a local source')
+
+    source = os.path.join(cwd, kwargs['source'])
+    if not os.path.isdir(source):
+        raise ValueError('watch requires a source directory')
+
+    root, prefix = source, ''
+    if kwargs.get('sync_source_contents', True) is False:
+        root, prefix = os.path.split(strip_trailing_slash(source))
+
+    watcher = get_watcher(source, use_inotify, poll_interval)
+    try:
+        if initial_sync is True:
+            yield run(cwd=cwd, strict=strict, verbose=verbose, **kwargs)
+
+        pending = set()
+        first_change = 0.0
+        while stop is None or not stop.is_set():
+            changes = watcher.wait(debounce if pending else min(1.0, debounce))
+            if changes:
+                if not pending:
+                    first_change = time.monotonic()
+                pending |= changes
+                if time.monotonic() - first_change < max_delay:
+                    continue
+            if pending:
+                yield _sync_paths(root, (os.path.join(prefix, path) for path in sorted(pending)),
+                                  cwd, strict, verbose, kwargs)
+                pending = set()
+
+        # stopped: sync what changed since the last batch without waiting for the debounce
+        pending |= watcher.wait(0)
+        if pending:
+            yield _sync_paths(root, (os.path.join(prefix, path) for path in sorted(pending)),
+                              cwd, strict, verbose, kwargs)
+    finally:
+        watcher.close()
+
+
+def _sync_paths(root: str, paths: Iterable[str], cwd: str, strict: bool, verbose: bool,
+                kwargs: dict) -> subprocess.CompletedProcess:
+    """Sync a list of paths relative to `root` in one rsync run."""
+    with tempfile.TemporaryDirectory(prefix='sysrsync-') as lists_dir:
+        files_from = os.path.join(lists_dir, 'changes')
+        write_file_list(files_from, paths)
+        rsync_command = get_rsync_command(**{**kwargs,
+                                             'source': root,
+                                             'sync_source_contents': True,
+                                             'options': [*(kwargs.get('options') or []),
+                                                         *WATCH_OPTIONS,
+                                                         *get_files_from_options(files_from)]})
+        rsync_string = ' '.join(rsync_command)
+
+        if verbose is True:
+            print(f'[sysrsync watch] running command on "{cwd}":')
+            print(rsync_string)
+        process = subprocess.run(rsync_command, cwd=cwd, shell=False)
+
+    if strict is True:
+        _check_return_code(process.returncode, rsync_string)
+
+    return process
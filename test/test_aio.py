@@ -0,0 +1,79 @@
+"""Unit tests for the asyncio runner."""
+import asyncio
+import signal
+import time
+import unittest
+from unittest import mock
+
+from sysrsync import aio
+from sysrsync.exceptions import RsyncError
+
+
+def recording_exec(processes):
+    """Build a fake `asyncio.create_subprocess_exec` keeping the processes it starts."""
+    create_subprocess_exec = asyncio.create_subprocess_exec
+
+    async def create(*args, **kwargs):
+        processes.append(await create_subprocess_exec(*args, **kwargs))
+        return processes[-1]
+    return create
+
+
+class TestAio(unittest.TestCase):
+    """Unit tests for the asyncio runner."""
+
+    def test_gather_syncs(self):
+        """Test running several jobs and returning their results in order."""
+        with mock.patch.object(aio, 'get_rsync_command', side_effect=lambda **job: [job['source']]):
+            results = asyncio.run(aio.gather_syncs([{'source': 'true'}, {'source': 'true'}], limit=1))
+
+        self.assertEqual([0, 0], [result.returncode for result in results])
+
+    def test_gather_syncs_strict(self):
+        """Test raising RsyncError when a job fails."""
+        with mock.patch.object(aio, 'get_rsync_command', side_effect=lambda **job: [job['source']]):
+            with self.assertRaises(RsyncError):
+                asyncio.run(aio.gather_syncs([{'source': 'true'}, {'source': 'false'}]))
+
+    def test_arun_cancel_terminates_process(self):
+        """Test terminating the rsync process when arun is cancelled."""
+        async def cancel_run():
+            task = asyncio.ensure_future(aio.arun(source='unused'))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        start = time.monotonic()
+        processes = []
+        with mock.patch.object(aio, 'get_rsync_command', return_value=['sleep', '30']), \
+                mock.patch('asyncio.create_subprocess_exec', side_effect=recording_exec(processes)):
+            asyncio.run(cancel_run())
+
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertEqual(-signal.SIGTERM, processes[0].returncode)
+
+    def test_gather_syncs_failure_cancels_siblings(self):
+        """Test stopping the other jobs' rsync processes when a job fails."""
+        commands = {'slow': ['sleep', '30'], 'failing': ['sh', '-c', 'sleep 0.2; exit 1']}
+        start = time.monotonic()
+        processes = []
+        with mock.patch.object(aio, 'get_rsync_command', side_effect=lambda **job: commands[job['source']]), \
+                mock.patch('asyncio.create_subprocess_exec', side_effect=recording_exec(processes)):
+            with self.assertRaises(RsyncError):
+                asyncio.run(aio.gather_syncs([{'source': 'slow'}, {'source': 'failing'}]))
+
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertEqual([-signal.SIGTERM, 1], [process.returncode for process in processes])
+
+    def test_gather_syncs_return_exceptions(self):
+        """Test returning the exceptions in the results when asked to."""
+        with mock.patch.object(aio, 'get_rsync_command', side_effect=lambda **job: [job['source']]):
+            results = asyncio.run(aio.gather_syncs([{'source': 'false'}, {'source': 'true'}], return_exceptions=True))
+
+        self.assertIsInstance(results[0], RsyncError)
+        self.assertEqual(0, results[1].returncode)
+
+
+if __name__ == '__main__':
+    unittest.main()
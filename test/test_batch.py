@@ -0,0 +1,47 @@
+"""Unit tests for the batch fan-out module."""
+import unittest
+from unittest import mock
+
+from sysrsync import batch
+from sysrsync.command_maker import get_read_batch_command
+from sysrsync.exceptions import RsyncError
+
+
+class TestBatch(unittest.TestCase):
+    """Unit tests for the batch fan-out module."""
+
+    def test_read_batch_command(self):
+        """Test generating a command that applies a batch to a remote destination."""
+        expect = ['rsync', '--read-batch=/tmp/batch', '-a', 'host1:/b']
+        result = get_read_batch_command('/tmp/batch', '/b/', destination_ssh='host1', options=['-a'])
+
+        self.assertEqual(expect, result)
+
+    def test_fan_out(self):
+        """Test writing the batch against the reference and reading it on the replicas."""
+        destinations = [{'destination': '/ref'},
+                        {'destination': '/b', 'destination_ssh': 'host1'},
+                        {'destination': '/c', 'destination_ssh': 'host2'}]
+        completed = mock.Mock(returncode=0)
+        with mock.patch.object(batch, 'run', return_value=completed) as reference_run, \
+                mock.patch('subprocess.run', return_value=completed) as replica_run:
+            result = batch.fan_out(destinations, parallelism=2, source='/a', options=['-a'])
+
+        reference_kwargs = reference_run.call_args[1]
+        self.assertEqual('/ref', reference_kwargs['destination'])
+        self.assertTrue(reference_kwargs['options'][1].startswith('--write-batch='))
+        replica_commands = sorted(call[0][0][-1] for call in replica_run.call_args_list)
+        self.assertEqual(['host1:/b', 'host2:/c'], replica_commands)
+        self.assertEqual(3, len(result))
+
+    def test_fan_out_strict(self):
+        """Test raising a single RsyncError when a replica fails."""
+        destinations = [{'destination': '/ref'}, {'destination': '/b'}]
+        with mock.patch.object(batch, 'run', return_value=mock.Mock(returncode=0)), \
+                mock.patch('subprocess.run', side_effect=lambda command, **_: mock.Mock(args=command, returncode=12)):
+            with self.assertRaises(RsyncError):
+                batch.fan_out(destinations, source='/a')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+"""Unit tests for the manifest cache module."""
+import os
+import unittest
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from sysrsync.cache import ManifestCache
+from sysrsync.runner import run
+
+
+class TestCache(unittest.TestCase):
+    """Unit tests for the manifest cache module."""
+
+    def test_fingerprint_changes(self):
+        """Test the fingerprint changing when a file is added or resized."""
+        with TemporaryDirectory() as source:
+            first = ManifestCache.fingerprint(source)
+            with open(os.path.join(source, 'file'), 'w') as file:
+                file.write('a')
+            second = ManifestCache.fingerprint(source)
+            with open(os.path.join(source, 'file'), 'w') as file:
+                file.write('ab')
+            third = ManifestCache.fingerprint(source)
+
+        self.assertEqual(3, len({first, second, third}))
+
+    def test_fingerprint_stable(self):
+        """Test the fingerprint not changing when nothing changed."""
+        with TemporaryDirectory() as source:
+            os.makedirs(os.path.join(source, 'a', 'b'))
+            self.assertEqual(ManifestCache.fingerprint(source), ManifestCache.fingerprint(source))
+
+    def test_record_and_invalidate(self):
+        """Test recording and explicitly invalidating a fingerprint."""
+        with TemporaryDirectory() as directory:
+            cache = ManifestCache(directory)
+            cache.record('key', 'fingerprint')
+            self.assertTrue(cache.is_fresh('key', 'fingerprint'))
+            cache.invalidate('key')
+            self.assertFalse(cache.is_fresh('key', 'fingerprint'))
+
+    def test_clear(self):
+        """Test forgetting every fingerprint."""
+        with TemporaryDirectory() as directory:
+            cache = ManifestCache(directory)
+            cache.record('key', 'fingerprint')
+            cache.clear()
+            self.assertIsNone(cache.get('key'))
+
+    def test_run_skips_unchanged_source(self):
+        """Test run not spawning rsync for a source that did not change."""
+        with TemporaryDirectory() as source, TemporaryDirectory() as directory:
+            cache = ManifestCache(directory)
+            completed = mock.Mock(returncode=0)
+            with mock.patch('subprocess.run', return_value=completed) as rsync:
+                first = run(source=source, destination='/b', cache=cache)
+                second = run(source=source, destination='/b', cache=cache)
+
+        self.assertEqual(1, rsync.call_count)
+        self.assertFalse(first.skipped)
+        self.assertEqual(1, first.attempts)
+        self.assertTrue(second.skipped)
+        self.assertIsNone(second.stats)
+        self.assertEqual(0, second.attempts)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+"""Unit tests for the output capture helper."""
+import gzip
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from sysrsync import runner
+from sysrsync.exceptions import PartialTransferError
+from sysrsync.helpers.capture import open_line_sink
+
+SCRIPT = 'for i in 1 2 3 4 5; do echo out$i; echo err$i >&2; done; exit 23'
+
+
+class TestCaptureHelper(unittest.TestCase):
+    """Unit tests for the output capture helper."""
+
+    def test_compressed_file_sink(self):
+        """Test writing lines to a gzip compressed file."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'rsync.log.gz')
+            with open_line_sink(path, compress=True) as write_line:
+                write_line('a')
+                write_line('b')
+
+            with gzip.open(path, 'rt') as log:
+                self.assertEqual('a\nb\n', log.read())
+
+    def test_run_keeps_stderr_tail(self):
+        """Test streaming stdout to a callback and attaching the last stderr lines to the error."""
+        lines = []
+        with mock.patch.object(runner, 'get_rsync_command', return_value=['sh', '-c', SCRIPT]):
+            with self.assertRaises(PartialTransferError) as context:
+                runner.run(source='/a', destination='/b', output=lines.append, stderr_lines=2)
+
+        self.assertEqual([f'out{index}' for index in range(1, 6)], lines)
+        self.assertEqual(['err4', 'err5'], context.exception.stderr_tail)
+        self.assertTrue(str(context.exception).endswith('\n  err4\n  err5'))
+
+    def test_run_without_strict(self):
+        """Test setting the stderr tail on the returned process."""
+        with mock.patch.object(runner, 'get_rsync_command', return_value=['sh', '-c', SCRIPT]):
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'rsync.log')
+                process = runner.run(source='/a', destination='/b', strict=False, output=path, stderr_lines=1)
+                with open(path) as log:
+                    self.assertEqual(5, len(log.readlines()))
+
+        self.assertEqual(['err5'], process.stderr_tail)
+
+
+if __name__ == '__main__':
+    unittest.main()
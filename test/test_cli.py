@@ -0,0 +1,111 @@
+"""Unit tests for the cli module."""
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import mock
+
+from sysrsync import cli, scheduler
+from sysrsync.exceptions import PrivateKeyError
+
+MANIFEST = '''
+parallelism = 2
+
+[defaults]
+options = ["-a"]
+
+[[jobs]]
+name = "web"
+source = "/srv/web"
+destination = "/backup/web"
+destination_ssh = "host1"
+
+[[jobs]]
+source = "/srv/db"
+destination = "/backup/db"
+options = ["-a", "--delete"]
+'''
+
+
+class TestCli(unittest.TestCase):
+    """Unit tests for the cli module."""
+
+    def setUp(self):
+        """Create a directory for manifests and summaries."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write_manifest(self, content: str) -> str:
+        """Write a manifest, returning its path."""
+        path = os.path.join(self.directory.name, 'jobs.toml')
+        with open(path, 'w') as manifest:
+            manifest.write(content)
+        return path
+
+    def test_load_manifest_merges_defaults(self):
+        """Test defaults applying to jobs that don't override them, and unnamed jobs getting a name."""
+        manifest = cli.load_manifest(self.write_manifest(MANIFEST))
+
+        self.assertEqual(2, manifest['parallelism'])
+        self.assertEqual(['-a'], manifest['jobs'][0]['options'])
+        self.assertEqual(['-a', '--delete'], manifest['jobs'][1]['options'])
+        self.assertEqual('job-1', manifest['jobs'][1]['name'])
+
+    def test_load_manifest_rejects_invalid_jobs(self):
+        """Test rejecting manifests without jobs, with unknown keys or without a destination."""
+        for content in ('parallelism = 2\n',
+                        '[[jobs]]\nsource = "/a"\ndestination = "/b"\nexclude = ["x"]\n',
+                        '[[jobs]]\nsource = "/a"\n'):
+            with self.assertRaises(ValueError):
+                cli.load_manifest(self.write_manifest(content))
+
+    def test_run_manifest_summarizes_jobs(self):
+        """Test reporting the return code, error and duration of every job."""
+        def fake_run(**kwargs):
+            if kwargs['source'] == '/srv/db':
+                raise PrivateKeyError('/missing')
+            return mock.Mock(returncode=0)
+
+        manifest = cli.load_manifest(self.write_manifest(MANIFEST))
+        with mock.patch.object(scheduler, 'run', side_effect=fake_run) as run:
+            summary = cli.run_manifest(manifest)
+
+        self.assertEqual(1, summary['succeeded'])
+        self.assertEqual(1, summary['failed'])
+        web, database = summary['jobs']
+        self.assertEqual(('web', 0, None), (web['name'], web['return_code'], web['error']))
+        self.assertIsNone(database['return_code'])
+        self.assertIn('/missing', database['error'])
+        self.assertGreaterEqual(web['duration'], 0)
+        self.assertFalse(run.call_args_list[0][1]['strict'])
+        self.assertNotIn('name', run.call_args_list[0][1])
+
+    def test_main_writes_summary(self):
+        """Test writing the JSON summary and exiting with 1 when a job fails."""
+        summary_path = os.path.join(self.directory.name, 'summary.json')
+        codes = iter([0, 23])
+
+        with mock.patch.object(scheduler, 'run', side_effect=lambda **kwargs: mock.Mock(returncode=next(codes))), \
+                redirect_stderr(io.StringIO()) as stderr:
+            code = cli.main([self.write_manifest(MANIFEST), '--parallelism', '1', '--summary', summary_path])
+
+        with open(summary_path) as summary_file:
+            summary = json.load(summary_file)
+        self.assertEqual(1, code)
+        self.assertEqual([0, 23], [job['return_code'] for job in summary['jobs']])
+        self.assertIn('job-1: exited with code 23', stderr.getvalue())
+
+    def test_main_rejects_invalid_manifest(self):
+        """Test exiting with 2 without running anything when the manifest is invalid."""
+        with mock.patch.object(scheduler, 'run') as run, redirect_stderr(io.StringIO()), \
+                redirect_stdout(io.StringIO()):
+            code = cli.main([os.path.join(self.directory.name, 'missing.toml')])
+
+        self.assertEqual(2, code)
+        run.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
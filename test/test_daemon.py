@@ -0,0 +1,55 @@
+"""Unit tests for the local rsync daemon."""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from sysrsync import runner
+from sysrsync.daemon import RsyncDaemon
+from sysrsync.exceptions import RsyncDaemonError
+
+
+class TestDaemon(unittest.TestCase):
+    """Unit tests for the local rsync daemon."""
+
+    def test_config(self):
+        """Test rendering the modules, authentication and permissions of the daemon."""
+        daemon = RsyncDaemon({'backups': '/srv/backups'}, read_only=True, users={'sync': 'secret'})
+        daemon.config_dir = '/tmp/conf'
+        config = daemon.get_config()
+
+        self.assertIn('read only = true\n', config)
+        self.assertIn('auth users = sync\n', config)
+        self.assertIn('secrets file = /tmp/conf/rsyncd.secrets\n', config)
+        self.assertTrue(config.endswith('[backups]\npath = /srv/backups\n'))
+
+    def test_start_failure(self):
+        """Test raising RsyncDaemonError and removing the config when the daemon exits."""
+        process = mock.Mock()
+        process.poll.return_value = 10
+        daemon = RsyncDaemon({'backups': '/srv/backups'}, users={'sync': 'secret'})
+        with mock.patch('subprocess.Popen', return_value=process) as popen:
+            with self.assertRaises(RsyncDaemonError):
+                daemon.start()
+
+        config = popen.call_args[0][0][3].partition('=')[2]
+        self.assertFalse(os.path.exists(config))
+        self.assertIsNone(daemon.config_dir)
+
+    @unittest.skipIf(shutil.which('rsync') is None, 'rsync is not installed')
+    def test_push_to_daemon(self):
+        """Test pushing files to a throwaway daemon with a password."""
+        with tempfile.TemporaryDirectory() as source, tempfile.TemporaryDirectory() as module:
+            with open(os.path.join(source, 'file'), 'w') as file:
+                file.write('data')
+            with RsyncDaemon({'files': module}, users={'sync': 'secret'}) as daemon:
+                runner.run(source=source, destination='files/copy', options=['-a'],
+                           destination_daemon=f'sync@{daemon.endpoint}',
+                           password_file=daemon.get_password_file('sync'))
+
+            self.assertTrue(os.path.exists(os.path.join(module, 'copy', 'file')))
+
+
+if __name__ == '__main__':
+    unittest.main()
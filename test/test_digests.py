@@ -0,0 +1,121 @@
+"""Unit tests for the content digest cache."""
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+from sysrsync import runner
+from sysrsync.digests import DigestCache
+
+
+def write(path, data):
+    """Write a file, creating its directory."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        file.write(data)
+
+
+class TestDigests(unittest.TestCase):
+    """Unit tests for the content digest cache."""
+
+    def setUp(self):
+        """Create a source tree and an empty cache."""
+        self.workdir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.workdir.name, 'source')
+        for name in ('a', 'b', 'sub/c'):
+            write(os.path.join(self.source, name), name)
+        self.digests = DigestCache(os.path.join(self.workdir.name, 'digests'), processes=1)
+
+    def tearDown(self):
+        """Remove the source tree and the cache."""
+        self.workdir.cleanup()
+
+    def test_scan_and_record(self):
+        """Test reporting only files whose content changed, after a round trip through the store."""
+        first = self.digests.scan(self.source, {})
+        self.assertEqual(['a', 'b', 'sub/c'], first.changed)
+        self.digests.record('key', first.states)
+
+        write(os.path.join(self.source, 'a'), 'a')
+        write(os.path.join(self.source, 'b'), 'changed')
+        os.remove(os.path.join(self.source, 'sub/c'))
+        second = self.digests.scan(self.source, self.digests.load('key'))
+
+        self.assertEqual(['b'], second.changed)
+        self.assertEqual(['sub/c'], second.deleted)
+        self.assertEqual(2, second.hashed)
+
+    def test_process_pool(self):
+        """Test hashing with a process pool above the threshold."""
+        pooled = DigestCache(self.digests.directory, processes=2, pool_threshold=2)
+
+        self.assertEqual(self.digests.scan(self.source, {}), pooled.scan(self.source, {}))
+
+    def test_evict(self):
+        """Test removing the least recently used digests beyond the size bound, keeping the latest."""
+        states = self.digests.scan(self.source, {}).states
+        self.digests.record('old', states)
+        os.utime(os.path.join(self.digests.directory, 'old'), (0, 0))
+        self.digests.max_size = os.path.getsize(os.path.join(self.digests.directory, 'old'))
+        self.digests.record('new', states)
+
+        self.assertEqual(['new'], os.listdir(self.digests.directory))
+
+    def test_run_with_digests(self):
+        """Test sending only changed files with --delete-missing-args, and skipping unchanged sources."""
+        completed = subprocess.CompletedProcess([], 0)
+        options = ['-a', '--delete']
+        with mock.patch.object(runner, '_execute', return_value=completed) as execute:
+            runner.run(source=self.source, destination='/b', digests=self.digests, options=options)
+            write(os.path.join(self.source, 'b'), 'changed')
+            os.remove(os.path.join(self.source, 'a'))
+            runner.run(source=self.source, destination='/b', digests=self.digests, options=options)
+            skipped = runner.run(source=self.source, destination='/b', digests=self.digests, options=options)
+
+        self.assertEqual(2, execute.call_count)
+        self.assertEqual(['a', 'b', 'sub/c'], execute.call_args_list[0][0][3])
+        command, _, _, files_from = execute.call_args_list[1][0][:4]
+        self.assertEqual(['b', 'a'], files_from)
+        self.assertIn('--delete-missing-args', command)
+        self.assertTrue(skipped.skipped)
+
+    def test_run_with_digests_same_size_and_mtime(self):
+        """Test sending a file whose content changed behind an unchanged size and mtime with --ignore-times."""
+        completed = subprocess.CompletedProcess([], 0)
+        path = os.path.join(self.source, 'b')
+        with mock.patch.object(runner, '_execute', return_value=completed) as execute:
+            runner.run(source=self.source, destination='/b', digests=self.digests, options=['-a'])
+            status = os.stat(path)
+            write(path, 'B')
+            os.utime(path, ns=(status.st_atime_ns, status.st_mtime_ns))
+            runner.run(source=self.source, destination='/b', digests=self.digests, options=['-a'])
+            runner.run(source=self.source, destination='/b', digests=self.digests, options=['-a', '--checksum'])
+
+        command, _, _, files_from = execute.call_args_list[1][0][:4]
+        self.assertEqual(['b'], files_from)
+        self.assertIn('--ignore-times', command)
+        self.assertNotIn('--ignore-times', execute.call_args_list[2][0][0])
+
+    def test_run_with_digests_delete_options(self):
+        """Test deleting files removed from the source with every deletion option, but not without one."""
+        completed = subprocess.CompletedProcess([], 0)
+        for options, deletes in ((['-a', '--del'], True), (['-a', '--delete-after'], True),
+                                 (['-a', '--delete-excluded'], True), (['-a'], False)):
+            with self.subTest(options=options):
+                self.digests.clear()
+                write(os.path.join(self.source, 'a'), 'a')
+                with mock.patch.object(runner, '_execute', return_value=completed) as execute:
+                    runner.run(source=self.source, destination='/b', digests=self.digests, options=options)
+                    os.remove(os.path.join(self.source, 'a'))
+                    runner.run(source=self.source, destination='/b', digests=self.digests, options=options)
+
+                self.assertEqual(2 if deletes else 1, execute.call_count)
+                if deletes:
+                    command, _, _, files_from = execute.call_args_list[1][0][:4]
+                    self.assertIn('--delete-missing-args', command)
+                    self.assertEqual(['a'], files_from)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -94,6 +94,14 @@ class TestDirectoriesHelper(unittest.TestCase):
 
         self.assertEqual(result, directory)
 
+    def test_get_remote_host(self):
+        """Test finding the host of ssh, daemon and local paths, without user and port."""
+        self.assertEqual('host', directories.get_remote_host('/a', ssh='user@host'))
+        self.assertEqual('host', directories.get_remote_host('/a', daemon='user@host:873'))
+        self.assertEqual('host', directories.get_remote_host('rsync://user@host:873/module/a'))
+        self.assertEqual('host', directories.get_remote_host('user@host::module/a'))
+        self.assertIsNone(directories.get_remote_host('/a'))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,80 @@
+"""Unit tests for the file list helper module."""
+import os
+import sys
+import unittest
+from tempfile import TemporaryDirectory
+
+from sysrsync.helpers import file_list
+from sysrsync.runner import _execute
+
+
+class TestFileListHelper(unittest.TestCase):
+    """Unit tests for the file list helper module."""
+
+    def test_write_file_list(self):
+        """Test writing NUL separated paths from a generator."""
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'list')
+            file_list.write_file_list(path, (f'file{index}' for index in range(3)))
+            with open(path, 'rb') as written:
+                result = written.read()
+
+        self.assertEqual(b'file0\0file1\0file2\0', result)
+
+    def test_get_filter_options(self):
+        """Test inclusions coming before exclusions in the filter options."""
+        with TemporaryDirectory() as directory:
+            options, _ = file_list.get_filter_options(directory, ['*.py'], ['*'])
+
+        expect = ['--from0',
+                  '--include-from', os.path.join(directory, 'include-from'),
+                  '--exclude-from', os.path.join(directory, 'exclude-from')]
+        self.assertEqual(expect, options)
+
+    def test_get_filter_options_digest(self):
+        """Test the filter digest depending on the patterns."""
+        with TemporaryDirectory() as directory:
+            _, first = file_list.get_filter_options(directory, exclusions=['a'])
+            _, second = file_list.get_filter_options(directory, exclusions=['b'])
+
+        self.assertNotEqual(first, second)
+
+    def test_get_filter_options_empty(self):
+        """Test generating no options when there are no patterns."""
+        with TemporaryDirectory() as directory:
+            options, _ = file_list.get_filter_options(directory)
+
+        self.assertEqual([], options)
+
+    def test_execute_streams_files_from(self):
+        """Test streaming files_from to the standard input of the process."""
+        with TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'stdin')
+            command = [sys.executable, '-c',
+                       f'import shutil, sys; shutil.copyfileobj(sys.stdin.buffer, open({output!r}, "wb"))']
+            process = _execute(command, directory, files_from=(str(index) for index in range(10000)))
+            with open(output, 'rb') as received:
+                result = received.read().split(b'\0')
+
+        self.assertEqual(0, process.returncode)
+        self.assertEqual(10001, len(result))
+        self.assertEqual(b'9999', result[-2])
+
+    def test_execute_files_from_error(self):
+        """Test killing the process and raising when files_from fails partway, instead of sending a truncated list."""
+        def paths():
+            yield from (str(index) for index in range(100))
+            raise RuntimeError('listing failed')
+
+        with TemporaryDirectory() as directory:
+            finished = os.path.join(directory, 'finished')
+            command = [sys.executable, '-c',
+                       f'import sys; sys.stdin.buffer.read(); open({finished!r}, "w").close()']
+            with self.assertRaisesRegex(RuntimeError, 'listing failed'):
+                _execute(command, directory, files_from=paths())
+
+            self.assertFalse(os.path.exists(finished))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""Unit tests for the instrumentation hooks."""
+import tempfile
+import unittest
+from unittest import mock
+
+from sysrsync import instrumentation, runner
+from sysrsync.exceptions import RsyncError
+from sysrsync.instrumentation import Histogram, Hook, MetricsCollector
+
+PROGRESS_SCRIPT = r"printf '  1,048,576  50%%  1.00MB/s    0:00:01 (xfr#1, to-chk=1/2)\r'; exit {}"
+
+
+class RecordingHook(Hook):
+    """Records the events it receives."""
+
+    def __init__(self):
+        self.events = []
+
+    def on_start(self, trace):
+        self.events.append('start')
+
+    def on_spawned(self, trace):
+        self.events.append('spawned')
+
+    def on_progress(self, trace, event):
+        self.events.append(('progress', event.bytes))
+
+    def on_finished(self, trace, process):
+        self.events.append('finished')
+
+    def on_failed(self, trace, error):
+        self.events.append('failed')
+
+
+def run_script(return_code=0, **kwargs):
+    """Run a shell script printing a progress line in place of rsync."""
+    with mock.patch.object(runner, 'get_rsync_command',
+                           return_value=['sh', '-c', PROGRESS_SCRIPT.format(return_code)]):
+        return runner.run(source='/a', destination='/b', **kwargs)
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Unit tests for the instrumentation hooks."""
+
+    def test_no_hooks_is_a_no_op(self):
+        """Test not tracing and not reading rsync's output when no hook is registered."""
+        self.assertIsNone(instrumentation.start_trace(None, '/'))
+        with mock.patch('subprocess.run', return_value=mock.Mock(returncode=0)) as subprocess_run:
+            runner.run(source='/a', destination='/b')
+
+        subprocess_run.assert_called_once()
+
+    def test_events_and_phases(self):
+        """Test sending every event in order and timing each phase."""
+        hook = RecordingHook()
+        timings = []
+        hook.on_finished = lambda trace, process: timings.append(dict(trace.timings))
+        run_script(hooks=[hook])
+
+        self.assertEqual(['start', 'spawned', ('progress', 1048576)], hook.events)
+        self.assertEqual(['build', 'prepare', 'spawn', 'transfer'], list(timings[0]))
+        self.assertTrue(all(seconds >= 0 for seconds in timings[0].values()))
+
+    def test_key_validation_phase(self):
+        """Test timing the private key validation apart from the command construction."""
+        hook = RecordingHook()
+        timings = []
+        hook.on_finished = lambda trace, process: timings.append(dict(trace.timings))
+        with tempfile.NamedTemporaryFile() as private_key:
+            run_script(hooks=[hook], private_key=private_key.name)
+
+        self.assertEqual(['build', 'key_validation', 'prepare', 'spawn', 'transfer'], list(timings[0]))
+
+    def test_file_list_phase(self):
+        """Test taking rsync's file list generation time from its statistics."""
+        hook = RecordingHook()
+        timings = []
+        hook.on_finished = lambda trace, process: timings.append(dict(trace.timings))
+        script = 'echo "File list generation time: 0.250 seconds"'
+        with mock.patch.object(runner, 'get_rsync_command', return_value=['sh', '-c', script]):
+            runner.run(source='/a', destination='/b', stats=True, hooks=[hook])
+            runner.run(source='/a', destination='/b', hooks=[hook])
+
+        self.assertEqual(0.25, timings[0]['file_list'])
+        self.assertNotIn('file_list', timings[1])
+
+    def test_failed_event(self):
+        """Test sending the failed event with the error raised by a strict run."""
+        hook = RecordingHook()
+        instrumentation.add_hook(hook)
+        try:
+            with self.assertRaises(RsyncError):
+                run_script(return_code=12)
+        finally:
+            instrumentation.remove_hook(hook)
+
+        self.assertEqual('failed', hook.events[-1])
+        self.assertEqual([], instrumentation._hooks)
+
+    def test_metrics_collector(self):
+        """Test aggregating latencies per phase and bytes per second across runs."""
+        metrics = MetricsCollector()
+        run_script(hooks=[metrics])
+        run_script(return_code=23, strict=False, hooks=[metrics])
+        summary = metrics.get_summary()
+
+        self.assertEqual(2, summary['runs'])
+        self.assertEqual(1, summary['failures'])
+        self.assertEqual(2, summary['latency']['transfer']['count'])
+        self.assertEqual(2, summary['latency']['total']['count'])
+        self.assertEqual(2, summary['bytes_per_second']['count'])
+
+    def test_histogram(self):
+        """Test estimating quantiles from bucket bounds, capped to the maximum."""
+        histogram = Histogram((1, 10, 100))
+        for value in (0.5, 2, 3, 50, 70):
+            histogram.observe(value)
+
+        self.assertEqual(10, histogram.quantile(0.5))
+        self.assertEqual(70, histogram.quantile(0.95))
+        self.assertEqual(0.5, histogram.get_summary()['min'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+"""Unit tests for the itemize helper module."""
+import unittest
+
+from sysrsync.helpers.itemize import parse_itemized_line
+
+
+class TestItemizeHelper(unittest.TestCase):
+    """Unit tests for the itemize helper module."""
+
+    def test_new_file(self):
+        """Test parsing a file that does not exist on the destination."""
+        change = parse_itemized_line('>f+++++++++ 1,234 dir/new file')
+
+        self.assertEqual(('dir/new file', 1234), change[:2])
+        self.assertTrue(change.is_new)
+        self.assertTrue(change.transfers_data)
+        self.assertFalse(change.is_dir)
+
+    def test_changed_file(self):
+        """Test parsing a file whose size and time changed."""
+        change = parse_itemized_line('>f.st...... 2.50K file')
+
+        self.assertEqual(2560, change.size)
+        self.assertFalse(change.is_new)
+        self.assertTrue(change.transfers_data)
+
+    def test_attribute_change(self):
+        """Test parsing entries whose attributes only change, including unchanged ones listed with -ii."""
+        directory = parse_itemized_line('.d..t...... 4096 dir/')
+        unchanged = parse_itemized_line('.f          10 file')
+
+        self.assertTrue(directory.is_dir)
+        self.assertFalse(directory.transfers_data)
+        self.assertFalse(unchanged.is_new)
+
+    def test_deleted(self):
+        """Test parsing a deletion."""
+        change = parse_itemized_line('*deleting   0 old/file')
+
+        self.assertEqual('old/file', change.path)
+        self.assertTrue(change.is_deleted)
+        self.assertFalse(change.is_new)
+        self.assertFalse(change.transfers_data)
+
+    def test_other_lines(self):
+        """Test ignoring lines that are not itemized changes."""
+        for line in ('sending incremental file list', 'Number of files: 3 (reg: 2, dir: 1)', '',
+                     'total size is 1,234  speedup is 1.00 (DRY RUN)'):
+            self.assertIsNone(parse_itemized_line(line))
+
+
+if __name__ == '__main__':
+    unittest.main()
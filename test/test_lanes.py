@@ -0,0 +1,168 @@
+"""Unit tests for the lanes module."""
+import json
+import os
+import subprocess
+import unittest
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from sysrsync import lanes, runner
+from sysrsync.exceptions import RsyncError
+from sysrsync.helpers.stats import RsyncStats
+from sysrsync.history import ThroughputHistory
+from sysrsync.lanes import LanePolicy
+from sysrsync.retry import RetryPolicy
+
+
+def fake_run(return_codes=None):
+    """Build a fake `run` returning statistics, and the given code for lanes listing a path.
+
+    The small-file lane, which lists no paths, is called `small`.
+    """
+    def run(**kwargs):
+        paths = kwargs.get('files_from') or ['small']
+        process = subprocess.CompletedProcess(args=['rsync', *paths],
+                                              returncode=max([(return_codes or {}).get(path, 0) for path in paths]))
+        process.stats = RsyncStats(files=len(paths), transferred_size=100)
+        return process
+    return run
+
+
+class TestLanes(unittest.TestCase):
+    """Unit tests for the lanes module."""
+
+    def setUp(self):
+        """Create a source with small files, large files and an empty directory."""
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.parent = directory.name
+        self.source = os.path.join(directory.name, 'source')
+        os.makedirs(os.path.join(self.source, 'sub'))
+        os.makedirs(os.path.join(self.source, 'empty'))
+        for path, size in (('small', 10), ('sub/small', 20), ('large', 300), ('sub/large', 200), ('huge', 900)):
+            with open(os.path.join(self.source, path), 'wb') as file:
+                file.write(b'x' * size)
+        os.symlink('large', os.path.join(self.source, 'link'))
+
+    def test_classify(self):
+        """Test sending directories, links and files up to the threshold through the small-file lane."""
+        source_lanes = LanePolicy(threshold=100).classify(self.source)
+
+        self.assertEqual(['empty', 'link', 'small', 'sub', 'sub/small'], sorted(source_lanes.small))
+        self.assertEqual({'huge': 900, 'large': 300, 'sub/large': 200},
+                         {entry.path: entry.size for entry in source_lanes.large})
+
+    def test_find_large_files(self):
+        """Test finding only the files above the threshold."""
+        large = LanePolicy(threshold=100).find_large_files(self.parent, 'source')
+
+        self.assertEqual({'source/huge': 900, 'source/large': 300, 'source/sub/large': 200},
+                         {entry.path: entry.size for entry in large})
+
+    def test_lanes(self):
+        """Test a small-file lane walking the source without the large files, which are balanced over the others."""
+        policy = LanePolicy(threshold=100, parallelism=2, large_file_mode='inplace')
+        with mock.patch.object(lanes, 'run', side_effect=fake_run()) as run:
+            process = runner.run(source=self.source, destination='/b', options=['-a'], stats=True, lanes=policy,
+                                 exclusions_from=iter(['*.tmp']))
+
+        calls = [call[1] for call in run.call_args_list]
+        small_lane = next(kwargs for kwargs in calls if kwargs['files_from'] is None)
+        large_lanes = [kwargs for kwargs in calls if kwargs['files_from'] is not None]
+        self.assertEqual([['huge'], ['large', 'sub/large']], sorted(sorted(kwargs['files_from'])
+                                                                    for kwargs in large_lanes))
+        self.assertEqual(['-a', '--no-recursive', '--inplace'], large_lanes[0]['options'])
+        self.assertEqual(['*.tmp'], large_lanes[0]['exclusions_from'])
+        self.assertEqual(['-a', '--recursive', '--inc-recursive', '--no-compress'], small_lane['options'])
+        self.assertEqual(self.source, small_lane['source'])
+        self.assertTrue(small_lane['sync_source_contents'])
+        self.assertEqual(['*.tmp', '/huge', '/large', '/sub/large'], sorted(small_lane['exclusions_from']))
+        self.assertEqual(0, process.returncode)
+        self.assertEqual(3, len(process.args))
+        self.assertEqual(4, process.stats.files)
+
+    def test_only_small_files(self):
+        """Test running the small-file lane alone when no file is above the threshold."""
+        with mock.patch.object(lanes, 'run', side_effect=fake_run()) as run:
+            runner.run(source=self.source, destination='/b', lanes=LanePolicy(threshold=1000))
+
+        run.assert_called_once()
+        self.assertEqual([], run.call_args[1]['exclusions_from'])
+
+    def test_source_directory_itself(self):
+        """Test anchoring the lanes' paths under the source directory when syncing the directory itself."""
+        with mock.patch.object(lanes, 'run', side_effect=fake_run()) as run:
+            runner.run(source=self.source, destination='/b', sync_source_contents=False,
+                       lanes=LanePolicy(threshold=100, parallelism=1))
+
+        small_lane, large_lane = sorted((call[1] for call in run.call_args_list),
+                                        key=lambda kwargs: kwargs['files_from'] is not None)
+        self.assertEqual(self.source, small_lane['source'])
+        self.assertFalse(small_lane['sync_source_contents'])
+        self.assertTrue(all(pattern.startswith('/source/') for pattern in small_lane['exclusions_from']))
+        self.assertEqual(self.parent, large_lane['source'])
+        self.assertTrue(all(path.startswith('source/') for path in large_lane['files_from']))
+
+    def test_exclusion_escaping(self):
+        """Test escaping wildcards in the paths of large files excluded from the small-file lane."""
+        self.assertEqual('/sub/large', lanes._get_exclusion('sub/large'))
+        self.assertEqual('/a\\*b\\[1]', lanes._get_exclusion('a*b[1]'))
+        self.assertEqual('/a\\b', lanes._get_exclusion('a\\b'))
+
+    def test_delete(self):
+        """Test refusing deletions, which would remove the large-file lanes' temporary files."""
+        for option in ('--delete', '--delete-after', '--delete-excluded', '--del'):
+            with self.subTest(option=option), mock.patch.object(lanes, 'run') as run:
+                with self.assertRaises(ValueError):
+                    runner.run(source=self.source, destination='/b', options=['-a', option], lanes=LanePolicy())
+                run.assert_not_called()
+
+    def test_single_result(self):
+        """Test raising one error when any lane fails, after every lane ran."""
+        with mock.patch.object(lanes, 'run', side_effect=fake_run({'huge': 23})) as run:
+            with self.assertRaises(RsyncError):
+                runner.run(source=self.source, destination='/b', lanes=LanePolicy(threshold=100, parallelism=2))
+            process = runner.run(source=self.source, destination='/b', strict=False,
+                                 lanes=LanePolicy(threshold=100, parallelism=2))
+
+        self.assertEqual(6, run.call_count)
+        self.assertEqual(23, process.returncode)
+        self.assertFalse(hasattr(process, 'stats'))
+
+    def test_history(self):
+        """Test recording one sample of the combined bytes, instead of one per overlapping lane."""
+        history = ThroughputHistory(os.path.join(self.parent, 'throughput.json'))
+        with mock.patch.object(lanes, 'run', side_effect=fake_run()) as run:
+            runner.run(source=self.source, destination='/b', destination_ssh='host', history=history,
+                       lanes=LanePolicy(threshold=100, parallelism=2))
+
+        self.assertTrue(all(call[1]['history'] is None and call[1]['stats'] for call in run.call_args_list))
+        with open(history.path) as history_file:
+            self.assertEqual([300], [size for size, _ in json.load(history_file)['local -> host']])
+
+    def test_inplace_with_partial_dir(self):
+        """Test rejecting in place large files with a retry policy keeping partial files in a directory."""
+        policy = LanePolicy(threshold=100, large_file_mode='inplace')
+        with self.assertRaises(ValueError):
+            runner.run(source=self.source, destination='/b', retry=RetryPolicy(), lanes=policy)
+
+        with mock.patch.object(lanes, 'run', side_effect=fake_run()):
+            process = runner.run(source=self.source, destination='/b', retry=RetryPolicy(partial_dir=None),
+                                 lanes=policy)
+        self.assertEqual(0, process.returncode)
+
+    def test_invalid(self):
+        """Test rejecting remote sources, incompatible arguments and unknown large file modes."""
+        policy = LanePolicy()
+        with self.assertRaises(ValueError):
+            runner.run(source='/a', destination='/b', source_ssh='host', lanes=policy)
+        with self.assertRaises(ValueError):
+            runner.run(source=self.source, destination='/b', files_from=['small'], lanes=policy)
+        with self.assertRaises(ValueError):
+            runner.run(source=self.source, destination='/b', output='/tmp/log', lanes=policy)
+        with self.assertRaises(ValueError):
+            LanePolicy(large_file_mode='sparse')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+"""Unit tests for the listing API."""
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from sysrsync import listing
+from sysrsync.exceptions import RsyncError
+from sysrsync.helpers.listing import ListEntry, parse_list_line
+
+LISTING = ('drwxr-xr-x          4,096 2024/01/22 10:00:00 .\n'
+           '-rw-r--r--      1,234,567 2024/01/22 10:00:01 file with spaces\n'
+           'lrwxrwxrwx              4 2024/01/22 10:00:02 link -> file\n'
+           'receiving incremental file list\n')
+
+
+class TestListing(unittest.TestCase):
+    """Unit tests for the listing API."""
+
+    def test_parse_list_line(self):
+        """Test parsing files, directories and links, and ignoring other lines."""
+        entries = [parse_list_line(line) for line in LISTING.splitlines()]
+
+        self.assertEqual(ListEntry('file with spaces', 1234567, datetime(2024, 1, 22, 10, 0, 1), '-rw-r--r--'),
+                         entries[1])
+        self.assertTrue(entries[0].is_dir)
+        self.assertEqual(('link', 'file', True), (entries[2].path, entries[2].link_target, entries[2].is_link))
+        self.assertIsNone(entries[3])
+
+    def test_list_command(self):
+        """Test listing a remote path through the rsh options."""
+        expect = ['rsync', '--list-only', '--rsh', 'ssh -p 2222', 'host:/data/']
+        result = listing.get_list_command('/data/', ssh='host', recursive=False, rsh_port=2222)
+
+        self.assertEqual(expect, result)
+
+    def test_list_files_with_cache(self):
+        """Test yielding entries from rsync's output, and reusing the listing until it expires."""
+        cache = listing.ListingCache(ttl=60)
+        with mock.patch.object(listing, 'get_list_command', return_value=['printf', LISTING]) as command:
+            first = list(listing.list_files('/data/', ssh='host', cache=cache))
+            second = list(listing.list_files('/data/', ssh='host', cache=cache))
+            cache.invalidate('/data/', ssh='host')
+            list(listing.list_files('/data/', ssh='host', cache=cache))
+
+        self.assertEqual(3, len(first))
+        self.assertEqual(first, second)
+        self.assertEqual(2, command.call_count)
+
+    def test_list_files_strict(self):
+        """Test raising RsyncError when rsync fails."""
+        with mock.patch.object(listing, 'get_list_command', return_value=['sh', '-c', 'exit 23']):
+            with self.assertRaises(RsyncError):
+                list(listing.list_files('/missing'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""Unit tests for the migrations module."""
+import os
+import subprocess
+import unittest
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from sysrsync import migrations
+
+
+def fake_run(return_codes=None):
+    """Build a fake `run` returning a code per synced path, 0 by default."""
+    def run(**kwargs):
+        path = kwargs['files_from'][0]
+        return subprocess.CompletedProcess(args=['rsync', path], returncode=(return_codes or {}).get(path, 0))
+    return run
+
+
+class TestMigrations(unittest.TestCase):
+    """Unit tests for the migrations module."""
+
+    def setUp(self):
+        """Create a source tree with three subtrees and a journal path."""
+        self.directory = TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.source = os.path.join(self.directory.name, 'source')
+        for name in ('a', 'b', 'c'):
+            os.makedirs(os.path.join(self.source, name))
+            self.write(os.path.join(name, 'file'), name)
+        self.journal = os.path.join(self.directory.name, 'journal.sqlite')
+
+    def write(self, path: str, content: str):
+        """Write a file under the source."""
+        with open(os.path.join(self.source, path), 'w') as file:
+            file.write(content)
+
+    def migrate(self, return_codes=None, **kwargs):
+        """Run a migration with a fake `run`, returning the process and the synced paths."""
+        with mock.patch.object(migrations, 'run', side_effect=fake_run(return_codes)) as run:
+            process = migrations.migrate(self.journal, source=self.source, destination='/backup', subtrees=3,
+                                         **kwargs)
+        return process, sorted(call[1]['files_from'][0] for call in run.call_args_list)
+
+    def test_resumes_unfinished_and_changed_subtrees(self):
+        """Test syncing only subtrees that failed or changed after they finished."""
+        process, synced = self.migrate(return_codes={'b': 23}, strict=False)
+        self.assertEqual(['a', 'b', 'c'], synced)
+        self.assertEqual(23, process.returncode)
+        self.assertEqual((3, 2, 1), (process.progress.subtrees, process.progress.done, process.progress.failed))
+
+        _, synced = self.migrate()
+        self.assertEqual(['b'], synced)
+
+        _, synced = self.migrate()
+        self.assertEqual([], synced)
+
+        self.write(os.path.join('c', 'new'), 'new')
+        process, synced = self.migrate()
+        self.assertEqual(['c'], synced)
+        self.assertEqual(process.progress.files, process.progress.files_done)
+
+        os.makedirs(os.path.join(self.source, 'd'))
+        self.write(os.path.join('d', 'file'), 'd')
+        _, synced = self.migrate()
+        self.assertEqual(['d'], synced)
+
+    def test_subtree_commands(self):
+        """Test each subtree being synced recursively from the source, prefixed when syncing the directory itself."""
+        with mock.patch.object(migrations, 'run', side_effect=fake_run()) as run:
+            migrations.migrate(self.journal, source=self.source, destination='/backup', options=['-a'],
+                               sync_source_contents=False)
+
+        kwargs = run.call_args_list[0][1]
+        self.assertEqual(self.directory.name, kwargs['source'])
+        self.assertEqual(['-a', '--recursive'], kwargs['options'])
+        self.assertTrue(kwargs['files_from'][0].startswith('source' + os.sep))
+        self.assertFalse(kwargs['strict'])
+
+    def test_strict_raises_after_journaling(self):
+        """Test raising for failed subtrees once every subtree was attempted and journaled."""
+        with self.assertRaises(Exception):
+            self.migrate(return_codes={'a': 12})
+
+        with migrations.MigrationJournal(self.journal) as journal:
+            progress = journal.get_progress()
+        self.assertEqual((2, 1, 0), (progress.done, progress.failed, progress.pending))
+
+    def test_rejects_journal_of_another_migration(self):
+        """Test refusing to resume from a journal recorded for another command."""
+        self.migrate()
+        with self.assertRaises(ValueError):
+            self.migrate(options=['-a'])
+
+    def test_rejects_remote_source(self):
+        """Test requiring a local source."""
+        with self.assertRaises(ValueError):
+            migrations.migrate(self.journal, source='/a', destination='/b', source_ssh='host')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+"""Unit tests for the parallel module."""
+import os
+import subprocess
+import unittest
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from sysrsync import parallel
+from sysrsync.exceptions import PartialTransferError, RsyncError
+
+
+def fake_subprocess_run(return_codes=None):
+    """Build a fake `subprocess.run` recording the paths of each shard's file list, with the given codes by path."""
+    shards = []
+
+    def run(command, **kwargs):
+        with open(command[command.index('--files-from') + 1], 'rb') as file_list:
+            paths = sorted(os.fsdecode(path) for path in file_list.read().split(b'\0') if path)
+        shards.append(paths)
+        return subprocess.CompletedProcess(command, max((return_codes or {}).get(path, 0) for path in paths))
+    return run, shards
+
+
+class TestParallel(unittest.TestCase):
+    """Unit tests for the parallel module."""
+
+    def setUp(self):
+        """Create a source with three top level entries of different sizes."""
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.parent = directory.name
+        self.source = os.path.join(directory.name, 'source')
+        os.makedirs(os.path.join(self.source, 'sub'))
+        for path, size in (('large', 300), ('sub/medium', 200), ('small', 100)):
+            with open(os.path.join(self.source, path), 'wb') as file:
+                file.write(b'x' * size)
+
+    def test_shard_commands(self):
+        """Test one rsync per shard, each listing its paths through --files-from."""
+        run, shards = fake_subprocess_run()
+        with mock.patch('subprocess.run', side_effect=run) as rsync:
+            process = parallel.run_parallel(2, source=self.source, destination='/b', options=['-a'])
+
+        self.assertEqual(2, rsync.call_count)
+        self.assertEqual([['large'], ['small', 'sub']], sorted(shards))
+        for command in process.args:
+            self.assertEqual(['rsync', '-a', '--recursive', '--from0', '--files-from'], command[:5])
+            self.assertEqual([f'{self.source}/', '/b'], command[-2:])
+        self.assertEqual(0, process.returncode)
+
+    def test_shard_commands_without_source_contents(self):
+        """Test shards listing their paths under the source directory when syncing the directory itself."""
+        run, shards = fake_subprocess_run()
+        with mock.patch('subprocess.run', side_effect=run):
+            process = parallel.run_parallel(2, source=self.source, destination='/b', sync_source_contents=False)
+
+        self.assertEqual([['source/large'], ['source/small', 'source/sub']], sorted(shards))
+        self.assertTrue(all(command[-2:] == [f'{self.parent}/', '/b'] for command in process.args))
+
+    def test_merged_return_code(self):
+        """Test the hard failure of a shard taking precedence over a partial transfer of another."""
+        run, _ = fake_subprocess_run({'large': 23, 'small': 12})
+        with mock.patch('subprocess.run', side_effect=run):
+            process = parallel.run_parallel(2, strict=False, source=self.source, destination='/b')
+
+        self.assertEqual(12, process.returncode)
+
+    def test_strict(self):
+        """Test raising a single exception listing every failed shard."""
+        run, _ = fake_subprocess_run({'large': 23, 'small': 24})
+        with mock.patch('subprocess.run', side_effect=run):
+            with self.assertRaises(RsyncError) as context:
+                parallel.run_parallel(2, source=self.source, destination='/b')
+
+        self.assertIsInstance(context.exception, PartialTransferError)
+        self.assertIn('2 of 2 shards failed', str(context.exception))
+        self.assertIn('exited with code 23', str(context.exception))
+        self.assertIn('exited with code 24', str(context.exception))
+
+    def test_single_shard(self):
+        """Test falling back to a single run when the source cannot be split."""
+        with mock.patch.object(parallel, 'run') as run:
+            parallel.run_parallel(1, source=self.source, destination='/b')
+
+        run.assert_called_once()
+
+    def test_remote_source(self):
+        """Test rejecting a remote source."""
+        with self.assertRaises(ValueError):
+            parallel.run_parallel(2, source='/a', source_ssh='host', destination='/b')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""Unit tests for the planning and history modules."""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from sysrsync import runner
+from sysrsync.history import ThroughputHistory, get_host_pair
+from sysrsync.planning import plan
+
+DRY_RUN_OUTPUT = r"""sending incremental file list
+.d..t...... 4096 ./
+>f+++++++++ 1000 new
+cd+++++++++ 4096 sub/
+>f+++++++++ 500 sub/file
+>f.st...... 2000 changed
+.f...p..... 300 chmodded
+*deleting   0 gone
+
+Number of files: 6 (reg: 4, dir: 2)
+Total transferred file size: 3,500 bytes
+"""
+
+
+class TestPlanning(unittest.TestCase):
+    """Unit tests for the planning and history modules."""
+
+    def setUp(self):
+        """Create an empty throughput history."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.history = ThroughputHistory(os.path.join(directory.name, 'throughput.json'))
+
+    def test_get_host_pair(self):
+        """Test deriving the hosts of each side without user or port."""
+        self.assertEqual(('local', 'host'), get_host_pair({'destination_ssh': 'user@host'}))
+        self.assertEqual(('daemon', 'local'), get_host_pair({'source_daemon': 'user@daemon:873'}))
+        self.assertEqual(('local', 'backup'),
+                         get_host_pair({'source': '/a', 'destination': 'rsync://user@backup:873/m/x'}))
+        self.assertEqual(('backup', 'local'), get_host_pair({'source': 'user@backup::m/x', 'destination': '/b'}))
+
+    def test_history(self):
+        """Test the throughput of a host pair over its last samples."""
+        self.assertIsNone(self.history.get_throughput('local', 'host'))
+        for size in (100, 200, 300):
+            self.history.record('local', 'host', size, 1.0)
+        self.history.record('local', 'other', 1, 1.0)
+
+        history = ThroughputHistory(self.history.path, samples=2)
+        self.assertEqual(250.0, history.get_throughput('local', 'host'))
+        history.record('local', 'host', 700, 1.0)
+        self.assertEqual(500.0, history.get_throughput('local', 'host'))
+        self.assertEqual(2.0, history.estimate('local', 'host', 1000))
+        self.assertEqual(1.0, history.get_throughput('local', 'other'))
+
+    def test_plan(self):
+        """Test classifying the dry run's changes and estimating the duration from history."""
+        self.history.record('local', 'host', 1750, 1.0)
+        command = ['sh', '-c', f'printf "%s" "$0"', DRY_RUN_OUTPUT]
+
+        with mock.patch.object(runner, 'get_rsync_command', return_value=command) as get_rsync_command:
+            transfer_plan = plan(source='/a', destination='/b', destination_ssh='user@host', options=['-a'],
+                                 history=self.history)
+
+        options = get_rsync_command.call_args[1]['options']
+        self.assertEqual(['-a', '--dry-run', '--itemize-changes'], options[:3])
+        self.assertEqual(['new', 'sub/', 'sub/file', './', 'changed', 'chmodded', 'gone'],
+                         transfer_plan.changes.files_from)
+        self.assertEqual(['--delete-missing-args'], transfer_plan.changes.options)
+        self.assertEqual(['new', 'sub/', 'sub/file'], [change.path for change in transfer_plan.changes.new])
+        self.assertEqual(['gone'], [change.path for change in transfer_plan.changes.deleted])
+        self.assertEqual(3500, transfer_plan.changes.transfer_size)
+        self.assertEqual(3500, transfer_plan.stats.transferred_size)
+        self.assertEqual(2.0, transfer_plan.estimated_duration)
+
+    def test_plan_without_deletions(self):
+        """Test needing no extra option when the dry run deletes nothing."""
+        command = ['sh', '-c', 'printf "%s" "$0"', DRY_RUN_OUTPUT.replace('*deleting   0 gone\n', '')]
+
+        with mock.patch.object(runner, 'get_rsync_command', return_value=command):
+            transfer_plan = plan(source='/a', destination='/b')
+
+        self.assertEqual([], transfer_plan.changes.deleted)
+        self.assertEqual([], transfer_plan.changes.options)
+
+    def test_plan_without_history(self):
+        """Test leaving the estimate empty when nothing was recorded for the host pair."""
+        command = ['sh', '-c', f'printf "%s" "$0"', DRY_RUN_OUTPUT]
+
+        with mock.patch.object(runner, 'get_rsync_command', return_value=command):
+            transfer_plan = plan(source='/a', destination='/b', history=self.history)
+
+        self.assertIsNone(transfer_plan.throughput)
+        self.assertIsNone(transfer_plan.estimated_duration)
+
+    def test_run_records_history(self):
+        """Test successful runs recording their throughput, unless they are dry runs."""
+        command = ['sh', '-c', 'echo "Total transferred file size: 4,096 bytes"']
+
+        with mock.patch.object(runner, 'get_rsync_command', return_value=command):
+            runner.run(source='/a', destination='/b', destination_ssh='host', history=self.history)
+            runner.run(source='/a', destination='/b', destination_ssh='other', options=['-n'],
+                       history=self.history)
+
+        self.assertIsNotNone(self.history.get_throughput('local', 'host'))
+        self.assertIsNone(self.history.get_throughput('local', 'other'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""Unit tests for the profiles module."""
+import itertools
+import os
+import unittest
+from tempfile import NamedTemporaryFile, TemporaryDirectory
+from unittest import mock
+
+from sysrsync import profiles
+from sysrsync.command_maker import get_rsync_command
+from sysrsync.exceptions import PrivateKeyError, RemotesError
+from sysrsync.profiles import SyncProfile
+
+
+class TestProfiles(unittest.TestCase):
+    """Unit tests for the profiles module."""
+
+    def setUp(self):
+        """Create a private key file and a local tree with a file and a directory."""
+        key_file = NamedTemporaryFile(delete=False)
+        key_file.close()
+        self.addCleanup(os.remove, key_file.name)
+        self.private_key = key_file.name
+
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.file = os.path.join(directory.name, 'file')
+        open(self.file, 'w').close()
+        self.directory = os.path.join(directory.name, 'dir/')
+        os.mkdir(self.directory)
+
+    def test_equivalent_to_get_rsync_command(self):
+        """Test generating the same commands as get_rsync_command for every combination of arguments."""
+        profile_arguments = [
+            {},
+            {'options': ['-a', '--delete'], 'exclusions': ['*.tmp', '--exclude', 'cache']},
+            {'destination_ssh': 'user@host', 'private_key': self.private_key, 'rsh_port': 2222,
+             'strict_host_key_checking': False, 'ssh_options': {'ControlPath': '/tmp/socket'}},
+            {'source_ssh': 'host', 'sync_source_contents': False},
+            {'destination_daemon': 'host:8873', 'password_file': '/etc/rsync.secret', 'options': ['-a']},
+            {'source_daemon': 'user@host', 'sync_source_contents': False},
+        ]
+        pairs = [(self.file, '/b'), (self.directory, '/b/'), ('/missing', '/b'), ('module/path/', 'dest')]
+
+        for arguments, (source, destination) in itertools.product(profile_arguments, pairs):
+            with self.subTest(arguments=arguments, source=source):
+                self.assertEqual(get_rsync_command(source, destination, **arguments),
+                                 SyncProfile(**arguments).get_command(source, destination))
+
+    def test_daemon_paths_given_directly(self):
+        """Test the remote and password checks applying to daemon paths given per call."""
+        profile = SyncProfile(password_file='/etc/rsync.secret')
+
+        self.assertEqual(get_rsync_command('/a', 'host::module', password_file='/etc/rsync.secret'),
+                         profile.get_command('/a', 'host::module'))
+        with self.assertRaises(ValueError):
+            profile.get_command('/a', '/b')
+        with self.assertRaises(RemotesError):
+            SyncProfile(destination_ssh='host').get_command('rsync://host/module', '/b')
+
+    def test_validates_once(self):
+        """Test rejecting invalid profiles when created, and not looking the private key up again."""
+        with self.assertRaises(RemotesError):
+            SyncProfile(source_ssh='a', destination_ssh='b')
+        with self.assertRaises(ValueError):
+            SyncProfile(source_ssh='a', source_daemon='a')
+        with self.assertRaises(PrivateKeyError):
+            SyncProfile(private_key='this_file_does_not_exist')
+
+        profile = SyncProfile(private_key=self.private_key)
+        with mock.patch.object(profiles, 'get_rsh_command') as get_rsh_command:
+            profile.get_command('/a', '/b')
+        get_rsh_command.assert_not_called()
+
+    def test_source_is_file_skips_stat(self):
+        """Test trusting the caller about whether the source is a file."""
+        profile = SyncProfile()
+        with mock.patch.object(profiles.os.path, 'isfile') as isfile:
+            self.assertEqual(['rsync', '/a', '/b'], profile.get_command('/a', '/b', source_is_file=True))
+            self.assertEqual(['rsync', '/a/', '/b'], profile.get_command('/a', '/b', source_is_file=False))
+        isfile.assert_not_called()
+
+    def test_immutable(self):
+        """Test refusing to modify or extend a profile."""
+        profile = SyncProfile(destination_ssh='host')
+        with self.assertRaises(AttributeError):
+            profile.destination_ssh = 'other'
+        with self.assertRaises(AttributeError):
+            del profile.destination_ssh
+        with self.assertRaises(AttributeError):
+            profile.extra = True
+
+    def test_run(self):
+        """Test running the profile's command and checking its return code."""
+        profile = SyncProfile(options=['-a'])
+        with mock.patch.object(profiles.subprocess, 'run', return_value=mock.Mock(returncode=0)) as run:
+            profile.run('/a', '/b', cwd='/tmp')
+
+        run.assert_called_once_with(['rsync', '-a', '/a/', '/b'], cwd='/tmp', shell=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+"""Unit tests for the progress helper module."""
+import io
+import unittest
+
+from sysrsync.helpers import progress
+
+
+class TestProgressHelper(unittest.TestCase):
+    """Unit tests for the progress helper module."""
+
+    def test_parse_progress_line(self):
+        """Test parsing a --info=progress2 line."""
+        line = '      1,234,567  45%   12.00MB/s    0:01:05 (xfr#3, to-chk=10/20)'
+        expect = progress.ProgressEvent(bytes=1234567, percent=45, rate=12 * 1024 ** 2, eta=65,
+                                        transfers=3, remaining=10, total=20)
+        result = progress.parse_line(line)
+
+        self.assertEqual(expect, result)
+
+    def test_parse_progress_line_without_transfers(self):
+        """Test parsing a progress line before any file was transferred."""
+        line = '              0   0%    0.00kB/s    0:00:00'
+        result = progress.parse_line(line)
+
+        self.assertEqual(progress.ProgressEvent(0, 0, 0.0, 0, None, None, None), result)
+
+    def test_parse_file_line(self):
+        """Test parsing an itemized change in sysrsync's out-format."""
+        line = f'{progress.OUT_FORMAT_PREFIX}>f+++++++++ 1024 dir/file with spaces'
+        expect = progress.FileEvent('>f+++++++++', 1024, 'dir/file with spaces')
+        result = progress.parse_line(line)
+
+        self.assertEqual(expect, result)
+
+    def test_parse_message_line(self):
+        """Test parsing any other output line."""
+        line = 'sending incremental file list'
+        result = progress.parse_line(line)
+
+        self.assertEqual(progress.MessageEvent(line), result)
+
+    def test_parse_size(self):
+        """Test parsing plain and human readable sizes."""
+        self.assertEqual(1234567, progress.parse_size('1,234,567'))
+        self.assertEqual(1536, progress.parse_size('1.50K'))
+
+    def test_iter_lines(self):
+        """Test splitting on carriage returns and newlines across chunk boundaries."""
+        stream = io.BytesIO(b'first\r\nsec' + b'ond\rthird\nlast')
+        result = list(progress.iter_lines(stream, chunk_size=4))
+
+        self.assertEqual(['first', 'second', 'third', 'last'], result)
+
+
+if __name__ == '__main__':
+    unittest.main()
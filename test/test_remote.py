@@ -0,0 +1,47 @@
+"""Unit tests for remote-to-remote syncs."""
+import unittest
+from unittest import mock
+
+from sysrsync import remote
+from sysrsync.exceptions import RsyncError
+
+
+class TestRemote(unittest.TestCase):
+    """Unit tests for remote-to-remote syncs."""
+
+    def test_direct_command(self):
+        """Test running rsync on the source host with agent forwarding and a key on that host."""
+        expect = ['ssh', '-p', '2222', '-A', 'user@source',
+                  "rsync -a --rsh 'ssh -i /keys/id -p 2200' '/data dir/' dest:/backup --exclude tmp"]
+        result = remote.get_remote_to_remote_command('/data dir', '/backup/', 'user@source', 'dest',
+                                                     remote_private_key='/keys/id', destination_port=2200,
+                                                     rsh_port=2222, options=['-a'], exclusions=['tmp'])
+
+        self.assertEqual(expect, result)
+
+    def test_relay_command(self):
+        """Test forwarding a port through this machine to reach the destination from the source host."""
+        expect = ['ssh', '-R', '30000:dest:2200', '-o', 'ExitOnForwardFailure=yes', 'source',
+                  "rsync --rsh 'ssh -p 30000 -o HostKeyAlias=dest' /data/ backup@localhost:/backup"]
+        result = remote.get_remote_to_remote_command('/data', '/backup', 'source', 'backup@dest', mode='relay',
+                                                     forward_agent=False, destination_port=2200, relay_port=30000)
+
+        self.assertEqual(expect, result)
+
+    def test_unknown_mode(self):
+        """Test raising ValueError for an unknown mode."""
+        with self.assertRaises(ValueError):
+            remote.get_remote_to_remote_command('/a', '/b', 'source', 'dest', mode='staged')
+
+    def test_run_strict(self):
+        """Test raising RsyncError with the exit code of the remote rsync."""
+        with mock.patch('subprocess.run', return_value=mock.Mock(returncode=23)):
+            with self.assertRaises(RsyncError) as context:
+                remote.run_remote_to_remote(source='/a', destination='/b', source_ssh='source',
+                                            destination_ssh='dest')
+
+        self.assertEqual(23, context.exception.return_code)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""Unit tests for the retry module."""
+import unittest
+from unittest import mock
+
+from sysrsync import retry
+from sysrsync.exceptions import FatalRsyncError, PartialTransferError, RetryableRsyncError, RsyncError
+from sysrsync.runner import _check_return_code, run
+
+
+class TestRetry(unittest.TestCase):
+    """Unit tests for the retry module."""
+
+    def test_classify_return_code(self):
+        """Test classifying rsync exit codes."""
+        self.assertEqual('success', retry.classify_return_code(0))
+        self.assertEqual('retryable', retry.classify_return_code(12))
+        self.assertEqual('partial', retry.classify_return_code(24))
+        self.assertEqual('fatal', retry.classify_return_code(2))
+        self.assertEqual('fatal', retry.classify_return_code(11))
+
+    def test_typed_errors(self):
+        """Test raising typed RsyncError subclasses carrying the return code."""
+        for code, error_class in ((30, RetryableRsyncError), (23, PartialTransferError), (1, FatalRsyncError)):
+            with self.assertRaises(error_class) as context:
+                _check_return_code(code, 'rsync')
+            self.assertIsInstance(context.exception, RsyncError)
+            self.assertEqual(code, context.exception.return_code)
+
+    def test_retry_options(self):
+        """Test options that let retries resume partially sent files."""
+        self.assertEqual(['--partial-dir', '.rsync-partial'], retry.RetryPolicy().get_options())
+        self.assertEqual(['--partial', '--append-verify'],
+                         retry.RetryPolicy(partial_dir=None, append_verify=True).get_options())
+
+    def test_append_verify_without_partial_dir(self):
+        """Test keeping partial files in place with --append-verify, which rsync refuses with --partial-dir."""
+        options = retry.RetryPolicy(append_verify=True).get_options()
+
+        self.assertEqual(['--partial', '--append-verify'], options)
+        self.assertNotIn('--partial-dir', options)
+
+    def test_should_retry(self):
+        """Test retrying only retryable codes while attempts remain."""
+        policy = retry.RetryPolicy(attempts=3)
+        self.assertTrue(policy.should_retry(10, 1))
+        self.assertFalse(policy.should_retry(10, 3))
+        self.assertFalse(policy.should_retry(23, 1))
+        self.assertTrue(retry.RetryPolicy(retry_partial=True).should_retry(23, 1))
+        self.assertFalse(policy.should_retry(0, 1))
+
+    def test_get_delay(self):
+        """Test exponential backoff bounded by max_backoff, with jitter."""
+        policy = retry.RetryPolicy(backoff=1.0, max_backoff=5.0, jitter=0.5)
+        self.assertTrue(0.5 <= policy.get_delay(1) <= 1.0)
+        self.assertTrue(2.0 <= policy.get_delay(3) <= 4.0)
+        self.assertTrue(2.5 <= policy.get_delay(10) <= 5.0)
+
+    def test_run_retries(self):
+        """Test run retrying after a retryable failure and reporting the attempts."""
+        processes = [mock.Mock(returncode=12), mock.Mock(returncode=0)]
+        with mock.patch('subprocess.run', side_effect=processes) as rsync, mock.patch('time.sleep'):
+            process = run(source='/a', destination='/b', retry=retry.RetryPolicy())
+
+        self.assertEqual(2, process.attempts)
+        self.assertIn('--partial-dir', rsync.call_args[0][0])
+
+    def test_run_retry_requires_sequence(self):
+        """Test refusing to retry with a files_from iterator."""
+        with self.assertRaises(ValueError):
+            run(source='/a', destination='/b', retry=retry.RetryPolicy(), files_from=iter(['a']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+"""Unit tests for the scheduler module."""
+import threading
+import time
+import unittest
+from unittest import mock
+
+from sysrsync import scheduler
+
+
+class TestScheduler(unittest.TestCase):
+    """Unit tests for the scheduler module."""
+
+    def test_get_job_host(self):
+        """Test deriving the remote host of a job."""
+        self.assertEqual('host1', scheduler.get_job_host({'destination_ssh': 'user@host1'}))
+        self.assertEqual('host2', scheduler.get_job_host({'source_ssh': 'host2'}))
+        self.assertIsNone(scheduler.get_job_host({'source': '/a'}))
+
+    def test_per_host_limit(self):
+        """Test never running more jobs on a host than its limit."""
+        lock = threading.Lock()
+        active = {'host1': 0, 'host2': 0}
+        peak = {'host1': 0, 'host2': 0}
+
+        def fake_run(**kwargs):
+            host = kwargs['destination_ssh']
+            with lock:
+                active[host] += 1
+                peak[host] = max(peak[host], active[host])
+            time.sleep(0.02)
+            with lock:
+                active[host] -= 1
+            return mock.Mock(returncode=0)
+
+        with mock.patch.object(scheduler, 'run', side_effect=fake_run):
+            with scheduler.Scheduler(max_concurrency=8, per_host_limit=2) as jobs:
+                for index in range(12):
+                    jobs.submit(source='/a', destination='/b', destination_ssh=f'host{index % 2 + 1}')
+
+        self.assertEqual({'host1': 2, 'host2': 2}, peak)
+        self.assertEqual(12, jobs.get_latency_summary()['finished'])
+
+    def test_priority_and_bandwidth(self):
+        """Test starting higher priority jobs first with a share of the bandwidth."""
+        started = []
+        release = threading.Event()
+
+        def fake_run(**kwargs):
+            started.append((kwargs['source'], kwargs['options']))
+            release.wait(5)
+            return mock.Mock(returncode=0)
+
+        with mock.patch.object(scheduler, 'run', side_effect=fake_run):
+            jobs = scheduler.Scheduler(max_concurrency=1, bandwidth=1000)
+            jobs.submit(source='/first', destination='/b')
+            low = jobs.submit(source='/low', destination='/b')
+            high = jobs.submit(source='/high', destination='/b', priority=5)
+            self.assertEqual(2, jobs.queue_depth)
+            release.set()
+            jobs.wait(5)
+
+        self.assertEqual(['/first', '/high', '/low'], [source for source, _ in started])
+        self.assertEqual(['--bwlimit=1000'], started[1][1])
+        self.assertLessEqual(high.started_at, low.started_at)
+
+    def test_bandwidth_alone(self):
+        """Test giving the whole bandwidth budget to a job running alone."""
+        with mock.patch.object(scheduler, 'run', return_value=mock.Mock(returncode=0)) as run:
+            with scheduler.Scheduler(max_concurrency=4, bandwidth=1000) as jobs:
+                jobs.submit(source='/a', destination='/b')
+
+        self.assertEqual(['--bwlimit=1000'], run.call_args[1]['options'])
+
+    def test_bandwidth_shares(self):
+        """Test splitting the bandwidth budget between each job and the jobs running when it starts."""
+        started = []
+        release = threading.Event()
+
+        def fake_run(**kwargs):
+            started.append(kwargs['options'][-1])
+            release.wait(5)
+            return mock.Mock(returncode=0)
+
+        with mock.patch.object(scheduler, 'run', side_effect=fake_run):
+            with scheduler.Scheduler(max_concurrency=4, per_host_limit=None, bandwidth=1000) as jobs:
+                for index in range(3):
+                    jobs.submit(source='/a', destination='/b')
+                    deadline = time.monotonic() + 5
+                    while len(started) <= index and time.monotonic() < deadline:
+                        time.sleep(0.001)
+                release.set()
+
+        self.assertEqual(['--bwlimit=1000', '--bwlimit=500', '--bwlimit=333'], started)
+
+    def test_job_exception(self):
+        """Test resolving the job future with the run exception."""
+        with mock.patch.object(scheduler, 'run', side_effect=RuntimeError('boom')):
+            with scheduler.Scheduler() as jobs:
+                job = jobs.submit(source='/a', destination='/b')
+
+        self.assertIsInstance(job.future.exception(), RuntimeError)
+
+
+if __name__ == '__main__':
+    unittest.main()
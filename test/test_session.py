@@ -0,0 +1,45 @@
+"""Unit tests for the ssh session module."""
+import unittest
+from unittest import mock
+
+from sysrsync.exceptions import SSHSessionError
+from sysrsync.helpers.rsync import get_rsh_command
+from sysrsync.session import SSHSession
+
+
+class TestSession(unittest.TestCase):
+    """Unit tests for the ssh session module."""
+
+    def test_get_rsh_command_ssh_options(self):
+        """Test passing additional ssh options to the rsh command."""
+        expect = ['--rsh', 'ssh -p 22 -o "ControlPath /tmp/control"']
+        result = get_rsh_command(port=22, ssh_options={'ControlPath': '/tmp/control'})
+
+        self.assertEqual(expect, result)
+
+    def test_session_rsync_command(self):
+        """Test generating rsync commands that go through the master connection."""
+        with mock.patch('subprocess.run', return_value=mock.Mock(returncode=0)) as ssh:
+            with SSHSession('myserver', port=2222) as session:
+                control_path = session.control_path
+                result = session.get_rsync_command(source='/a', destination='/b')
+
+        expect = ['rsync', '--rsh', f'ssh -p 2222 -o "ControlPath {control_path}"', '/a/', 'myserver:/b']
+        self.assertEqual(expect, result)
+        self.assertEqual(['ssh', '-O', 'exit'], ssh.call_args[0][0][:3])
+        self.assertIsNone(session.control_path)
+
+    def test_session_open_failure(self):
+        """Test raising SSHSessionError when the master connection fails to open."""
+        with mock.patch('subprocess.run', return_value=mock.Mock(returncode=255)):
+            with self.assertRaises(SSHSessionError):
+                SSHSession('myserver').open()
+
+    def test_session_not_open(self):
+        """Test raising SSHSessionError when running outside of an open session."""
+        with self.assertRaises(SSHSessionError):
+            SSHSession('myserver').get_rsync_command(source='/a', destination='/b')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""Unit tests for the shards helper module."""
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+from sysrsync.helpers import shards
+from sysrsync.parallel import merge_return_codes
+
+
+def _make_file(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(b'\0' * size)
+
+
+class TestShardsHelper(unittest.TestCase):
+    """Unit tests for the shards helper module."""
+
+    def test_measure_tree(self):
+        """Test measuring size and file count of a nested directory."""
+        with TemporaryDirectory() as root:
+            _make_file(os.path.join(root, 'a', 'b', 'file1'), 10)
+            _make_file(os.path.join(root, 'a', 'file2'), 5)
+            result = shards.measure_tree(root)
+
+        self.assertEqual((15, 2), result)
+
+    def test_balance_entries(self):
+        """Test distributing entries evenly among shards."""
+        entries = [shards.TreeEntry(name, size, 1, False)
+                   for name, size in (('a', 100), ('b', 60), ('c', 50), ('d', 10))]
+        result = shards.balance_entries(entries, 2)
+
+        self.assertEqual([['a', 'd'], ['b', 'c']], sorted(sorted(shard.paths) for shard in result))
+
+    def test_balance_entries_skips_empty_shards(self):
+        """Test not returning empty shards when there are fewer entries than shards."""
+        entries = [shards.TreeEntry('a', 1, 1, False)]
+        result = shards.balance_entries(entries, 4)
+
+        self.assertEqual([shards.Shard(['a'], 1, 1)], result)
+
+    def test_plan_shards_splits_heavy_directory(self):
+        """Test splitting a directory heavier than an even share of the tree."""
+        with TemporaryDirectory() as root:
+            for name in ('x', 'y', 'z', 'w'):
+                _make_file(os.path.join(root, 'big', name), 1000)
+            _make_file(os.path.join(root, 'small'), 10)
+            result = shards.plan_shards(root, 2)
+
+        paths = sorted(path for shard in result for path in shard.paths)
+        expect = sorted([os.path.join('big', name) for name in ('x', 'y', 'z', 'w')] + ['small'])
+        self.assertEqual(expect, paths)
+        self.assertEqual(2, len(result))
+
+    def test_merge_return_codes(self):
+        """Test hard failures taking precedence over partial transfers."""
+        self.assertEqual(0, merge_return_codes([0, 0]))
+        self.assertEqual(23, merge_return_codes([0, 23]))
+        self.assertEqual(12, merge_return_codes([24, 12, 0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
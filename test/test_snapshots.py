@@ -0,0 +1,76 @@
+"""Unit tests for the snapshot manager."""
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+from sysrsync import snapshots
+from sysrsync.snapshots import Retention, select_snapshots_to_keep
+
+
+def at(hour, day=1, month=1):
+    """Build a UTC snapshot time."""
+    return datetime(2024, month, day, hour, tzinfo=timezone.utc)
+
+
+class TestSnapshots(unittest.TestCase):
+    """Unit tests for the snapshot manager."""
+
+    def test_select_snapshots_to_keep(self):
+        """Test keeping the latest snapshots and the newest one of each recent day."""
+        names = [at(hour, day).strftime(snapshots.SNAPSHOT_FORMAT) for day in (1, 2, 3) for hour in (6, 18)]
+        keep = select_snapshots_to_keep([*names, 'unrelated'], Retention(last=1, daily=2))
+
+        self.assertEqual({'2024-01-03T180000Z', '2024-01-02T180000Z'}, keep)
+
+    def test_local_snapshot(self):
+        """Test linking against the previous snapshot, renaming the new one and pruning the old ones."""
+        with tempfile.TemporaryDirectory() as root:
+            for name in ('2024-01-01T060000Z', '2024-01-01T070000Z', '2024-01-01T080000Z.in-progress'):
+                os.mkdir(os.path.join(root, name))
+
+            def fake_run(**kwargs):
+                os.mkdir(kwargs['destination'])
+                return mock.Mock(returncode=0)
+
+            with mock.patch.object(snapshots, 'run', side_effect=fake_run) as run:
+                result = snapshots.snapshot('/a', root, keep=Retention(last=2), now=at(9), options=['-a'])
+
+            self.assertEqual('2024-01-01T090000Z', result.name)
+            self.assertEqual(['2024-01-01T060000Z'], result.pruned)
+            self.assertEqual(['-a', '--link-dest=../2024-01-01T070000Z'], run.call_args[1]['options'])
+            self.assertEqual(f'{root}/2024-01-01T090000Z.in-progress', run.call_args[1]['destination'])
+            self.assertEqual(['2024-01-01T070000Z', '2024-01-01T090000Z'], sorted(os.listdir(root)))
+
+    def test_failed_snapshot_is_not_renamed(self):
+        """Test leaving the in-progress directory in place when rsync fails without strict."""
+        with tempfile.TemporaryDirectory() as root:
+            with mock.patch.object(snapshots, 'run', return_value=mock.Mock(returncode=23)):
+                result = snapshots.snapshot('/a', root, keep=Retention(), now=at(9), strict=False)
+
+            self.assertEqual([], result.pruned)
+            self.assertEqual([], os.listdir(root))
+
+    def test_remote_snapshot(self):
+        """Test running the listing, rename and removal over ssh with the rsh options."""
+        listing = mock.Mock(stdout='2024-01-01T060000Z\n2024-01-01T070000Z\n')
+        with mock.patch.object(snapshots, 'run', return_value=mock.Mock(returncode=0)) as run, \
+                mock.patch('subprocess.run', return_value=listing) as remote:
+            result = snapshots.snapshot('/a', '/backups', keep=Retention(last=1), destination_ssh='host',
+                                        link_dest_count=2, rsh_port=2222, now=at(9))
+
+        self.assertEqual(['--link-dest=../2024-01-01T060000Z', '--link-dest=../2024-01-01T070000Z'],
+                         run.call_args[1]['options'])
+        self.assertEqual('host', run.call_args[1]['destination_ssh'])
+        commands = [call[0][0] for call in remote.call_args_list]
+        self.assertTrue(all(command[:4] == ['ssh', '-p', '2222', 'host'] for command in commands))
+        self.assertEqual('mv -- /backups/2024-01-01T090000Z.in-progress /backups/2024-01-01T090000Z',
+                         commands[2][-1])
+        self.assertEqual('rm -rf -- /backups/2024-01-01T060000Z.deleting /backups/2024-01-01T070000Z.deleting',
+                         commands[-1][-1])
+        self.assertEqual(['2024-01-01T060000Z', '2024-01-01T070000Z'], result.pruned)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""Unit tests for the stats helper module."""
+import unittest
+
+from sysrsync.helpers import stats
+
+STATS_OUTPUT = """\
+sending incremental file list
+file1
+
+Number of files: 1,234 (reg: 1,000, dir: 234)
+Number of created files: 10 (reg: 10)
+Number of deleted files: 0
+Number of regular files transferred: 12
+Total file size: 12,345,678 bytes
+Total transferred file size: 4,096 bytes
+Literal data: 1,024 bytes
+Matched data: 3,072 bytes
+File list size: 123
+File list generation time: 0.001 seconds
+File list transfer time: 0.000 seconds
+Total bytes sent: 1,456
+Total bytes received: 35
+
+sent 1,456 bytes  received 35 bytes  2,982.00 bytes/sec
+total size is 12,345,678  speedup is 8,280.13
+"""
+
+
+class TestStatsHelper(unittest.TestCase):
+    """Unit tests for the stats helper module."""
+
+    def test_parse_stats(self):
+        """Test parsing a complete --stats summary."""
+        expect = stats.RsyncStats(files=1234, created_files=10, deleted_files=0,
+                                  transferred_files=12, total_size=12345678,
+                                  transferred_size=4096, literal_data=1024,
+                                  matched_data=3072, file_list_size=123,
+                                  file_list_generation_time=0.001,
+                                  file_list_transfer_time=0.0, bytes_sent=1456,
+                                  bytes_received=35, speedup=8280.13)
+        result = stats.parse_stats(STATS_OUTPUT.splitlines())
+
+        self.assertEqual(expect, result)
+
+    def test_parse_stats_without_summary(self):
+        """Test returning empty statistics when rsync printed no summary."""
+        result = stats.parse_stats(['sending incremental file list'])
+
+        self.assertEqual(stats.RsyncStats(), result)
+
+    def test_delta_efficiency(self):
+        """Test computing the fraction of data matched by the delta algorithm."""
+        result = stats.RsyncStats(literal_data=1024, matched_data=3072).delta_efficiency
+
+        self.assertEqual(0.75, result)
+
+    def test_merge_stats(self):
+        """Test summing the statistics of several runs, skipping missing ones."""
+        result = stats.merge_stats([stats.RsyncStats(files=2, total_size=100, bytes_sent=10, bytes_received=10),
+                                    None,
+                                    stats.RsyncStats(files=3, total_size=300, bytes_sent=20)])
+
+        self.assertEqual(5, result.files)
+        self.assertEqual(400, result.total_size)
+        self.assertEqual(10.0, result.speedup)
+        self.assertIsNone(result.literal_data)
+
+
+if __name__ == '__main__':
+    unittest.main()
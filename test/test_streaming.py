@@ -0,0 +1,84 @@
+"""Unit tests for the streaming module."""
+import subprocess
+import time
+import unittest
+from unittest import mock
+
+from sysrsync import streaming
+from sysrsync.exceptions import PartialTransferError
+from sysrsync.helpers.progress import FileEvent, MessageEvent, ProgressEvent
+
+STREAM_SCRIPT = r'''
+printf '[sysrsync] >f+++++++++ 1024 docs/a.txt\n'
+printf '          1,024  50%%    1.00MB/s    0:00:01 (xfr#1, to-chk=1/2)\r'
+printf '[sysrsync] >f.st...... 2048 b.txt\n'
+printf 'sent 3,072 bytes  received 35 bytes\n'
+exit {}
+'''
+
+
+def run_stream(script, **kwargs):
+    """Stream a fake rsync running the given shell script."""
+    with mock.patch.object(streaming, 'get_rsync_command', return_value=['sh', '-c', script]):
+        yield from streaming.stream(source='/a', destination='/b', **kwargs)
+
+
+class TestStreaming(unittest.TestCase):
+    """Unit tests for the streaming module."""
+
+    def test_events(self):
+        """Test yielding itemized changes, progress updates and other lines as they are printed."""
+        events = list(run_stream(STREAM_SCRIPT.format(0)))
+
+        self.assertEqual([FileEvent('>f+++++++++', 1024, 'docs/a.txt'),
+                          ProgressEvent(bytes=1024, percent=50, rate=1024 ** 2, eta=1,
+                                        transfers=1, remaining=1, total=2),
+                          FileEvent('>f.st......', 2048, 'b.txt'),
+                          MessageEvent('sent 3,072 bytes  received 35 bytes')],
+                         events)
+
+    def test_stream_options(self):
+        """Test adding the progress and itemized output options after the given ones."""
+        with mock.patch.object(streaming, 'get_rsync_command', return_value=['sh', '-c', 'exit 0']) as command:
+            list(streaming.stream(source='/a', destination='/b', options=['-a']))
+
+        self.assertEqual(['-a', *streaming.STREAM_OPTIONS], command.call_args[1]['options'])
+
+    def test_early_close(self):
+        """Test terminating rsync when the consumer stops iterating before it exits."""
+        popen = subprocess.Popen
+        processes = []
+
+        def spawn(*args, **kwargs):
+            processes.append(popen(*args, **kwargs))
+            return processes[-1]
+
+        events = run_stream('printf "[sysrsync] >f+++++++++ 1 a\\n"; sleep 30')
+        with mock.patch('subprocess.Popen', side_effect=spawn):
+            started_at = time.monotonic()
+            self.assertEqual(FileEvent('>f+++++++++', 1, 'a'), next(events))
+            events.close()
+
+        self.assertLess(time.monotonic() - started_at, 10)
+        self.assertIsNotNone(processes[0].returncode)
+        self.assertNotEqual(0, processes[0].returncode)
+
+    def test_strict(self):
+        """Test raising an exception after the last event when rsync exits with a non-zero code."""
+        events = []
+        with self.assertRaises(PartialTransferError) as context:
+            for event in run_stream(STREAM_SCRIPT.format(23)):
+                events.append(event)
+
+        self.assertEqual(4, len(events))
+        self.assertEqual(23, context.exception.return_code)
+
+    def test_not_strict(self):
+        """Test ignoring a non-zero exit code when not strict."""
+        events = list(run_stream(STREAM_SCRIPT.format(23), strict=False))
+
+        self.assertEqual(4, len(events))
+
+
+if __name__ == '__main__':
+    unittest.main()
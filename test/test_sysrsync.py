@@ -95,6 +95,33 @@ class TestPackage(unittest.TestCase):
         with self.assertRaises(RemotesError):
             get_rsync_command(source, target, source_ssh=source_ssh, destination_ssh=target_ssh)
 
+    def test_rsync_daemon_url(self):
+        """Test generating an rsync command pushing to a daemon with a port."""
+        expect = ['rsync', '-a', '--password-file=/secret', '/a/', 'rsync://user@host:8730/module/b']
+        result = get_rsync_command('/a', 'module/b', destination_daemon='user@host:8730',
+                                   options=['-a'], password_file='/secret')
+
+        self.assertEqual(expect, result)
+
+    def test_rsync_daemon_module(self):
+        """Test generating an rsync command pulling from a daemon module, given directly or as a prefix."""
+        expect = ['rsync', 'host::module/a/', '/b']
+
+        self.assertEqual(expect, get_rsync_command('module/a', '/b', source_daemon='host'))
+        self.assertEqual(expect, get_rsync_command('host::module/a', '/b'))
+
+    def test_rsync_daemon_remotes_error(self):
+        """Test raising RemotesError when a daemon path is combined with another remote."""
+        with self.assertRaises(RemotesError):
+            get_rsync_command('rsync://host/module/a', '/b', destination_ssh='other')
+        with self.assertRaises(RemotesError):
+            get_rsync_command('module/a', 'module/b', source_daemon='host', destination_daemon='other')
+
+    def test_rsync_password_file_without_daemon(self):
+        """Test raising ValueError when a password file is given without a daemon."""
+        with self.assertRaises(ValueError):
+            get_rsync_command('/a', '/b', destination_ssh='host', password_file='/secret')
+
     def test_rsync_private_key(self):
         """Test generating an rsync command with a private key."""
         with NamedTemporaryFile() as temp_file:
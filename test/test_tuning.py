@@ -0,0 +1,127 @@
+"""Unit tests for the tuning module."""
+import os
+import unittest
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from sysrsync import tuning
+from sysrsync.retry import RetryPolicy
+from sysrsync.runner import run
+
+
+def _write(path, data):
+    with open(path, 'wb') as file:
+        file.write(data)
+
+
+class TestTuning(unittest.TestCase):
+    """Unit tests for the tuning module."""
+
+    def setUp(self):
+        """Start every test with an empty preset cache."""
+        tuning.clear_presets()
+
+    def test_is_local_host(self):
+        """Test recognizing paths on this machine."""
+        self.assertTrue(tuning.is_local_host(None))
+        self.assertTrue(tuning.is_local_host('user@localhost'))
+        self.assertFalse(tuning.is_local_host('user@remote.example'))
+
+    def test_local_sync_whole_file(self):
+        """Test choosing --whole-file and no compression for local syncs."""
+        with TemporaryDirectory() as source:
+            _write(os.path.join(source, 'file'), b'a' * 4096)
+            preset = tuning.choose_preset(source, '/b')
+
+        self.assertIn('--whole-file', preset.options)
+        self.assertNotIn('--compress', preset.options)
+        self.assertIn('--no-inc-recursive', preset.options)
+
+    def test_remote_compressible(self):
+        """Test compressing compressible data sent over the network."""
+        with TemporaryDirectory() as source, mock.patch.object(tuning, 'get_rsync_version', return_value=(3, 1, 3)):
+            _write(os.path.join(source, 'file'), b'a' * 4096)
+            preset = tuning.choose_preset(source, '/b', destination_ssh='remote.example')
+
+        self.assertEqual(['--compress', '--compress-level=1', '--no-inc-recursive'], preset.options)
+
+    def test_remote_incompressible(self):
+        """Test not compressing already compressed data."""
+        with TemporaryDirectory() as source:
+            _write(os.path.join(source, 'file'), os.urandom(4096))
+            preset = tuning.choose_preset(source, '/b', destination_ssh='remote.example')
+
+        self.assertNotIn('--compress', preset.options)
+
+    def test_daemon_destination(self):
+        """Test treating daemon paths given directly as remote, in both URL forms."""
+        for destination in ('rsync://backup.example/mod/x', 'backup.example::mod/x', 'user@backup.example::mod/x'):
+            with self.subTest(destination=destination):
+                with TemporaryDirectory() as source, \
+                        mock.patch('subprocess.run', return_value=mock.Mock(returncode=0)) as rsync:
+                    _write(os.path.join(source, 'file'), os.urandom(4096))
+                    process = run(source=source, destination=destination, tune='auto')
+                tuning.clear_presets()
+
+                self.assertNotIn('--whole-file', rsync.call_args[0][0])
+                self.assertNotIn('both paths are on this machine', ' '.join(process.preset.reasons))
+
+    def test_daemon_source(self):
+        """Test not sampling a daemon source given directly, in both URL forms."""
+        for source in ('rsync://backup.example:8730/mod/x', 'backup.example::mod/x'):
+            with self.subTest(source=source), mock.patch.object(tuning, 'sample_tree') as sample_tree:
+                preset = tuning.choose_preset(source, '/b')
+
+            sample_tree.assert_not_called()
+            self.assertEqual([], preset.options)
+            self.assertIn('remote source', preset.reasons[0])
+
+    def test_preset_cached(self):
+        """Test reusing the preset chosen for the same pair of paths."""
+        with TemporaryDirectory() as source:
+            first = tuning.get_preset(source, '/b')
+            with mock.patch.object(tuning, 'choose_preset') as choose:
+                second = tuning.get_preset(source, '/b')
+
+        choose.assert_not_called()
+        self.assertIs(first, second)
+
+    def test_run_tune_auto(self):
+        """Test run putting tuned options before explicit ones."""
+        with TemporaryDirectory() as source, mock.patch('subprocess.run', return_value=mock.Mock(returncode=0)) as rsync:
+            process = run(source=source, destination='/b', options=['-a'], tune='auto')
+
+        command = rsync.call_args[0][0]
+        self.assertLess(command.index('--whole-file'), command.index('-a'))
+        self.assertTrue(process.preset.reasons)
+
+    def test_run_tune_with_append_verify(self):
+        """Test dropping the tuned --whole-file, which conflicts with --append-verify."""
+        with TemporaryDirectory() as source, mock.patch('subprocess.run', return_value=mock.Mock(returncode=0)) as rsync:
+            run(source=source, destination='/b', tune='auto', retry=RetryPolicy(append_verify=True))
+
+        command = rsync.call_args[0][0]
+        self.assertNotIn('--whole-file', command)
+        self.assertIn('--append-verify', command)
+
+    def test_run_tune_with_retry(self):
+        """Test dropping the tuned --inplace, which rsync refuses with the retry policy's --partial-dir."""
+        with TemporaryDirectory() as source, mock.patch('subprocess.run', return_value=mock.Mock(returncode=0)) as rsync:
+            _write(os.path.join(source, 'large'), b'')
+            with mock.patch.object(tuning, 'sample_tree',
+                                   return_value=tuning.TreeSample(1, tuning.LARGE_FILE_SIZE, True, None)):
+                process = run(source=source, destination='/b', tune='auto', retry=RetryPolicy())
+
+        command = rsync.call_args[0][0]
+        self.assertIn('--inplace', process.preset.options)
+        self.assertNotIn('--inplace', command)
+        self.assertIn('--partial-dir', command)
+
+    def test_run_tune_invalid(self):
+        """Test rejecting unknown tune modes."""
+        with self.assertRaises(ValueError):
+            run(source='/a', destination='/b', tune='fast')
+
+
+if __name__ == '__main__':
+    unittest.main()
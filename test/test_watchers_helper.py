@@ -0,0 +1,105 @@
+"""Unit tests for the watchers helper module."""
+import os
+import threading
+import time
+import unittest
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from sysrsync import watching
+from sysrsync.helpers import watchers
+
+
+class TestWatchersHelper(unittest.TestCase):
+    """Unit tests for the watchers helper module."""
+
+    def _assert_detects_changes(self, watcher, root):
+        os.makedirs(os.path.join(root, 'existing'))
+        watcher.wait(0.2)
+        with open(os.path.join(root, 'existing', 'file'), 'w') as file:
+            file.write('a')
+        os.makedirs(os.path.join(root, 'new'))
+
+        changes = set()
+        for _ in range(10):
+            changes |= watcher.wait(0.2)
+            if {os.path.join('existing', 'file'), 'new'} <= changes:
+                break
+        self.assertIn(os.path.join('existing', 'file'), changes)
+        self.assertIn('new', changes)
+        self.assertNotIn('existing', changes)
+
+    def test_polling_watcher(self):
+        """Test detecting new files and directories by polling."""
+        with TemporaryDirectory() as root:
+            watcher = watchers.PollingWatcher(root, interval=0.05)
+            self._assert_detects_changes(watcher, root)
+
+    def test_polling_watcher_timeout(self):
+        """Test returning no changes when the timeout expires."""
+        with TemporaryDirectory() as root:
+            self.assertEqual(set(), watchers.PollingWatcher(root, interval=0.05).wait(0.1))
+
+    def test_inotify_watcher(self):
+        """Test detecting new files and directories with inotify."""
+        with TemporaryDirectory() as root:
+            try:
+                watcher = watchers.InotifyWatcher(root)
+            except OSError:
+                self.skipTest('inotify is not available')
+            try:
+                self._assert_detects_changes(watcher, root)
+            finally:
+                watcher.close()
+
+    def test_watch_syncs_changed_paths(self):
+        """Test syncing a debounced batch of changed paths through --files-from."""
+        lists = []
+
+        def fake_rsync(command, **_):
+            with open(command[command.index('--files-from') + 1], 'rb') as file_list:
+                lists.append(file_list.read())
+            return mock.Mock(returncode=0)
+
+        with TemporaryDirectory() as root, mock.patch('subprocess.run', side_effect=fake_rsync):
+            def write_file():
+                with open(os.path.join(root, 'file'), 'w') as file:
+                    file.write('a')
+
+            batches = watching.watch(source=root, destination='/b', debounce=0.1,
+                                     initial_sync=False, use_inotify=False, poll_interval=0.05)
+            threading.Timer(0.3, write_file).start()
+            next(batches)
+            batches.close()
+
+        self.assertEqual([b'file\0'], lists)
+
+    def test_watch_flushes_on_stop(self):
+        """Test syncing the changes still waiting for the debounce when stopped."""
+        lists = []
+
+        def fake_rsync(command, **_):
+            with open(command[command.index('--files-from') + 1], 'rb') as file_list:
+                lists.append(file_list.read())
+            return mock.Mock(returncode=0)
+
+        stop = threading.Event()
+        with TemporaryDirectory() as root, mock.patch('subprocess.run', side_effect=fake_rsync):
+            def write_file_and_stop():
+                with open(os.path.join(root, 'file'), 'w') as file:
+                    file.write('a')
+                stop.set()
+
+            batches = watching.watch(source=root, destination='/b', debounce=30, initial_sync=False,
+                                     use_inotify=False, poll_interval=0.05, stop=stop)
+            threading.Timer(0.2, write_file_and_stop).start()
+            started_at = time.monotonic()
+            processes = list(batches)
+
+        self.assertLess(time.monotonic() - started_at, 10)
+        self.assertEqual(1, len(processes))
+        self.assertEqual([b'file\0'], lists)
+
+
+if __name__ == '__main__':
+    unittest.main()